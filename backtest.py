@@ -0,0 +1,56 @@
+import argparse
+import logging
+import time
+from datetime import datetime
+
+from config import Config
+from trading_bot import create_exchanges, create_symbols, create_trading_systems
+from trading_bot.adapters.history_files import AdapterHistoryFiles
+from trading_bot.models.exchanges import ExchangeManager
+from trading_bot.models.indicators import IndicatorManager
+from trading_bot.models.symbols import SymbolManager
+from trading_bot.models.trading_systems import TradingSystemManager
+from trading_bot.services.backtester import Backtester
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replays the trading systems from settings.json over candle history')
+    parser.add_argument('history', help='directory with binance klines dumps, e.g. BTCUSDT-1h-2021-01.csv')
+    parser.add_argument('--trades', action='store_true', help='print every trade')
+    args = parser.parse_args()
+
+    logger = logging.getLogger('logger')
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(fmt='[%(levelname)s] [%(module)s] %(message)s'))
+    logger.addHandler(stream_handler)
+    logger.setLevel(logging.WARNING)
+
+    exchange_manager = ExchangeManager()
+    symbol_manager = SymbolManager()
+    trading_system_manager = TradingSystemManager(IndicatorManager(), exchange_manager)
+
+    create_exchanges(exchange_manager, Config.EXCHANGES)
+    create_symbols(symbol_manager, exchange_manager, Config.SYMBOLS)
+    create_trading_systems(trading_system_manager, Config.TRADING_SYSTEMS_SETTINGS)
+
+    backtester = Backtester(
+        history_adapter=AdapterHistoryFiles(args.history),
+        trading_systems=trading_system_manager.list(),
+    )
+
+    started = time.perf_counter()
+    trades = backtester.run(symbol_manager.list())
+    elapsed = time.perf_counter() - started
+
+    if args.trades:
+        for trade in trades:
+            print(f'{trade.trading_system} {datetime.fromtimestamp(trade.entry_time / 1000)} '
+                  f'{datetime.fromtimestamp(trade.exit_time / 1000)} {trade} profit: {trade.profit:.4f}')
+
+    for name, result in Backtester.summarize(trades).items():
+        print(f'{name}: trades {result["trades"]}, win rate {result["win_rate"]:.2%}, profit {result["profit"]:.4f}')
+    print(f'Backtested {len(symbol_manager.list())} symbols in {elapsed:.2f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+from datetime import datetime
+
+from trading_bot.services.benchmark import Benchmark
+
+
+def parse_counts(value):
+    return [int(count) for count in value.split(',')]
+
+
+def get_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, previous_results):
+    previous = {(result['symbols'], result['trading_systems']): result for result in previous_results}
+    for result in results:
+        before = previous.get((result['symbols'], result['trading_systems']))
+        if before is None:
+            continue
+        now_seconds = result['cycle_seconds']['cycle']['mean']
+        before_seconds = before['cycle_seconds']['cycle']['mean']
+        print(f'{result["symbols"]} symbols, {result["trading_systems"]} trading systems: '
+              f'cycle {before_seconds:.3f}s -> {now_seconds:.3f}s ({now_seconds / before_seconds - 1:+.1%})')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measures the bot cycles against local stand-ins of taapi, '
+                                                 'ByBit and telegram')
+    parser.add_argument('--symbols', type=parse_counts, default=[10, 100, 1000],
+                        help='comma separated symbol counts (10,100,1000 by default)')
+    parser.add_argument('--trading-systems', type=parse_counts, default=[1, 10, 50],
+                        help='comma separated trading system counts (1,10,50 by default)')
+    parser.add_argument('--cycles', type=int, default=3, help='cycles per universe')
+    parser.add_argument('--latency', type=float, default=0.05, help='stand-in answer delay in seconds')
+    parser.add_argument('--jitter', type=float, default=0.02, help='random extra delay up to this many seconds')
+    parser.add_argument('--error-rate', type=float, default=0, help='share of the stand-in requests that fail')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='json file for the results (stdout by default)')
+    parser.add_argument('--compare', help='json file of a previous run to compare the cycle time with')
+    args = parser.parse_args()
+
+    results = []
+    for symbols_count in args.symbols:
+        for trading_systems_count in args.trading_systems:
+            result = asyncio.run(Benchmark(
+                symbols_count=symbols_count,
+                trading_systems_count=trading_systems_count,
+                cycles=args.cycles,
+                latency=args.latency,
+                jitter=args.jitter,
+                error_rate=args.error_rate,
+                seed=args.seed,
+            ).run())
+            results.append(result)
+            print(f'{symbols_count} symbols, {trading_systems_count} trading systems: '
+                  f'cycle {result["cycle_seconds"]["cycle"]["mean"]:.3f}s, '
+                  f'max loop lag {result["loop_lag_seconds"]["max"]:.3f}s', file=sys.stderr)
+
+    report = {
+        'commit': get_commit(),
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'parameters': {
+            'cycles': args.cycles,
+            'latency': args.latency,
+            'jitter': args.jitter,
+            'error_rate': args.error_rate,
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f)['results'])
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,11 @@
+from config import Config
 from trading_bot import create_app
+from trading_bot.services.sharding import ShardCoordinator
 
-bot = create_app()
-bot.run()
+# The shards are spawned processes, they import this module too
+if __name__ == '__main__':
+    if Config.SHARDS > 1:
+        ShardCoordinator(Config, shards=Config.SHARDS, socket_path=Config.SHARED_STATE_SOCKET).run()
+    else:
+        bot = create_app()
+        bot.run()
@@ -17,10 +17,37 @@ class SettingsLoader:
 class Config:
     TELEGRAM_TOKEN = os.environ.get('TELEGRAM_TOKEN')
     TELEGRAM_CHAT_ID = os.environ.get('TELEGRAM_CHAT_ID')
+    TELEGRAM_URL = os.environ.get('TELEGRAM_URL') or 'https://api.telegram.org'
+    TELEGRAM_FLUSH_INTERVAL = float(os.environ.get('TELEGRAM_FLUSH_INTERVAL') or 1)
     TA_API_KEY = os.environ.get('TA_API_KEY')
     TA_API_TIMEOUT = int(os.environ.get('TA_API_TIMEOUT') or 15)
+    TA_API_RATE_LIMIT = int(os.environ.get('TA_API_RATE_LIMIT') or 1)
+    TA_API_BURST = int(os.environ.get('TA_API_BURST') or TA_API_RATE_LIMIT)
+    TA_API_BULK = bool(int(os.environ.get('TA_API_BULK') or 0))
+    TA_API_BULK_LIMIT = int(os.environ.get('TA_API_BULK_LIMIT') or 20)
+    TA_API_URL = os.environ.get('TA_API_URL') or 'https://api.taapi.io/'
+    INDICATORS_SOURCE = os.environ.get('INDICATORS_SOURCE') or 'ta_api'
+    INDICATORS_WINDOW_SIZE = int(os.environ.get('INDICATORS_WINDOW_SIZE') or 500)
+    INDICATORS_SETTLE_DELAY = int(os.environ.get('INDICATORS_SETTLE_DELAY') or 5)
+    INDICATORS_STREAM = bool(int(os.environ.get('INDICATORS_STREAM') or 0))
+    INDICATORS_CACHE_PATH = os.environ.get('INDICATORS_CACHE_PATH')
+    DECISION_MAKER_BATCH = bool(int(os.environ.get('DECISION_MAKER_BATCH') or 0))
+    DECISION_MAKER_CONCURRENCY = int(os.environ.get('DECISION_MAKER_CONCURRENCY') or 10)
+    METRICS_HOST = os.environ.get('METRICS_HOST') or '127.0.0.1'
+    METRICS_PORT = int(os.environ.get('METRICS_PORT') or 0)
+    LOOP_LAG_THRESHOLD = float(os.environ.get('LOOP_LAG_THRESHOLD') or 0.25)
     BY_BIT_API_KEY = os.environ.get('BY_BIT_API_KEY')
     BY_BIT_API_SECRET = os.environ.get('BY_BIT_API_SECRET')
+    BY_BIT_URL = os.environ.get('BY_BIT_URL') or 'https://api-testnet.bybit.com/'
+    BY_BIT_TIMEOUT = int(os.environ.get('BY_BIT_TIMEOUT') or 10)
+    BY_BIT_CACHE_TTL = float(os.environ.get('BY_BIT_CACHE_TTL') or 1)
+    BY_BIT_PRICES_MAX_AGE = float(os.environ.get('BY_BIT_PRICES_MAX_AGE') or 1)
+    BY_BIT_STREAM = bool(int(os.environ.get('BY_BIT_STREAM') or 0))
+    BY_BIT_STREAM_STALE_AFTER = int(os.environ.get('BY_BIT_STREAM_STALE_AFTER') or 30)
+    SHARDS = int(os.environ.get('SHARDS') or 1)
+    TA_API_KEYS = [key for key in (os.environ.get('TA_API_KEYS') or '').split(',') if key]
+    SHARED_STATE_SOCKET = os.environ.get('SHARED_STATE_SOCKET')
+    SHARD = None  # the number of the shard, set by the coordinator for its processes
 
     _settings = SettingsLoader.load()
 
@@ -0,0 +1,65 @@
+import argparse
+import csv
+import logging
+import sys
+import time
+
+from config import Config
+from trading_bot import create_exchanges, create_symbols
+from trading_bot.adapters.history_files import AdapterHistoryFiles
+from trading_bot.models.exchanges import ExchangeManager
+from trading_bot.models.symbols import SymbolManager
+from trading_bot.services.optimizer import Optimizer, parse_grid
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backtests every combination of a trading system`s settings')
+    parser.add_argument('history', help='directory with binance klines dumps, e.g. BTCUSDT-1h-2021-01.csv')
+    parser.add_argument('trading_system', help='name of the trading system in settings.json')
+    parser.add_argument('--param', action='append', required=True,
+                        help='Indicator_name.param=values, e.g. MovingAverage_4h_period4.period=2..6 '
+                             'or MovingAverage_4h_period4.interval=1h,4h')
+    parser.add_argument('--workers', type=int, default=None, help='number of processes (all cores by default)')
+    parser.add_argument('--output', help='csv file for the results (stdout by default)')
+    args = parser.parse_args()
+
+    logger = logging.getLogger('logger')
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(fmt='[%(levelname)s] [%(module)s] %(message)s'))
+    logger.addHandler(stream_handler)
+    logger.setLevel(logging.WARNING)
+
+    settings = {tr_system['name']: tr_system['settings'] for tr_system in Config.TRADING_SYSTEMS_SETTINGS}
+    if args.trading_system not in settings:
+        parser.error(f'There is no trading system {args.trading_system} in settings.json')
+
+    exchange_manager = ExchangeManager()
+    symbol_manager = SymbolManager()
+    create_exchanges(exchange_manager, Config.EXCHANGES)
+    create_symbols(symbol_manager, exchange_manager, Config.SYMBOLS)
+
+    optimizer = Optimizer(
+        history_adapter=AdapterHistoryFiles(args.history),
+        symbols=symbol_manager.list(),
+        exchanges_config=Config.EXCHANGES,
+        workers=args.workers,
+    )
+
+    started = time.perf_counter()
+    rows = optimizer.run(args.trading_system, settings[args.trading_system], parse_grid(args.param))
+    elapsed = time.perf_counter() - started
+
+    output = open(args.output, 'w', newline='') if args.output else sys.stdout
+    try:
+        writer = csv.DictWriter(output, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    finally:
+        if args.output:
+            output.close()
+
+    print(f'Backtested {len(rows)} combinations in {elapsed:.2f}s', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
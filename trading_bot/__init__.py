@@ -1,7 +1,13 @@
 import logging
 
 from trading_bot import app
+from trading_bot.adapters.binance import AdapterBinance
+from trading_bot.adapters.binance_stream import BinanceKlineStream
 from trading_bot.adapters.by_bit import AdapterByBit
+from trading_bot.adapters.by_bit_stream import ByBitStream
+from trading_bot.adapters.indicator_value_store import IndicatorValueStore
+from trading_bot.adapters.metrics_server import MetricsServer
+from trading_bot.adapters.shared_state import SharedStateClient
 from trading_bot.adapters.ta_api import AdapterTaAPI
 from trading_bot.models.exchanges import ExchangeManager
 from trading_bot.models.indicator_values import IndicatorValueManager
@@ -10,7 +16,9 @@ from trading_bot.models.symbols import SymbolManager
 from trading_bot.models.trading_systems import TradingSystemManager
 from trading_bot.services.dealer import Dealer
 from trading_bot.services.decision_maker import DecisionMaker
+from trading_bot.services.indicator_engine import LocalIndicatorEngine
 from trading_bot.services.indicator_updater import IndicatorUpdater
+from trading_bot.services.loop_monitor import LoopLagMonitor
 from trading_bot.services.stop_loss_manager import StopLossManager
 from trading_bot.adapters.telegram import AdapterTelegram
 from config import Config
@@ -47,12 +55,85 @@ def create_trading_systems(trading_system_manager, trading_systems_config):
         )
 
 
-def create_app(config_class=Config):
+def create_indicators_adapter(config_class):
+    if config_class.INDICATORS_SOURCE == 'local':
+        return LocalIndicatorEngine(
+            candles_adapter=AdapterBinance(),
+            window_size=config_class.INDICATORS_WINDOW_SIZE,
+        )
+    if config_class.INDICATORS_SOURCE == 'ta_api':
+        return AdapterTaAPI(
+            api_key=config_class.TA_API_KEY,
+            timeout=config_class.TA_API_TIMEOUT,
+            rate_limit=config_class.TA_API_RATE_LIMIT,
+            burst=config_class.TA_API_BURST,
+            bulk_limit=config_class.TA_API_BULK_LIMIT,
+            url=config_class.TA_API_URL,
+        )
+    raise ValueError
+
+
+def create_metrics_server(config_class):
+    if not config_class.METRICS_PORT:
+        return None
+    return MetricsServer(
+        metrics=app.metrics,
+        host=config_class.METRICS_HOST,
+        port=config_class.METRICS_PORT,
+    )
+
+
+def create_loop_monitor(config_class):
+    if not config_class.LOOP_LAG_THRESHOLD:
+        return None
+    return LoopLagMonitor(threshold=config_class.LOOP_LAG_THRESHOLD)
+
+
+def create_by_bit_stream(config_class):
+    if not config_class.BY_BIT_STREAM:
+        return None
+    return ByBitStream(
+        api_key=config_class.BY_BIT_API_KEY,
+        api_secret=config_class.BY_BIT_API_SECRET,
+        timeout=config_class.BY_BIT_TIMEOUT,
+        stale_after=config_class.BY_BIT_STREAM_STALE_AFTER,
+    )
+
+
+def create_value_store(config_class):
+    if not config_class.INDICATORS_CACHE_PATH:
+        return None
+    return IndicatorValueStore(path=config_class.INDICATORS_CACHE_PATH)
+
+
+def create_kline_stream(config_class, indicator_updater):
+    if not config_class.INDICATORS_STREAM:
+        return None
+    # Only the local engine keeps candles, taapi calculates from its own ones
+    if config_class.INDICATORS_SOURCE != 'local':
+        raise ValueError
+    return BinanceKlineStream(on_candle=indicator_updater.on_candle_closed)
+
+
+def create_shared_state(config_class):
+    # Only a shard started by the coordinator has it
+    if config_class.SHARD is None:
+        return None
+    return SharedStateClient(path=config_class.SHARED_STATE_SOCKET, timeout=config_class.BY_BIT_TIMEOUT)
+
+
+def create_logger(prefix=''):
     logger = logging.getLogger('logger')
     stream_handler = logging.StreamHandler()
-    stream_handler.setFormatter(logging.Formatter(fmt='[%(levelname)s] [%(module)s] %(message)s'))
+    stream_handler.setFormatter(logging.Formatter(fmt=f'{prefix}[%(levelname)s] [%(module)s] %(message)s'))
     logger.addHandler(stream_handler)
     logger.setLevel(logging.INFO)
+    return logger
+
+
+def create_app(config_class=Config):
+    # The shards write to the same output, so every line tells whose it is
+    logger = create_logger(f'[shard {config_class.SHARD}] ' if config_class.SHARD is not None else '')
     logger.info("I'm up and running")
 
     app.indicator_manager = IndicatorManager()
@@ -68,10 +149,18 @@ def create_app(config_class=Config):
     app.notifier = AdapterTelegram(
         token=config_class.TELEGRAM_TOKEN,
         chat_id=config_class.TELEGRAM_CHAT_ID,
+        flush_interval=config_class.TELEGRAM_FLUSH_INTERVAL,
+        url=config_class.TELEGRAM_URL,
     )
     app.deals_adapter = AdapterByBit(
         api_key=config_class.BY_BIT_API_KEY,
         api_secret=config_class.BY_BIT_API_SECRET,
+        timeout=config_class.BY_BIT_TIMEOUT,
+        stream=create_by_bit_stream(config_class),
+        cache_ttl=config_class.BY_BIT_CACHE_TTL,
+        prices_max_age=config_class.BY_BIT_PRICES_MAX_AGE,
+        url=config_class.BY_BIT_URL,
+        shared_state=create_shared_state(config_class),
     )
     app.dealer = Dealer(deals_adapter=app.deals_adapter)
 
@@ -79,15 +168,22 @@ def create_app(config_class=Config):
         app.trading_system_manager,
         app.symbol_manager,
         app.indicator_value_manager,
+        batch=config_class.DECISION_MAKER_BATCH,
+        concurrency=config_class.DECISION_MAKER_CONCURRENCY,
     )
-    app.indicators_adapter = AdapterTaAPI(
-        api_key=config_class.TA_API_KEY,
-        timeout=config_class.TA_API_TIMEOUT
-    )
+    app.indicators_adapter = create_indicators_adapter(config_class)
+    app.value_store = create_value_store(config_class)
     app.indicator_updater = IndicatorUpdater(
         indicator_adapter=app.indicators_adapter,
         decision_maker=app.decision_maker,
+        bulk=config_class.TA_API_BULK,
+        settle_delay=config_class.INDICATORS_SETTLE_DELAY,
+        value_store=app.value_store,
     )
+    app.kline_stream = create_kline_stream(config_class, app.indicator_updater)
+
+    app.metrics_server = create_metrics_server(config_class)
+    app.loop_monitor = create_loop_monitor(config_class)
 
     app.pause_checker = PauseChecker(
         dealer=app.dealer
@@ -0,0 +1,91 @@
+import asyncio
+import logging
+from typing import List, Optional
+
+import aiohttp
+
+from trading_bot import app
+from trading_bot.adapters.http_session import create_session
+from trading_bot.models.candles import Candle
+from trading_bot.models.indicators import Indicator
+from trading_bot.models.symbols import Symbol
+
+logger = logging.getLogger('logger')
+
+
+class AdapterBinance:
+
+    def __init__(self, timeout: float = 10) -> None:
+        self._timeout = timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.symbol_template = '{base_currency}{quote_currency}'
+        self._url = 'https://api.binance.com/'
+        self.max_candles_per_request = 1000
+
+    async def open(self) -> None:
+        if self._session is None or self._session.closed:
+            self._session = create_session(timeout=self._timeout)
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def get_candles(
+            self,
+            symbol: Symbol,
+            interval: Indicator.Interval,
+            limit: int,
+            start_time: int = None,
+    ) -> List[Candle]:
+        await self.open()
+
+        params = {
+            'symbol': self._get_symbol_alias(symbol),
+            'interval': interval.name,
+            'limit': min(limit, self.max_candles_per_request),
+        }
+        if start_time:
+            params['startTime'] = start_time
+
+        url = f'{self._url}api/v3/klines'
+        try:
+            with app.metrics.timer('request_seconds', adapter='binance', endpoint='api/v3/klines'):
+                async with self._session.get(url, params=params) as response:
+                    if response.status != 200:
+                        logger.warning(f'{symbol} {interval.name} {await response.text()}')
+                        raise Warning
+
+                    resp = await response.json(content_type=None)
+        except Warning:
+            app.metrics.inc('request_errors_total', adapter='binance', endpoint='api/v3/klines')
+            raise
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            app.metrics.inc('request_errors_total', adapter='binance', endpoint='api/v3/klines')
+            logger.warning(f'{symbol} {interval.name} {e!r}')
+            raise Warning
+
+        return self._parse_candles(resp)
+
+    def _get_symbol_alias(self, symbol: Symbol) -> str:
+        return self.symbol_template.format(
+            base_currency=symbol.base_currency,
+            quote_currency=symbol.quote_currency,
+        )
+
+    @staticmethod
+    def _parse_candles(response: List[list]) -> List[Candle]:
+        candles = []
+        for row in response:
+            candles.append(
+                Candle(
+                    open_time=int(row[0]),
+                    open_price=float(row[1]),
+                    high=float(row[2]),
+                    low=float(row[3]),
+                    close=float(row[4]),
+                    volume=float(row[5]),
+                    close_time=int(row[6]),
+                )
+            )
+        return candles
@@ -0,0 +1,154 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Any, List, Optional
+
+import aiohttp
+
+from trading_bot.adapters.http_session import create_session
+from trading_bot.models.candles import Candle
+from trading_bot.models.indicators import Indicator
+from trading_bot.models.symbols import Symbol
+
+logger = logging.getLogger('logger')
+
+CandleHandler = Callable[[Symbol, Indicator.Interval, Candle], Awaitable[None]]
+
+
+class BinanceKlineStream:
+    # All streams share one connection, up to 1024 streams per connection
+
+    def __init__(
+            self,
+            on_candle: CandleHandler,
+            timeout: float = 10,
+            receive_timeout: float = 60,
+            reconnect_delay: float = 1,
+            max_reconnect_delay: float = 60,
+            max_streams_per_connection: int = 1024,
+            streams_per_message: int = 200,
+            url: str = 'wss://stream.binance.com:9443/stream',
+    ) -> None:
+        self._on_candle = on_candle
+        self._timeout = timeout
+        self._receive_timeout = receive_timeout
+        self._reconnect_delay = reconnect_delay
+        self._max_reconnect_delay = max_reconnect_delay
+        self._max_streams_per_connection = max_streams_per_connection
+        self._streams_per_message = streams_per_message
+        self._url = url
+        self.symbol_template = '{base_currency}{quote_currency}'
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._tasks = []
+        self._handlers = set()
+        self._symbols_by_alias = {}
+        self._intervals_by_name = {}
+        self._message_id = 0
+
+    async def open(self, symbols: List[Symbol], intervals: List[Indicator.Interval]) -> None:
+        if self._tasks:
+            return
+
+        self._symbols_by_alias = {self._get_symbol_alias(symbol): symbol for symbol in symbols}
+        self._intervals_by_name = {interval.name: interval for interval in intervals}
+
+        streams = [
+            f'{alias.lower()}@kline_{interval_name}'
+            for alias in self._symbols_by_alias
+            for interval_name in self._intervals_by_name
+        ]
+
+        self._session = create_session(timeout=self._timeout)
+        self._tasks = [
+            asyncio.create_task(
+                self._run(streams[start:start + self._max_streams_per_connection]),
+                name='Binance kline stream',
+            )
+            for start in range(0, len(streams), self._max_streams_per_connection)
+        ]
+
+    async def close(self) -> None:
+        for task in [*self._tasks, *self._handlers]:
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._handlers, return_exceptions=True)
+        self._tasks = []
+        self._handlers = set()
+
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _run(self, streams: List[str]) -> None:
+        delay = self._reconnect_delay
+        while True:
+            try:
+                async with self._session.ws_connect(self._url, receive_timeout=self._receive_timeout) as ws:
+                    await self._subscribe(ws, streams)
+                    logger.info(f'Binance kline stream is connected ({len(streams)} streams)')
+                    delay = self._reconnect_delay
+
+                    async for message in ws:
+                        if message.type == aiohttp.WSMsgType.TEXT:
+                            try:
+                                self._handle_message(message.json())
+                            except (ValueError, KeyError, TypeError) as e:
+                                logger.warning(f'I did not parse the message of binance kline stream: {e!r}')
+                        elif message.type == aiohttp.WSMsgType.ERROR:
+                            break
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.warning(f'Binance kline stream failed: {e!r}')
+            except Exception as e:
+                # Otherwise the candles of these streams would be lost until restart
+                logger.exception(f'Binance kline stream failed unexpectedly: {e!r}')
+
+            logger.warning(f'Binance kline stream is disconnected, reconnect in {delay}s')
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self._max_reconnect_delay)
+
+    async def _subscribe(self, ws: aiohttp.ClientWebSocketResponse, streams: List[str]) -> None:
+        for start in range(0, len(streams), self._streams_per_message):
+            self._message_id += 1
+            await ws.send_json({
+                'method': 'SUBSCRIBE',
+                'params': streams[start:start + self._streams_per_message],
+                'id': self._message_id,
+            })
+            # Binance accepts up to 5 messages per second from a connection
+            await asyncio.sleep(0.2)
+
+    def _handle_message(self, message: Dict[str, Any]) -> None:
+        if 'data' not in message:
+            # Responses to SUBSCRIBE have no data
+            if message.get('error'):
+                logger.warning(f'Binance kline stream error: {message}')
+            return
+
+        kline = message['data']['k']
+        # The stream sends the candle every couple of seconds, only the last update of a candle is closed
+        if not kline['x']:
+            return
+
+        symbol = self._symbols_by_alias.get(kline['s'])
+        interval = self._intervals_by_name.get(kline['i'])
+        if symbol is None or interval is None:
+            return
+
+        candle = Candle(
+            open_time=int(kline['t']),
+            open_price=float(kline['o']),
+            high=float(kline['h']),
+            low=float(kline['l']),
+            close=float(kline['c']),
+            volume=float(kline['v']),
+            close_time=int(kline['T']),
+        )
+
+        # The handler may go to REST, it should not hold the other candles
+        handler = asyncio.create_task(self._on_candle(symbol, interval, candle))
+        self._handlers.add(handler)
+        handler.add_done_callback(self._handlers.discard)
+
+    def _get_symbol_alias(self, symbol: Symbol) -> str:
+        return self.symbol_template.format(
+            base_currency=symbol.base_currency,
+            quote_currency=symbol.quote_currency,
+        )
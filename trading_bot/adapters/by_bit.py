@@ -1,11 +1,19 @@
+import asyncio
 import hashlib
 import hmac
 import time
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+from urllib.parse import urlsplit
 
-import requests
+import aiohttp
 
+from trading_bot import app
+from trading_bot.adapters.by_bit_stream import ByBitStream
+from trading_bot.adapters.http_session import create_session
+from trading_bot.adapters.request_coalescer import RequestCoalescer
+from trading_bot.adapters.resilience import PermanentError, RateLimitError, Resilience, RetryPolicy, TransientError
+from trading_bot.adapters.shared_state import SharedStateClient
 from trading_bot.models.symbols import Symbol
 from trading_bot.services.dealer import Deal
 from trading_bot.services.decision_maker import DealSide
@@ -14,33 +22,109 @@ logger = logging.getLogger('logger')
 
 
 class AdapterByBit:
+    rate_limit_codes = (10006, 10018)  # too many visits, exceeded the IP rate limit
+    expired_codes = (10002,)  # the timestamp is out of recv_window, the request was not processed
+    server_error_codes = (10016,)
+    # A new order is not sent again unless it surely did not reach the exchange, the rest may be repeated
+    retry_policies = {
+        '/v2/public/tickers': RetryPolicy(attempts=3, deadline=3),
+        '/private/linear/position/list': RetryPolicy(attempts=3, deadline=3),
+        '/private/linear/position/trading-stop': RetryPolicy(attempts=3, deadline=5),
+        '/private/linear/order/create': RetryPolicy(attempts=3, deadline=2, idempotent=False),
+    }
 
-    def __init__(self, api_key: str, api_secret: str) -> None:
+    def __init__(
+            self,
+            api_key: str,
+            api_secret: str,
+            timeout: float = 10,
+            stream: ByBitStream = None,
+            cache_ttl: float = 1,
+            prices_max_age: float = 1,
+            url: str = 'https://api-testnet.bybit.com/',
+            resilience: Resilience = None,
+            shared_state: SharedStateClient = None,
+    ) -> None:
         self._api_key = api_key
         self._api_secret = api_secret
+        self._timeout = timeout
+        self._stream = stream
+        # StopLossManager, PauseChecker, DecisionMaker and Dealer ask for the same symbols in the same cycle
+        self._coalescer = RequestCoalescer(ttl=cache_ttl)
+        # One snapshot of all tickers serves the prices of every symbol until it gets older than prices_max_age
+        self._prices = RequestCoalescer(ttl=prices_max_age)
+        self._session: Optional[aiohttp.ClientSession] = None
         self.symbol_template = '{base_currency}{quote_currency}'
-        self._url = 'https://api-testnet.bybit.com//'
+        self._url = url
+        self._resilience = resilience or Resilience('by_bit', policies=self.retry_policies)
+        # A shard takes the snapshots of all positions and tickers from the coordinator
+        self._shared_state = shared_state
+
+    async def open(self) -> None:
+        if self._session is None or self._session.closed:
+            self._session = create_session(timeout=self._timeout)
+        if self._stream is not None:
+            await self._stream.open()
+        if self._shared_state is not None:
+            await self._shared_state.open()
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        if self._stream is not None:
+            await self._stream.close()
+        if self._shared_state is not None:
+            await self._shared_state.close()
 
     async def get_current_price(
             self,
             symbol: Symbol,
     ) -> float:
+        alias = self._get_symbol_alias(symbol)
+        if self._stream is not None:
+            current_price = await self._stream.get_price(alias)
+            if current_price is not None:
+                return current_price
 
-        params = {
-            'symbol': self._get_symbol_alias(symbol),
-        }
-        url = f'{self._url}/v2/public/tickers'
-        response = requests.get(url, params=params)
-
-        resp = response.json()
-        if resp['ret_msg'] != 'OK':
-            logger.warning(f'ret_code: {resp["ret_code"]} msg: {resp["ret_msg"]}\n'
-                           f'{params}')
+        # A snapshot taken for the other symbols answers too, otherwise only this ticker is requested
+        current_prices = self._prices.get('tickers')
+        if current_prices is None or alias not in current_prices:
+            if self._shared_state is not None:
+                current_prices = await self.get_all_prices()
+            else:
+                current_prices = await self._prices.run(('ticker', alias), lambda: self._get_prices({'symbol': alias}))
+        if alias not in current_prices:
+            logger.warning(f'There is no {alias} in the tickers')
             raise Warning
 
-        current_price = float(resp['result'][0]['last_price'])
+        return current_prices[alias]
+
+    async def get_all_prices(self) -> Dict[str, float]:
+        if self._shared_state is not None:
+            return await self._prices.run('tickers', self._shared_state.get_all_prices)
+        return await self._prices.run('tickers', lambda: self._get_prices({}))
+
+    async def get_prices(self, aliases: List[str]) -> Dict[str, float]:
+        # The prices the stream does not know come from one REST snapshot
+        prices = {}
+        if self._stream is not None:
+            for alias in aliases:
+                price = await self._stream.get_price(alias)
+                if price is not None:
+                    prices[alias] = price
+
+        missing = [alias for alias in aliases if alias not in prices]
+        if missing:
+            all_prices = await self.get_all_prices()
+            prices.update({alias: all_prices[alias] for alias in missing if alias in all_prices})
+        return prices
 
-        return current_price
+    async def _get_prices(self, params: Dict[str, Any]) -> Dict[str, float]:
+        url = f'{self._url}v2/public/tickers'
+        resp = await self._request('GET', url, params)
+
+        return {ticker['symbol']: float(ticker['last_price']) for ticker in resp['result']}
 
     async def create_order(
             self,
@@ -68,13 +152,11 @@ class AdapterByBit:
         params['sign'] = self._sing_request_params(params)
 
         url = f'{self._url}private/linear/order/create'
-        response = requests.post(url, params=params)
-        resp = response.json()
-
-        if resp['ret_msg'] != 'OK':
-            logger.warning(f'ret_code: {resp["ret_code"]} msg: {resp["ret_msg"]}\n'
-                           f'{params}')
-            raise Warning
+        try:
+            await self._request('POST', url, params)
+        finally:
+            # Even a failed request may have reached the exchange
+            self.invalidate_positions(params['symbol'])
 
     def _get_symbol_alias(self, symbol: Symbol) -> str:
         return self.symbol_template.format(
@@ -95,22 +177,73 @@ class AdapterByBit:
         ).hexdigest()
 
     async def get_positions_by_symbol(self, symbol: Symbol) -> Dict[str, Any]:
+        alias = self._get_symbol_alias(symbol)
+        if self._stream is not None:
+            positions = self._stream.get_positions(alias)
+            if positions is not None:
+                # The same shape as the REST response, so Dealer does not care where it came from
+                return {'ret_code': 0, 'ret_msg': 'OK', 'result': positions}
+
+        return await self._coalescer.run(('positions', alias), lambda: self._get_positions(alias))
+
+    async def _get_positions(self, alias: str) -> Dict[str, Any]:
         timestamp_ms = int(time.time() * 1000.0)
         params = {
             'api_key': self._api_key,
-            'symbol': self._get_symbol_alias(symbol),
+            'symbol': alias,
             'timestamp': timestamp_ms,
         }
         params['sign'] = self._sing_request_params(params)
         url = f'{self._url}private/linear/position/list'
-        response = requests.get(url, params=params)
-        resp = response.json()
-        if resp['ret_msg'] != 'OK':
-            logger.warning(f'ret_code: {resp["ret_code"]} msg: {resp["ret_msg"]}\n'
-                           f'{params}')
-            raise Warning
+        resp = await self._request('GET', url, params)
+
+        if self._stream is not None:
+            self._stream.set_positions(alias, resp['result'])
         return resp
 
+    async def get_all_positions(self, aliases: List[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+        if self._stream is not None and aliases is not None:
+            positions = self._get_stream_positions(aliases)
+            if positions is not None:
+                return positions
+
+        if self._shared_state is not None:
+            return await self._coalescer.run(('positions', None), self._shared_state.get_all_positions)
+        return await self._coalescer.run(('positions', None), lambda: self._get_all_positions(aliases))
+
+    def _get_stream_positions(self, aliases: List[str]) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        # The book answers only when it has every alias, otherwise a symbol would look like it has no deals
+        positions = {}
+        for alias in aliases:
+            alias_positions = self._stream.get_positions(alias)
+            if alias_positions is None:
+                return None
+            if alias_positions:
+                positions[alias] = alias_positions
+        return positions
+
+    async def _get_all_positions(self, aliases: List[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+        timestamp_ms = int(time.time() * 1000.0)
+        params = {
+            'api_key': self._api_key,
+            'timestamp': timestamp_ms,
+        }
+        params['sign'] = self._sing_request_params(params)
+        url = f'{self._url}private/linear/position/list'
+        resp = await self._request('GET', url, params)
+
+        positions = {}
+        for item in resp['result']:
+            # Without a symbol every position comes wrapped together with its validity flag
+            position = item.get('data', item)
+            positions.setdefault(position['symbol'], []).append(position)
+
+        if self._stream is not None:
+            # Symbols without positions are seeded too, so the next snapshot can come from the book
+            for alias in set(positions) | set(aliases or []):
+                self._stream.set_positions(alias, positions.get(alias, []))
+        return positions
+
     async def set_stop_loss(self, deal: Deal, stop_loss: float) -> None:
         timestamp_ms = int(time.time() * 1000.0)
 
@@ -125,10 +258,69 @@ class AdapterByBit:
         params['sign'] = self._sing_request_params(params)
 
         url = f'{self._url}private/linear/position/trading-stop'
-        response = requests.post(url, params=params)
-        resp = response.json()
+        try:
+            await self._request('POST', url, params)
+        finally:
+            self.invalidate_positions(params['symbol'])
+
+    def invalidate_positions(self, alias: str) -> None:
+        self._coalescer.invalidate(('positions', alias))
+        self._coalescer.invalidate(('positions', None))
+        if self._stream is not None:
+            self._stream.invalidate_positions(alias)
+        if self._shared_state is not None:
+            self._shared_state.invalidate_positions(alias)
+
+    async def _request(self, method: str, url: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        endpoint = '/' + urlsplit(url).path.lstrip('/')
+        return await self._resilience.call(endpoint, lambda: self._send_request(method, url, endpoint, params))
+
+    async def _send_request(self, method: str, url: str, endpoint: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        await self.open()
+
+        if 'sign' in params:
+            # A retry may come after recv_window, so every attempt is signed with a fresh timestamp
+            params = {key: value for key, value in params.items() if key != 'sign'}
+            params['timestamp'] = int(time.time() * 1000.0)
+            params['sign'] = self._sing_request_params(params)
+
+        # The values are signed in their str() form, so they have to be sent the same way
+        query = {key: str(value) for key, value in params.items()}
+
+        try:
+            with app.metrics.timer('request_seconds', adapter='by_bit', endpoint=endpoint):
+                async with self._session.request(method, url, params=query) as response:
+                    resp = await response.json(content_type=None)
+        except aiohttp.ClientConnectorError as e:
+            app.metrics.inc('request_errors_total', adapter='by_bit', endpoint=endpoint)
+            logger.warning(f'{method} {url} failed: {e!r}\n'
+                           f'{params}')
+            raise TransientError(maybe_processed=False)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            # ValueError is an html page of a 5xx instead of json
+            app.metrics.inc('request_errors_total', adapter='by_bit', endpoint=endpoint)
+            logger.warning(f'{method} {url} failed: {e!r}\n'
+                           f'{params}')
+            raise TransientError
 
         if resp['ret_msg'] != 'OK':
+            app.metrics.inc('request_errors_total', adapter='by_bit', endpoint=endpoint)
             logger.warning(f'ret_code: {resp["ret_code"]} msg: {resp["ret_msg"]}\n'
                            f'{params}')
-            raise Warning
+            if resp['ret_code'] in self.rate_limit_codes:
+                app.metrics.inc('rate_limited_total', adapter='by_bit')
+                raise RateLimitError(retry_after=self._get_retry_after(resp))
+            if resp['ret_code'] in self.expired_codes:
+                raise TransientError(maybe_processed=False)
+            if resp['ret_code'] in self.server_error_codes:
+                raise TransientError
+            raise PermanentError
+
+        return resp
+
+    @staticmethod
+    def _get_retry_after(resp: Dict[str, Any]) -> Optional[float]:
+        reset_ms = resp.get('rate_limit_reset_ms')
+        if not reset_ms:
+            return None
+        return max(reset_ms / 1000 - time.time(), 0)
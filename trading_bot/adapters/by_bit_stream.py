@@ -0,0 +1,245 @@
+import asyncio
+import hashlib
+import hmac
+import logging
+import time
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+import aiohttp
+
+from trading_bot.adapters.http_session import create_session
+
+logger = logging.getLogger('logger')
+
+
+class ByBitStream:
+    # The getters return None when the stream can not answer, then AdapterByBit falls back to REST
+
+    position_fields = ('size', 'entry_price', 'stop_loss', 'take_profit')
+    # Pings are answered even when these fail, so the private stream is live only after both succeed
+    private_ops = ('auth', 'subscribe')
+
+    def __init__(
+            self,
+            api_key: str,
+            api_secret: str,
+            timeout: float = 10,
+            stale_after: float = 30,
+            ping_interval: float = 20,
+            reconnect_delay: float = 1,
+            max_reconnect_delay: float = 60,
+            public_url: str = 'wss://stream-testnet.bybit.com/realtime_public',
+            private_url: str = 'wss://stream-testnet.bybit.com/realtime_private',
+    ) -> None:
+        self._api_key = api_key
+        self._api_secret = api_secret
+        self._timeout = timeout
+        self._stale_after = stale_after
+        self._ping_interval = ping_interval
+        self._reconnect_delay = reconnect_delay
+        self._max_reconnect_delay = max_reconnect_delay
+        self._urls = {
+            'public': public_url,
+            'private': private_url,
+        }
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._tasks = []
+        self._connections = {}
+        self._last_messages = {}
+        self._confirmed: Dict[str, Set[str]] = {}  # connection -> ops accepted by ByBit
+        self._symbols = set()
+        self._prices: Dict[str, Tuple[float, float]] = {}  # alias -> (price, monotonic time of the update)
+        self._positions = {}
+
+    async def open(self) -> None:
+        if self._tasks:
+            return
+
+        self._session = create_session(timeout=self._timeout)
+        self._tasks = [
+            asyncio.create_task(self._run(name), name=f'ByBit {name} stream')
+            for name in self._urls
+        ]
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def get_price(self, alias: str) -> Optional[float]:
+        if alias not in self._symbols:
+            # Symbols are subscribed on the first request, this one is answered by REST
+            self._symbols.add(alias)
+            await self._send('public', {'op': 'subscribe', 'args': [self._ticker_topic(alias)]})
+            return None
+
+        if not self._is_live('public') or alias not in self._prices:
+            return None
+        # A ticker whose subscription stopped is stale even while the other tickers keep the connection busy
+        price, updated_at = self._prices[alias]
+        if time.monotonic() - updated_at >= self._stale_after:
+            return None
+        return price
+
+    def get_positions(self, alias: str) -> Optional[List[Dict[str, Any]]]:
+        if not self._is_live('private') or alias not in self._positions:
+            return None
+        return list(self._positions[alias].values())
+
+    def set_positions(self, alias: str, positions: List[Dict[str, Any]]) -> None:
+        # The stream sends only changes, so the positions of a symbol are seeded by a REST response
+        if self._is_live('private'):
+            self._positions[alias] = {position['side']: self._parse_position(position) for position in positions}
+
+    def invalidate_positions(self, alias: str) -> None:
+        self._positions.pop(alias, None)
+
+    async def _run(self, name: str) -> None:
+        delay = self._reconnect_delay
+        while True:
+            try:
+                async with self._session.ws_connect(self._urls[name]) as ws:
+                    self._connections[name] = ws
+                    self._last_messages[name] = time.monotonic()
+                    self._confirmed[name] = set()
+                    await self._on_connect(name)
+                    logger.info(f'ByBit {name} stream is connected')
+
+                    ping_task = asyncio.create_task(self._ping(name))
+                    try:
+                        async for message in ws:
+                            if message.type == aiohttp.WSMsgType.TEXT:
+                                self._last_messages[name] = time.monotonic()
+                                try:
+                                    self._handle_message(name, message.json())
+                                except (ValueError, KeyError, TypeError) as e:
+                                    logger.warning(f'I did not parse the message of ByBit {name} stream: {e!r}')
+                                if self._is_live(name):
+                                    delay = self._reconnect_delay
+                            elif message.type == aiohttp.WSMsgType.ERROR:
+                                break
+                    finally:
+                        ping_task.cancel()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.warning(f'ByBit {name} stream failed: {e!r}')
+            except Warning:
+                # Already logged by _handle_message
+                pass
+            except Exception as e:
+                # Whatever it is, the stream has to come back, otherwise the adapter silently polls REST forever
+                logger.exception(f'ByBit {name} stream failed unexpectedly: {e!r}')
+            finally:
+                self._connections.pop(name, None)
+                self._last_messages.pop(name, None)
+                self._confirmed.pop(name, None)
+                # Updates are lost while disconnected, so the book has to be filled again
+                if name == 'public':
+                    self._prices.clear()
+                else:
+                    self._positions.clear()
+
+            logger.warning(f'ByBit {name} stream is disconnected, reconnect in {delay}s')
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self._max_reconnect_delay)
+
+    async def _on_connect(self, name: str) -> None:
+        if name == 'public':
+            if self._symbols:
+                await self._send(name, {
+                    'op': 'subscribe',
+                    'args': [self._ticker_topic(alias) for alias in sorted(self._symbols)],
+                })
+        else:
+            expires = int((time.time() + 10) * 1000)
+            await self._send(name, {'op': 'auth', 'args': [self._api_key, expires, self._sign(expires)]})
+            await self._send(name, {'op': 'subscribe', 'args': ['position', 'order']})
+
+    async def _ping(self, name: str) -> None:
+        # ByBit drops connections without a ping for a minute
+        while True:
+            await asyncio.sleep(self._ping_interval)
+            await self._send(name, {'op': 'ping'})
+
+    async def _send(self, name: str, message: Dict[str, Any]) -> None:
+        ws = self._connections.get(name)
+        if ws is None or ws.closed:
+            # Everything is (re)subscribed on connect
+            return
+        try:
+            await ws.send_json(message)
+        except ConnectionResetError as e:
+            logger.warning(f'I did not send {message["op"]} to ByBit {name} stream: {e!r}')
+
+    def _handle_message(self, name: str, message: Dict[str, Any]) -> None:
+        topic = message.get('topic', '')
+
+        if topic.startswith('instrument_info'):
+            alias = topic.split('.')[-1]
+            if message.get('type') == 'snapshot':
+                updates = [message['data']]
+            else:
+                updates = message['data'].get('update', [])
+            for update in updates:
+                price = self._parse_price(update)
+                if price is not None:
+                    self._prices[alias] = (price, time.monotonic())
+
+        elif topic == 'position':
+            for position in message['data']:
+                # Positions of a symbol that was not seeded are incomplete, so they are skipped
+                if position['symbol'] in self._positions:
+                    self._positions[position['symbol']][position['side']] = self._parse_position(position)
+
+        elif topic == 'order':
+            # The position is going to change, until its update comes the book should not be trusted
+            for order in message['data']:
+                self.invalidate_positions(order['symbol'])
+
+        elif 'success' in message:
+            op = message.get('request', {}).get('op')
+            if message['success']:
+                self._confirmed[name].add(op)
+                return
+            logger.warning(f'ByBit {name} stream error: {message}')
+            if name == 'private' and op in self.private_ops:
+                # No position updates would come, so the seeded book would silently go stale
+                raise Warning
+
+    def _is_live(self, name: str) -> bool:
+        last_message = self._last_messages.get(name)
+        if name == 'private' and not set(self.private_ops) <= self._confirmed.get(name, set()):
+            return False
+        return last_message is not None and time.monotonic() - last_message < self._stale_after
+
+    def _sign(self, expires: int) -> str:
+        return hmac.new(
+            bytes(self._api_secret, 'utf-8'),
+            f'GET/realtime{expires}'.encode('utf-8'),
+            hashlib.sha256
+        ).hexdigest()
+
+    @staticmethod
+    def _ticker_topic(alias: str) -> str:
+        return f'instrument_info.100ms.{alias}'
+
+    @staticmethod
+    def _parse_price(update: Dict[str, Any]) -> Optional[float]:
+        if 'last_price' in update:
+            return float(update['last_price'])
+        if 'last_price_e4' in update:
+            return int(update['last_price_e4']) / 10000
+        return None
+
+    @classmethod
+    def _parse_position(cls, position: Dict[str, Any]) -> Dict[str, Any]:
+        # The stream sends numbers as strings, REST sends them as numbers
+        parsed = dict(position)
+        for field in cls.position_fields:
+            if field in parsed:
+                parsed[field] = float(parsed[field])
+        return parsed
@@ -0,0 +1,99 @@
+import glob
+import json
+import logging
+import os
+from typing import Dict, List
+
+import numpy as np
+
+from trading_bot.models.indicators import Indicator
+from trading_bot.models.symbols import Symbol
+
+logger = logging.getLogger('logger')
+
+
+class AdapterHistoryFiles:
+    # Monthly dumps of data.binance.vision ({symbol}-{interval}-*.csv) are joined together
+
+    def __init__(self, directory: str) -> None:
+        self._directory = directory
+        self.symbol_template = '{base_currency}{quote_currency}'
+
+    def has_candles(self, symbol: Symbol, interval: Indicator.Interval) -> bool:
+        return bool(self._find_files(symbol, interval))
+
+    def get_candles(self, symbol: Symbol, interval: Indicator.Interval) -> np.ndarray:
+        # Rows of (open_time, open, high, low, close, volume) sorted by open_time
+        files = self._find_files(symbol, interval)
+        if not files:
+            logger.warning(f'I did not find the history of {symbol} {interval.name} in {self._directory}')
+            raise Warning
+
+        candles = np.concatenate([self._read_file(file) for file in files])
+
+        # Newer binance dumps have timestamps in microseconds
+        candles[candles[:, 0] > 1e14, 0] //= 1000
+
+        _, unique_positions = np.unique(candles[:, 0], return_index=True)
+        return candles[unique_positions]
+
+    def _find_files(self, symbol: Symbol, interval: Indicator.Interval) -> List[str]:
+        pattern = os.path.join(self._directory, f'{self._get_symbol_alias(symbol)}-{interval.name}')
+        return sorted(glob.glob(f'{pattern}-*.csv') + glob.glob(f'{pattern}.csv') +
+                      glob.glob(f'{pattern}-*.json') + glob.glob(f'{pattern}.json'))
+
+    def _get_symbol_alias(self, symbol: Symbol) -> str:
+        return self.symbol_template.format(
+            base_currency=symbol.base_currency,
+            quote_currency=symbol.quote_currency,
+        )
+
+    @staticmethod
+    def _read_file(file: str) -> np.ndarray:
+        if file.endswith('.json'):
+            with open(file) as f:
+                rows: List[list] = json.load(f)
+            return np.array([row[:6] for row in rows], dtype=float).reshape(-1, 6)
+
+        with open(file) as f:
+            first_line = f.readline()
+        # Some dumps start with a header
+        skip_rows = 0 if first_line[:1].isdigit() else 1
+        return np.loadtxt(file, delimiter=',', usecols=range(6), skiprows=skip_rows, ndmin=2)
+
+
+class AdapterHistoryCache:
+    # Shared read-only between the processes of Optimizer
+
+    def __init__(self, candles: Dict[str, np.ndarray]) -> None:
+        self._candles = candles
+        for rows in self._candles.values():
+            rows.setflags(write=False)
+
+    @classmethod
+    def load(
+            cls,
+            history_adapter: AdapterHistoryFiles,
+            symbols: List[Symbol],
+            intervals: List[Indicator.Interval],
+    ) -> 'AdapterHistoryCache':
+        candles = {}
+        for symbol in symbols:
+            for interval in intervals:
+                if history_adapter.has_candles(symbol, interval):
+                    candles[cls._key(symbol, interval)] = history_adapter.get_candles(symbol, interval)
+        return cls(candles)
+
+    def has_candles(self, symbol: Symbol, interval: Indicator.Interval) -> bool:
+        return self._key(symbol, interval) in self._candles
+
+    def get_candles(self, symbol: Symbol, interval: Indicator.Interval) -> np.ndarray:
+        candles = self._candles.get(self._key(symbol, interval))
+        if candles is None:
+            logger.warning(f'There is no history of {symbol} {interval.name} in memory')
+            raise Warning
+        return candles
+
+    @staticmethod
+    def _key(symbol: Symbol, interval: Indicator.Interval) -> str:
+        return f'{symbol.name}_{interval.name}'
@@ -0,0 +1,18 @@
+import aiohttp
+
+
+def create_session(
+        timeout: float,
+        connections_limit: int = 100,
+        dns_cache_ttl: int = 300,
+        keepalive_timeout: float = 30,
+) -> aiohttp.ClientSession:
+    connector = aiohttp.TCPConnector(
+        limit=connections_limit,
+        ttl_dns_cache=dns_cache_ttl,
+        keepalive_timeout=keepalive_timeout,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=timeout),
+    )
@@ -0,0 +1,75 @@
+import logging
+import sqlite3
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from trading_bot.models.indicator_values import IndicatorValue
+
+logger = logging.getLogger('logger')
+
+
+class IndicatorValueStore:
+    # A restarted bot does not fetch all the indicator values again
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._connection: Optional[sqlite3.Connection] = None
+
+    async def open(self) -> None:
+        if self._connection is not None:
+            return
+
+        self._connection = sqlite3.connect(self._path)
+        # WAL lets a snapshot be written without blocking the reads, NORMAL does not sync every commit
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS indicator_values ('
+            'indicator TEXT NOT NULL, '
+            'symbol TEXT NOT NULL, '
+            'history BLOB NOT NULL, '
+            'updated_at REAL NOT NULL, '
+            'PRIMARY KEY (indicator, symbol))'
+        )
+        self._connection.commit()
+
+    async def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def save(self, indicator_values: List[IndicatorValue]) -> None:
+        # A few hundred rows in one transaction take a couple of milliseconds, so the event loop is not bothered
+        rows = [
+            (
+                indicator_value.indicator.name,
+                indicator_value.symbol.name,
+                indicator_value.history.last(indicator_value.history.size).tobytes(),
+                indicator_value.updated_at.timestamp(),
+            )
+            for indicator_value in indicator_values
+        ]
+        try:
+            with self._connection:
+                self._connection.executemany('INSERT OR REPLACE INTO indicator_values VALUES (?, ?, ?, ?)', rows)
+        except sqlite3.Error as e:
+            logger.warning(f'I did not save indicator values to {self._path}: {e!r}')
+            raise Warning
+
+    def load(self) -> List[Dict[str, Any]]:
+        try:
+            rows = self._connection.execute('SELECT indicator, symbol, history, updated_at FROM indicator_values')
+            return [
+                {
+                    'indicator': indicator,
+                    'symbol': symbol,
+                    'history': np.frombuffer(history, dtype=np.float64).tolist(),
+                    'updated_at': datetime.fromtimestamp(updated_at),
+                }
+                for indicator, symbol, history, updated_at in rows
+            ]
+        except sqlite3.Error as e:
+            logger.warning(f'I did not load indicator values from {self._path}: {e!r}')
+            raise Warning
@@ -0,0 +1,38 @@
+import logging
+from typing import Optional
+
+from aiohttp import web
+
+from trading_bot.services.metrics import Metrics
+
+logger = logging.getLogger('logger')
+
+
+class MetricsServer:
+    def __init__(self, metrics: Metrics, host: str = '127.0.0.1', port: int = 9100) -> None:
+        self._metrics = metrics
+        self._host = host
+        self._port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    async def open(self) -> None:
+        if self._runner is not None:
+            return
+
+        web_app = web.Application()
+        web_app.router.add_get('/metrics', self._handle_metrics)
+        self._runner = web.AppRunner(web_app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self._host, self._port).start()
+        logger.info(f'I serve metrics on http://{self._host}:{self._port}/metrics')
+
+    async def close(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(
+            body=self._metrics.render().encode('utf-8'),
+            headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'},
+        )
@@ -0,0 +1,38 @@
+import asyncio
+import time
+from typing import Optional
+
+
+class TokenBucket:
+
+    def __init__(self, rate_limit: int, window: float, burst: int = None) -> None:
+        self._capacity = burst or rate_limit
+        self._refill_rate = rate_limit / window if window else 0  # tokens per second, 0 means no limit
+        self._tokens = float(self._capacity)
+        self._updated_at = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def acquire(self) -> float:
+        # Returns the seconds it waited for the token
+        if not self._refill_rate:
+            return 0
+
+        # asyncio primitives are created on first use, so they belong to the loop they are used in.
+        # Waiters hold it while sleeping, so the tokens are handed out in FIFO order.
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        started_at = time.monotonic()
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return time.monotonic() - started_at
+
+                await asyncio.sleep((1 - self._tokens) / self._refill_rate)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self._capacity, self._tokens + (now - self._updated_at) * self._refill_rate)
+        self._updated_at = now
@@ -0,0 +1,51 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class RequestCoalescer:
+    # Callers of the same key share the request in flight and its result for ttl seconds, a failure is not cached
+
+    def __init__(self, ttl: float = 1) -> None:
+        self._ttl = ttl
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self._cache: Dict[Hashable, Tuple[float, Any]] = {}
+        self._generations: Dict[Hashable, int] = {}
+
+    async def run(self, key: Hashable, request: Callable[[], Awaitable[Any]]) -> Any:
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+
+        future = self._in_flight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._request(key, request))
+            self._in_flight[key] = future
+
+        # Shielded, so a cancelled caller does not cancel the request of the others
+        return await asyncio.shield(future)
+
+    def get(self, key: Hashable) -> Any:
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+        return None
+
+    def invalidate(self, key: Hashable) -> None:
+        # The request in flight may have been answered before the change, so its result is not cached
+        # and the next caller sends a new one
+        self._generations[key] = self._generations.get(key, 0) + 1
+        self._cache.pop(key, None)
+        self._in_flight.pop(key, None)
+
+    async def _request(self, key: Hashable, request: Callable[[], Awaitable[Any]]) -> Any:
+        generation = self._generations.get(key, 0)
+        try:
+            result = await request()
+        finally:
+            if self._generations.get(key, 0) == generation:
+                self._in_flight.pop(key, None)
+
+        if self._ttl and self._generations.get(key, 0) == generation:
+            self._cache[key] = (time.monotonic() + self._ttl, result)
+        return result
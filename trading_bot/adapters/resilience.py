@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from trading_bot import app
+
+logger = logging.getLogger('logger')
+
+
+class AdapterError(Warning):
+    # A Warning, so the callers catching Warning keep working
+    pass
+
+
+class TransientError(AdapterError):
+    # maybe_processed is False when the request surely did not reach the server
+
+    def __init__(self, maybe_processed: bool = True) -> None:
+        super().__init__()
+        self.maybe_processed = maybe_processed
+
+
+class RateLimitError(TransientError):
+    def __init__(self, retry_after: float = None) -> None:
+        # A request over the limit is rejected before it is processed
+        super().__init__(maybe_processed=False)
+        self.retry_after = retry_after
+
+
+class PermanentError(AdapterError):
+    # Sending the same request again does not help
+    pass
+
+
+class CircuitOpenError(AdapterError):
+    pass
+
+
+class RetryPolicy:
+
+    def __init__(
+            self,
+            attempts: int = 3,
+            base_delay: float = 0.2,
+            max_delay: float = 5,
+            deadline: float = 10,
+            idempotent: bool = True,
+    ) -> None:
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline  # seconds for all the attempts together
+        self.idempotent = idempotent
+
+    def get_delay(self, attempt: int) -> float:
+        # Full jitter, so the requests failed together do not come back together
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+class CircuitBreaker:
+    closed = 0
+    half_open = 1
+    open = 2
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30) -> None:
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False
+
+    @property
+    def state(self) -> int:
+        if self.opened_at is None:
+            return self.closed
+        if time.monotonic() - self.opened_at >= self._reset_timeout:
+            return self.half_open
+        return self.open
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == self.closed:
+            return True
+        # After reset_timeout one request checks whether the endpoint is back
+        if state == self.half_open and not self._trial:
+            self._trial = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    def record_failure(self) -> bool:
+        # True when the failure opened the circuit
+        self.failures += 1
+        was_open = self.opened_at is not None
+        if self._trial or self.failures >= self._failure_threshold:
+            self.opened_at = time.monotonic()
+            self._trial = False
+            return not was_open
+        return False
+
+    def release(self) -> None:
+        # A trial request that neither succeeded nor failed lets the next one through
+        self._trial = False
+
+
+class Resilience:
+    def __init__(
+            self,
+            adapter: str,
+            policies: Dict[str, RetryPolicy] = None,
+            default_policy: RetryPolicy = None,
+            failure_threshold: int = 5,
+            reset_timeout: float = 30,
+    ) -> None:
+        self._adapter = adapter
+        self._policies = policies or {}
+        self._default_policy = default_policy or RetryPolicy()
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    async def call(self, endpoint: str, request: Callable[[], Awaitable[Any]]) -> Any:
+        policy = self._policies.get(endpoint, self._default_policy)
+        breaker = self._get_breaker(endpoint)
+        started_at = time.monotonic()
+
+        for attempt in range(policy.attempts):
+            if not breaker.allow():
+                logger.warning(f'{self._adapter} {endpoint} is failing, I did not send the request')
+                raise CircuitOpenError
+
+            try:
+                result = await request()
+            except PermanentError:
+                # The endpoint answered, it is the request that is wrong
+                breaker.record_success()
+                self._set_state(endpoint, breaker)
+                raise
+            except TransientError as e:
+                if breaker.record_failure():
+                    logger.warning(f'{self._adapter} {endpoint} failed {breaker.failures} times in a row, '
+                                   f'I stop sending requests for {self._reset_timeout}s')
+                self._set_state(endpoint, breaker)
+
+                if attempt + 1 == policy.attempts or (e.maybe_processed and not policy.idempotent):
+                    raise
+
+                delay = policy.get_delay(attempt)
+                if isinstance(e, RateLimitError) and e.retry_after is not None:
+                    delay = max(delay, e.retry_after)
+                if time.monotonic() - started_at + delay > policy.deadline:
+                    raise
+
+                app.metrics.inc('retries_total', adapter=self._adapter, endpoint=endpoint)
+                logger.info(f'I will retry {self._adapter} {endpoint} in {delay:.2f}s')
+                await asyncio.sleep(delay)
+            else:
+                breaker.record_success()
+                self._set_state(endpoint, breaker)
+                return result
+            finally:
+                breaker.release()
+
+    def get_state(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            endpoint: {'state': breaker.state, 'failures': breaker.failures}
+            for endpoint, breaker in self._breakers.items()
+        }
+
+    def _get_breaker(self, endpoint: str) -> CircuitBreaker:
+        if endpoint not in self._breakers:
+            self._breakers[endpoint] = CircuitBreaker(self._failure_threshold, self._reset_timeout)
+        return self._breakers[endpoint]
+
+    def _set_state(self, endpoint: str, breaker: CircuitBreaker) -> None:
+        app.metrics.set('circuit_state', breaker.state, adapter=self._adapter, endpoint=endpoint)
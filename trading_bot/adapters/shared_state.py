@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List, Optional, Set, TYPE_CHECKING
+
+import aiohttp
+from aiohttp import web
+
+if TYPE_CHECKING:
+    from trading_bot import AdapterByBit
+
+logger = logging.getLogger('logger')
+
+
+class SharedStateServer:
+    # The coordinator is the only process asking ByBit for the snapshots
+
+    def __init__(self, deals_adapter: AdapterByBit, path: str) -> None:
+        self._deals_adapter = deals_adapter
+        self._path = path
+        self._runner: Optional[web.AppRunner] = None
+
+    async def open(self) -> None:
+        if self._runner is not None:
+            return
+
+        # A socket left by a killed coordinator would not let the site start
+        if os.path.exists(self._path):
+            os.remove(self._path)
+
+        web_app = web.Application()
+        web_app.router.add_get('/positions', self._handle_positions)
+        web_app.router.add_get('/tickers', self._handle_tickers)
+        self._runner = web.AppRunner(web_app, access_log=None)
+        await self._runner.setup()
+        await web.UnixSite(self._runner, self._path).start()
+        logger.info(f'I serve positions and tickers to the shards on {self._path}')
+
+    async def close(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle_positions(self, request: web.Request) -> web.Response:
+        # A shard that has just sent an order must not get the positions from before it
+        for alias in filter(None, request.query.get('invalidate', '').split(',')):
+            self._deals_adapter.invalidate_positions(alias)
+        return await self._respond(self._deals_adapter.get_all_positions)
+
+    async def _handle_tickers(self, request: web.Request) -> web.Response:
+        return await self._respond(self._deals_adapter.get_all_prices)
+
+    @staticmethod
+    async def _respond(get_snapshot) -> web.Response:
+        try:
+            return web.json_response({'result': await get_snapshot()})
+        except Warning:
+            return web.json_response({'result': None}, status=502)
+
+
+class SharedStateClient:
+    def __init__(self, path: str, timeout: float = 10) -> None:
+        self._path = path
+        self._timeout = timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._invalidated: Set[str] = set()
+
+    async def open(self) -> None:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.UnixConnector(path=self._path),
+                timeout=aiohttp.ClientTimeout(total=self._timeout),
+            )
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def get_all_positions(self) -> Dict[str, List[Dict[str, Any]]]:
+        invalidated, self._invalidated = self._invalidated, set()
+        try:
+            return await self._get('positions', {'invalidate': ','.join(sorted(invalidated))})
+        except Warning:
+            # The next request has to refresh them
+            self._invalidated |= invalidated
+            raise
+
+    async def get_all_prices(self) -> Dict[str, float]:
+        return await self._get('tickers', {})
+
+    def invalidate_positions(self, alias: str) -> None:
+        self._invalidated.add(alias)
+
+    async def _get(self, name: str, params: Dict[str, str]) -> Any:
+        await self.open()
+        try:
+            # The host is ignored, the connector goes to the socket
+            async with self._session.get(f'http://coordinator/{name}', params=params) as response:
+                resp = await response.json()
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logger.warning(f'I did not get {name} from the coordinator: {e!r}')
+            raise Warning
+
+        if response.status != 200:
+            logger.warning(f'The coordinator did not get {name} from ByBit')
+            raise Warning
+
+        return resp['result']
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import random
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+logger = logging.getLogger('logger')
+
+
+class StandInServer:
+    # taapi, ByBit and telegram under /ta_api/, /by_bit/ and /telegram/, so the bot can be measured offline
+
+    def __init__(
+            self,
+            host: str = '127.0.0.1',
+            port: int = 0,
+            latency: float = 0,
+            jitter: float = 0,
+            error_rate: float = 0,
+            seed: int = None,
+    ) -> None:
+        self._host = host
+        self._port = port
+        self._latency = latency
+        self._jitter = jitter
+        self._error_rate = error_rate
+        self._random = random.Random(seed)
+        self._runner: Optional[web.AppRunner] = None
+        self.requests = Counter()
+        self.prices: Dict[str, float] = {}
+        self.positions: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def url(self) -> str:
+        return f'http://{self._host}:{self._port}'
+
+    async def open(self) -> None:
+        if self._runner is not None:
+            return
+
+        web_app = web.Application()
+        # ByBit urls may come with a double slash, so the path is matched by hand
+        web_app.router.add_route('*', '/{service}/{path:.*}', self._handle)
+        self._runner = web.AppRunner(web_app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self._host, self._port)
+        await site.start()
+        # With port 0 the system picks a free one
+        self._port = self._runner.addresses[0][1]
+
+    async def close(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        service = request.match_info['service']
+        path = request.match_info['path'].strip('/')
+        self.requests[service] += 1
+
+        await asyncio.sleep(self._latency + self._random.random() * self._jitter)
+
+        fail = self._random.random() < self._error_rate
+        if service == 'ta_api':
+            if fail:
+                return web.json_response({'error': 'stand-in error'}, status=500)
+            if path == 'bulk':
+                return web.json_response(self._ta_api_bulk(await request.json()))
+            return web.json_response(self._ta_api_values(int(request.query.get('backtracks', 2))))
+
+        if service == 'by_bit':
+            if fail:
+                return web.json_response({'ret_code': 10006, 'ret_msg': 'too many visits'})
+            return web.json_response({'ret_code': 0, 'ret_msg': 'OK', 'result': self._by_bit(path, request.query)})
+
+        if service == 'telegram':
+            if fail:
+                return web.json_response({'ok': False, 'error_code': 500, 'description': 'stand-in error'})
+            return web.json_response({'ok': True, 'result': {}})
+
+        return web.json_response({}, status=404)
+
+    def _value(self) -> float:
+        # Around one, so the conditions comparing the indicators come true now and then
+        return round(self._random.uniform(0.9, 1.1), 4)
+
+    def _ta_api_values(self, backtracks: int) -> List[Dict[str, float]]:
+        return [{'value': self._value(), 'backtrack': backtrack} for backtrack in range(backtracks)]
+
+    def _ta_api_bulk(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'data': [
+                {'id': calculation['id'], 'result': {'value': self._value()}, 'errors': []}
+                for calculation in payload['construct']['indicators']
+            ]
+        }
+
+    def _by_bit(self, path: str, query: Dict[str, str]) -> Any:
+        if path == 'v2/public/tickers':
+            return [
+                {'symbol': alias, 'last_price': str(price)}
+                for alias, price in self.prices.items() if query.get('symbol', alias) == alias
+            ]
+
+        if path == 'private/linear/position/list':
+            if 'symbol' in query:
+                return [self._position(query['symbol'])]
+            return [{'is_valid': True, 'data': self._position(alias)} for alias in self.prices]
+
+        if path == 'private/linear/order/create':
+            position = self._position(query['symbol'])
+            if position['size']:
+                position['size'] = 0
+            else:
+                position.update(
+                    side=query['side'],
+                    size=float(query['qty']),
+                    entry_price=self.prices.get(query['symbol'], 0),
+                    stop_loss=float(query['stop_loss']),
+                )
+            return {}
+
+        if path == 'private/linear/position/trading-stop':
+            self._position(query['symbol'])['stop_loss'] = float(query['stop_loss'])
+            return {}
+
+        return {}
+
+    def _position(self, alias: str) -> Dict[str, Any]:
+        if alias not in self.positions:
+            self.positions[alias] = {
+                'symbol': alias,
+                'side': 'Buy',
+                'size': 0,
+                'entry_price': 0,
+                'stop_loss': 0,
+                'take_profit': 0,
+            }
+        return self.positions[alias]
@@ -1,9 +1,15 @@
 import asyncio
 import logging
-from typing import Dict, List
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional, Any, Tuple, Union
 
-import requests
+import aiohttp
 
+from trading_bot import app
+from trading_bot.adapters.http_session import create_session
+from trading_bot.adapters.rate_limiter import TokenBucket
+from trading_bot.adapters.resilience import PermanentError, RateLimitError, Resilience, RetryPolicy, TransientError
 from trading_bot.models.indicators import Indicator
 from trading_bot.models.symbols import Symbol
 
@@ -11,12 +17,29 @@ logger = logging.getLogger('logger')
 
 
 class AdapterTaAPI:
+    # taapi calculates for a while, a missed value waits for the next candle, so it is worth a longer deadline
+    default_retry_policy = RetryPolicy(attempts=3, base_delay=0.5, deadline=30)
 
-    def __init__(self, api_key: str, timeout: int) -> None:
+    def __init__(
+            self,
+            api_key: str,
+            timeout: int,
+            rate_limit: int = 1,
+            burst: int = None,
+            request_timeout: float = 30,
+            bulk_limit: int = 20,
+            url: str = 'https://api.taapi.io/',
+            resilience: Resilience = None,
+    ) -> None:
         self._api_key = api_key
-        self._timeout = timeout
+        # The plan allows rate_limit requests per timeout seconds, burst of them at once
+        self._rate_limiter = TokenBucket(rate_limit=rate_limit, window=timeout, burst=burst)
+        self._request_timeout = request_timeout
+        self._bulk_limit = bulk_limit  # calculations per bulk construct allowed by the plan
+        self._session: Optional[aiohttp.ClientSession] = None
         self._symbol_template = '{base_currency}/{quote_currency}'
-        self._url = 'https://api.taapi.io/'
+        self._url = url
+        self._resilience = resilience or Resilience('ta_api', default_policy=self.default_retry_policy)
         self._endpoints = {
             'Momentum': 'mom',
             'MovingAverage': 'ma',
@@ -24,37 +47,192 @@ class AdapterTaAPI:
             'ADX': 'adx',
         }
 
+    async def open(self) -> None:
+        if self._session is None or self._session.closed:
+            self._session = create_session(timeout=self._request_timeout)
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
     async def get_indicator_values(
             self, symbol: Symbol,
             indicator: Indicator
     ) -> Dict[str, float]:
 
-        await asyncio.sleep(self._timeout)
-
         params = {
             'secret': self._api_key,
             'exchange': 'binance',
             'symbol': self._get_symbol_alias(symbol),
             'interval': indicator.interval.name,
             'backtrack': 1,  # closed candles only
-            'backtracks': 2,
+            'backtracks': self._get_backtracks(symbol, indicator),
         }
 
         for param in indicator.optional:
             params[param] = indicator.optional[param]
 
-        url = f'{self._url}{self._endpoints.get(indicator.indicator_type)}'
-        response = requests.get(url, params=params)
-        if response.status_code != 200:
-            logger.warning(f'{symbol} {response.text}\n'
-                           f'{indicator}')
-            raise Warning
+        endpoint = self._endpoints.get(indicator.indicator_type)
+        response_json = await self._resilience.call(
+            endpoint,
+            lambda: self._request('GET', endpoint, symbol, indicator, params=params),
+        )
 
-        resp = self._parse_response(response=response.json())
+        resp = self._parse_response(response=response_json)
         logger.info(f'{symbol} {indicator} {resp}')
 
         return resp
 
+    async def get_bulk_indicator_values(
+            self,
+            symbol: Symbol,
+            indicators: List[Indicator],
+    ) -> Dict[Indicator, Dict[str, float]]:
+        # Every indicator takes a calculation per value (two for the present and the previous one),
+        # so one construct holds as many indicators as fit into bulk_limit calculations
+        backtracks = {indicator: self._get_backtracks(symbol, indicator) for indicator in indicators}
+        chunks = []
+        chunk, calculations = [], 0
+        for indicator in indicators:
+            if chunk and calculations + backtracks[indicator] > self._bulk_limit:
+                chunks.append(chunk)
+                chunk, calculations = [], 0
+            chunk.append(indicator)
+            calculations += backtracks[indicator]
+        if chunk:
+            chunks.append(chunk)
+
+        results = await asyncio.gather(*(self._get_bulk_chunk(symbol, chunk, backtracks) for chunk in chunks))
+
+        indicator_values = {}
+        for result in results:
+            indicator_values.update(result)
+
+        return indicator_values
+
+    async def _get_bulk_chunk(
+            self,
+            symbol: Symbol,
+            indicators: List[Indicator],
+            backtracks: Dict[Indicator, int],
+    ) -> Dict[Indicator, Dict[str, float]]:
+
+        calculations = []
+        for indicator in indicators:
+            for value_name, backtrack in self._value_names(backtracks[indicator]):
+                calculation = {
+                    'id': f'{indicator.name}.{value_name}',
+                    'indicator': self._endpoints.get(indicator.indicator_type),
+                    'backtrack': backtrack,
+                }
+                calculation.update(indicator.optional)
+                calculations.append(calculation)
+
+        payload = {
+            'secret': self._api_key,
+            'construct': {
+                'exchange': 'binance',
+                'symbol': self._get_symbol_alias(symbol),
+                'interval': indicators[0].interval.name,
+                'indicators': calculations,
+            },
+        }
+
+        response_json = await self._resilience.call(
+            'bulk',
+            lambda: self._request('POST', 'bulk', symbol, indicators, json=payload),
+        )
+
+        resp = self._parse_bulk_response(response=response_json, indicators=indicators)
+        logger.info(f'{symbol} {resp}')
+
+        return resp
+
+    async def _request(
+            self,
+            method: str,
+            endpoint: str,
+            symbol: Symbol,
+            indicators: Union[Indicator, List[Indicator]],
+            **kwargs: Any,
+    ) -> Any:
+        # Every attempt takes its own token, a retry is a request for the plan too
+        await self._acquire()
+        await self.open()
+
+        send = self._session.get if method == 'GET' else self._session.post
+        try:
+            with app.metrics.timer('request_seconds', adapter='ta_api', endpoint=endpoint):
+                async with send(f'{self._url}{endpoint}', **kwargs) as response:
+                    return await self._read_response(response, symbol, indicators)
+        except Warning:
+            app.metrics.inc('request_errors_total', adapter='ta_api', endpoint=endpoint)
+            raise
+        except aiohttp.ClientConnectorError as e:
+            app.metrics.inc('request_errors_total', adapter='ta_api', endpoint=endpoint)
+            logger.warning(f'{symbol} {e!r}\n'
+                           f'{indicators}')
+            raise TransientError(maybe_processed=False)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            app.metrics.inc('request_errors_total', adapter='ta_api', endpoint=endpoint)
+            logger.warning(f'{symbol} {e!r}\n'
+                           f'{indicators}')
+            raise TransientError
+
+    async def _acquire(self) -> None:
+        waited = await self._rate_limiter.acquire()
+        if waited:
+            app.metrics.observe('rate_limit_wait_seconds', waited, adapter='ta_api')
+
+    @staticmethod
+    def _get_backtracks(symbol: Symbol, indicator: Indicator) -> int:
+        # The older values are fetched once to seed the history, then every candle appends its value to it
+        indicator_value = app.indicator_value_manager.get(indicator, symbol)
+        if indicator_value is not None and not indicator_value.needs_history(datetime.now()):
+            return 2
+        return max(indicator.history_size, 2)
+
+    @staticmethod
+    def _value_names(backtracks: int) -> List[Tuple[str, int]]:
+        # Backtrack 0 is the open candle, so the closed ones start from 1
+        value_names = [('present_value', 1), ('previous_value', 2)]
+        for backtrack in range(3, backtracks + 1):
+            value_names.append((f'value[-{backtrack}]', backtrack))
+        return value_names
+
+    @staticmethod
+    async def _read_response(
+            response: aiohttp.ClientResponse,
+            symbol: Symbol,
+            indicators: Union[Indicator, List[Indicator]],
+    ) -> Any:
+        if response.status != 200:
+            logger.warning(f'{symbol} {await response.text()}\n'
+                           f'{indicators}')
+            if response.status == 429:
+                app.metrics.inc('rate_limited_total', adapter='ta_api')
+                raise RateLimitError(retry_after=AdapterTaAPI._get_retry_after(response.headers.get('Retry-After')))
+            if response.status >= 500:
+                raise TransientError
+            raise PermanentError
+
+        return await response.json(content_type=None)
+
+    @staticmethod
+    def _get_retry_after(value: Optional[str]) -> Optional[float]:
+        # Retry-After is either seconds or an HTTP date, None falls back to the default backoff
+        if not value:
+            return None
+        try:
+            return max(float(value), 0)
+        except ValueError:
+            pass
+        try:
+            return max((parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds(), 0)
+        except (TypeError, ValueError):
+            return None
+
     def _get_symbol_alias(self, symbol: Symbol) -> str:
         return self._symbol_template.format(
             base_currency=symbol.base_currency,
@@ -64,18 +242,48 @@ class AdapterTaAPI:
     @staticmethod
     def _parse_response(response: List[Dict[str, float]]) -> Dict[str, float]:
 
-        present_value = 0
-        previous_value = 0
+        values = {item.get('backtrack'): item.get('value') for item in response}
 
-        for item in response:
-            backtrack = item.get('backtrack')
+        parsed_response = {
+            'present_value': values.get(0, 0),
+            'previous_value': values.get(1, 0),
+        }
+        # With more backtracks the older values fill the history, the present value goes last
+        if len(values) > 2:
+            parsed_response['history'] = [values[backtrack] for backtrack in sorted(values, reverse=True)]
+        return parsed_response
 
-            if backtrack == 0:
-                present_value = item.get('value')
-            elif backtrack == 1:
-                previous_value = item.get('value')
+    @classmethod
+    def _parse_bulk_response(
+            cls,
+            response: Dict[str, Any],
+            indicators: List[Indicator],
+    ) -> Dict[Indicator, Dict[str, float]]:
 
-        return {
-            'present_value': present_value,
-            'previous_value': previous_value,
-        }
+        calculations = {}
+        for item in response.get('data', []):
+            if item.get('errors'):
+                logger.warning(f'{item.get("id")} {item.get("errors")}')
+                continue
+            calculations[item.get('id')] = item.get('result', {}).get('value')
+
+        indicator_values = {}
+        for indicator in indicators:
+            present_value = calculations.get(f'{indicator.name}.present_value')
+            previous_value = calculations.get(f'{indicator.name}.previous_value')
+
+            # Half a pair is useless for the conditions, so such indicator is skipped
+            if present_value is not None and previous_value is not None:
+                indicator_values[indicator] = {
+                    'present_value': present_value,
+                    'previous_value': previous_value,
+                }
+
+                history = [
+                    calculations.get(f'{indicator.name}.{value_name}')
+                    for value_name, _ in reversed(cls._value_names(max(indicator.history_size, 2)))
+                ]
+                if len(history) > 2 and None not in history:
+                    indicator_values[indicator]['history'] = history
+
+        return indicator_values
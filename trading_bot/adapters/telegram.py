@@ -1,12 +1,149 @@
-import telebot
+import asyncio
+import logging
+from typing import List, Optional
+
+import aiohttp
+
+from trading_bot import app
+from trading_bot.adapters.http_session import create_session
+from trading_bot.adapters.rate_limiter import TokenBucket
+
+logger = logging.getLogger('logger')
 
 
 class AdapterTelegram:
+    # The messages put within flush_interval are sent as one, the queue is drained on close
 
-    def __init__(self, token: str, chat_id: str) -> None:
+    max_message_length = 4096
+
+    def __init__(
+            self,
+            token: str,
+            chat_id: str,
+            timeout: float = 10,
+            flush_interval: float = 1,
+            queue_size: int = 1000,
+            rate_limit: int = 1,
+            window: float = 1,
+            retry_delay: float = 1,
+            max_retry_delay: float = 60,
+            max_retries: int = 5,
+            drain_timeout: float = 10,
+            url: str = 'https://api.telegram.org',
+    ) -> None:
         self._token = token
         self._chat_id = chat_id
-        self._bot = telebot.TeleBot(self._token)
+        self._timeout = timeout
+        self._flush_interval = flush_interval
+        self._queue_size = queue_size
+        # telegram allows about one message per second to a chat
+        self._rate_limiter = TokenBucket(rate_limit=rate_limit, window=window)
+        self._retry_delay = retry_delay
+        self._max_retry_delay = max_retry_delay
+        self._max_retries = max_retries
+        self._drain_timeout = drain_timeout
+        self._url = f'{url}/bot{token}/sendMessage'
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._sender: Optional[asyncio.Task] = None
+
+    async def open(self) -> None:
+        self._open_session()
+        self._start_sender()
+
+    async def close(self) -> None:
+        if self._sender is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), self._drain_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f'I did not send {self._queue.qsize()} messages to telegram before the shutdown')
+            self._sender.cancel()
+            await asyncio.gather(self._sender, return_exceptions=True)
+            self._sender = None
+
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
 
     async def notify(self, msg: str) -> None:
-        self._bot.send_message(self._chat_id, msg)
+        self._start_sender()
+        try:
+            self._queue.put_nowait(msg)
+        except asyncio.QueueFull:
+            logger.warning(f'The telegram queue is full, I did not send the message: {msg}')
+
+    def _open_session(self) -> None:
+        if self._session is None or self._session.closed:
+            self._session = create_session(timeout=self._timeout)
+
+    def _start_sender(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self._queue_size)
+        if self._sender is None:
+            self._sender = asyncio.create_task(self._send_messages(), name='Telegram notifier')
+
+    async def _send_messages(self) -> None:
+        while True:
+            messages = [await self._queue.get()]
+            await asyncio.sleep(self._flush_interval)
+            while not self._queue.empty():
+                messages.append(self._queue.get_nowait())
+
+            try:
+                for text in self._join_messages(messages):
+                    await self._send(text)
+            finally:
+                for _ in messages:
+                    self._queue.task_done()
+
+    def _join_messages(self, messages: List[str]) -> List[str]:
+        texts = []
+        text = ''
+        for msg in messages:
+            for start in range(0, max(len(msg), 1), self.max_message_length):
+                part = msg[start:start + self.max_message_length]
+                if text and len(text) + len(part) + 2 <= self.max_message_length:
+                    text = f'{text}\n\n{part}'
+                else:
+                    if text:
+                        texts.append(text)
+                    text = part
+        if text:
+            texts.append(text)
+
+        return texts
+
+    async def _send(self, text: str) -> None:
+        self._open_session()
+        delay = self._retry_delay
+        for _ in range(self._max_retries):
+            waited = await self._rate_limiter.acquire()
+            if waited:
+                app.metrics.observe('rate_limit_wait_seconds', waited, adapter='telegram')
+            payload = {'chat_id': self._chat_id, 'text': text}
+            try:
+                # The url holds the token, so it is not a label
+                with app.metrics.timer('request_seconds', adapter='telegram', endpoint='sendMessage'):
+                    async with self._session.post(self._url, json=payload) as response:
+                        resp = await response.json(content_type=None)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                app.metrics.inc('request_errors_total', adapter='telegram', endpoint='sendMessage')
+                logger.warning(f'I did not send the message to telegram: {e!r}')
+            else:
+                if resp.get('ok'):
+                    return
+
+                app.metrics.inc('request_errors_total', adapter='telegram', endpoint='sendMessage')
+                logger.warning(f'error_code: {resp.get("error_code")} description: {resp.get("description")}')
+                retry_after = resp.get('parameters', {}).get('retry_after')
+                if retry_after:
+                    app.metrics.inc('rate_limited_total', adapter='telegram')
+                    delay = retry_after
+                elif resp.get('error_code', 500) < 500:
+                    # The message itself is wrong, it will not get better
+                    return
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self._max_retry_delay)
+
+        logger.warning(f'I gave up sending the message to telegram: {text}')
@@ -2,12 +2,15 @@ from __future__ import annotations
 
 import asyncio
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional, Union
+
+from trading_bot.services.metrics import Metrics
 
 if TYPE_CHECKING:
     from trading_bot import IndicatorManager, IndicatorValueManager, ExchangeManager, SymbolManager, StopLossManager, \
         PauseChecker, AdapterTaAPI, IndicatorUpdater, DecisionMaker, AdapterByBit, Dealer, \
-        AdapterTelegram, TradingSystemManager
+        AdapterTelegram, TradingSystemManager, LocalIndicatorEngine, BinanceKlineStream, IndicatorValueStore, \
+        MetricsServer, LoopLagMonitor
 
 indicator_manager: IndicatorManager
 indicator_value_manager: IndicatorValueManager
@@ -19,9 +22,15 @@ dealer: Dealer
 deals_adapter: AdapterByBit
 decision_maker: DecisionMaker
 indicator_updater: IndicatorUpdater
-indicators_adapter: AdapterTaAPI
+indicators_adapter: Union[AdapterTaAPI, LocalIndicatorEngine]
+kline_stream: Optional[BinanceKlineStream] = None
+value_store: Optional[IndicatorValueStore] = None
 pause_checker: PauseChecker
 stop_loss_manager: StopLossManager
+# Created here, so the adapters record their timings even without create_app
+metrics = Metrics()
+metrics_server: Optional[MetricsServer] = None
+loop_monitor: Optional[LoopLagMonitor] = None
 indicator_update_timeout = 60
 
 
@@ -30,6 +39,17 @@ def run() -> None:
 
 
 async def _create_tasks() -> None:
+    if metrics_server is not None:
+        await metrics_server.open()
+    await notifier.open()
+    await deals_adapter.open()
+    await indicators_adapter.open()
+    if value_store is not None:
+        await value_store.open()
+    if kline_stream is not None:
+        intervals = {indicator.interval.name: indicator.interval for indicator in indicator_manager.list()}
+        await kline_stream.open(symbol_manager.list(), list(intervals.values()))
+
     task_indicator_updater = asyncio.create_task(
         indicator_updater.run(),
         name='Indicator Updater'
@@ -45,8 +65,30 @@ async def _create_tasks() -> None:
         name='Stop Loss Manager'
     )
 
-    await asyncio.gather(
-        task_indicator_updater,
-        task_pause_checker,
-        task_stop_loss_manager,
-    )
+    # The watchdog finds the calls that block the loop, it lives as long as the other tasks
+    task_loop_monitor = None
+    if loop_monitor is not None:
+        task_loop_monitor = asyncio.create_task(
+            loop_monitor.run(),
+            name='Loop Monitor'
+        )
+
+    try:
+        await asyncio.gather(
+            task_indicator_updater,
+            task_pause_checker,
+            task_stop_loss_manager,
+        )
+    finally:
+        if task_loop_monitor is not None:
+            task_loop_monitor.cancel()
+            await asyncio.gather(task_loop_monitor, return_exceptions=True)
+        await deals_adapter.close()
+        await indicators_adapter.close()
+        if kline_stream is not None:
+            await kline_stream.close()
+        if value_store is not None:
+            await value_store.close()
+        await notifier.close()
+        if metrics_server is not None:
+            await metrics_server.close()
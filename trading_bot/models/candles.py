@@ -0,0 +1,149 @@
+from typing import List
+
+import numpy as np
+
+from trading_bot.models.indicators import Indicator
+from trading_bot.models.symbols import Symbol
+
+
+class Candle:
+    def __init__(
+            self,
+            open_time: int,
+            open_price: float,
+            high: float,
+            low: float,
+            close: float,
+            volume: float,
+            close_time: int,
+    ) -> None:
+        self.open_time = open_time  # ms
+        self.open = open_price
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self.close_time = close_time  # ms
+
+    def __str__(self) -> str:
+        return f'{self.open_time} o: {self.open} h: {self.high} l: {self.low} c: {self.close}'
+
+    def __repr__(self) -> str:
+        return f'{self.open_time} o: {self.open} h: {self.high} l: {self.low} c: {self.close}'
+
+
+class CandleWindow:
+    _fields = ('open_time', 'open', 'high', 'low', 'close', 'volume')
+
+    def __init__(self, symbol: Symbol, interval: Indicator.Interval, size: int) -> None:
+        self.symbol = symbol
+        self.interval = interval
+        self.size = size
+        # Twice the size, so the last `size` candles are always one contiguous slice
+        # and appending only has to compact the buffer once every `size` candles.
+        self._data = np.zeros((len(self._fields), 2 * size))
+        self._start = 0
+        self._end = 0
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    def __str__(self) -> str:
+        return f'{self.symbol} {self.interval.name} candles: {len(self)}'
+
+    def __repr__(self) -> str:
+        return f'{self.symbol} {self.interval.name} candles: {len(self)}'
+
+    @property
+    def open_time(self) -> np.ndarray:
+        return self._data[0, self._start:self._end]
+
+    @property
+    def open(self) -> np.ndarray:
+        return self._data[1, self._start:self._end]
+
+    @property
+    def high(self) -> np.ndarray:
+        return self._data[2, self._start:self._end]
+
+    @property
+    def low(self) -> np.ndarray:
+        return self._data[3, self._start:self._end]
+
+    @property
+    def close(self) -> np.ndarray:
+        return self._data[4, self._start:self._end]
+
+    @property
+    def volume(self) -> np.ndarray:
+        return self._data[5, self._start:self._end]
+
+    def last_open_time(self) -> int:
+        return int(self._data[0, self._end - 1]) if len(self) else 0
+
+    def last_close_time(self) -> int:
+        return self.last_open_time() + self.interval.timeout * 1000 - 1 if len(self) else 0
+
+    def append(self, candle: Candle) -> None:
+        if len(self):
+            last_open_time = self.last_open_time()
+            if candle.open_time < last_open_time:
+                return
+            if candle.open_time == last_open_time:
+                self._write(self._end - 1, candle)
+                return
+
+        if self._end == self._data.shape[1]:
+            kept = self.size - 1
+            self._data[:, :kept] = self._data[:, self._end - kept:self._end]
+            self._start, self._end = 0, kept
+
+        self._write(self._end, candle)
+        self._end += 1
+        if len(self) > self.size:
+            self._start += 1
+
+    def clear(self) -> None:
+        self._start = 0
+        self._end = 0
+
+    def extend(self, candles: List[Candle]) -> None:
+        for candle in candles:
+            self.append(candle)
+
+    def _write(self, position: int, candle: Candle) -> None:
+        self._data[:, position] = (
+            candle.open_time, candle.open, candle.high, candle.low, candle.close, candle.volume,
+        )
+
+
+class CandleManager:
+
+    def __init__(self, window_size: int = 500) -> None:
+        self._window_size = window_size
+        self._windows = []
+        self._windows_by_key = {}
+
+    def create(self, symbol: Symbol, interval: Indicator.Interval) -> CandleWindow:
+        window = CandleWindow(symbol=symbol, interval=interval, size=self._window_size)
+
+        self._windows.append(window)
+        self._windows_by_key[self._key(symbol, interval)] = window
+
+        return window
+
+    def get(self, symbol: Symbol, interval: Indicator.Interval) -> CandleWindow:
+        return self._windows_by_key.get(self._key(symbol, interval))
+
+    def get_or_create(self, symbol: Symbol, interval: Indicator.Interval) -> CandleWindow:
+        window = self.get(symbol, interval)
+        if window is None:
+            window = self.create(symbol, interval)
+        return window
+
+    def list(self) -> List[CandleWindow]:
+        return self._windows.copy()
+
+    @staticmethod
+    def _key(symbol: Symbol, interval: Indicator.Interval) -> str:
+        return f'{symbol.name}_{interval.name}'
@@ -1,9 +1,102 @@
+from __future__ import annotations
+
 from datetime import datetime, timedelta
+from typing import Dict, Optional, Sequence, Set, Tuple
+
+import numpy as np
 
 from trading_bot.models.indicators import Indicator
 from trading_bot.models.symbols import Symbol
 
 
+class ValueHistory:
+    # Ring buffer, the oldest value first
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        # Twice the size, like CandleWindow: the last `size` values are always one contiguous slice
+        self._values = np.full(2 * size, np.nan)
+        self._times = np.zeros(2 * size, dtype=np.int64)
+        self._start = 0
+        self._end = 0
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    def __getitem__(self, index: int) -> float:
+        # Only the negative indexes make sense: -1 is the present value, -2 is the previous one, ...
+        if not -len(self) <= index < 0:
+            raise IndexError
+        return float(self._values[self._end + index])
+
+    def __setitem__(self, index: int, value: float) -> None:
+        if not -len(self) <= index < 0:
+            raise IndexError
+        self._values[self._end + index] = value
+
+    def last(self, count: int) -> np.ndarray:
+        # A view, not a copy
+        return self._values[max(self._end - count, self._start):self._end]
+
+    def last_time(self) -> int:
+        return int(self._times[self._end - 1]) if len(self) else 0
+
+    def append(self, value: float, time: int) -> None:
+        if len(self) and time == self.last_time():
+            self._values[self._end - 1] = value
+            return
+
+        if self._end == len(self._values):
+            kept = self.size - 1
+            self._values[:kept] = self._values[self._end - kept:self._end]
+            self._times[:kept] = self._times[self._end - kept:self._end]
+            self._start, self._end = 0, kept
+
+        self._values[self._end] = value
+        self._times[self._end] = time
+        self._end += 1
+        if len(self) > self.size:
+            self._start += 1
+
+    def clear(self) -> None:
+        self._start = 0
+        self._end = 0
+
+
+class IndicatorValueTable:
+    # The values of one indicator for every symbol, a row per symbol and the present value first,
+    # so DecisionMaker takes the values of many symbols by slicing
+
+    def __init__(self, indicator: Indicator) -> None:
+        self.indicator = indicator
+        self.depth = max(indicator.history_size, 2)
+        self.rows: Dict[Symbol, int] = {}
+        self.values = np.full((0, self.depth), np.nan)
+        self.lengths = np.zeros(0, dtype=np.int64)
+        self.updated_at = np.zeros(0)
+
+    def add(self, symbol: Symbol) -> int:
+        row = len(self.rows)
+        if row == len(self.values):
+            capacity = max(2 * row, 16)
+            self.values = np.concatenate([self.values, np.full((capacity - row, self.depth), np.nan)])
+            self.lengths = np.concatenate([self.lengths, np.zeros(capacity - row, dtype=np.int64)])
+            self.updated_at = np.concatenate([self.updated_at, np.zeros(capacity - row)])
+        self.rows[symbol] = row
+        return row
+
+    def store(self, row: int, indicator_value: IndicatorValue) -> None:
+        values = indicator_value.history.last(self.depth)[::-1]
+        self.values[row] = np.nan
+        self.values[row, :len(values)] = values
+        self.lengths[row] = len(indicator_value.history)
+        self.updated_at[row] = indicator_value.updated_at.timestamp()
+
+    def get_rows(self, symbols: Sequence[Symbol]) -> np.ndarray:
+        # -1 for the symbols without a value
+        return np.fromiter((self.rows.get(symbol, -1) for symbol in symbols), dtype=np.int64, count=len(symbols))
+
+
 class IndicatorValue:
     def __init__(
             self,
@@ -11,13 +104,17 @@ class IndicatorValue:
             symbol: Symbol,
             present_value: float,
             previous_value: float,
-            updated_at: datetime
+            updated_at: datetime,
+            history: Sequence[float] = None,
     ) -> None:
         self.indicator = indicator
         self.symbol = symbol
-        self.present_value = present_value
-        self.previous_value = previous_value
-        self.updated_at = updated_at
+        self.history = ValueHistory(size=max(indicator.history_size, 2))
+        # The row of the manager's table, it is kept equal to the value
+        self._table: Optional[IndicatorValueTable] = None
+        self._row = 0
+        self._updated_at = updated_at
+        self.set_values(present_value, previous_value, updated_at, history)
 
     def __str__(self) -> str:
         return f'{self.indicator} {self.symbol} present_value: ' \
@@ -27,14 +124,94 @@ class IndicatorValue:
         return f'{self.indicator} {self.symbol} present_value: ' \
                f'{self.present_value} previous_value: {self.previous_value}'
 
+    @property
+    def present_value(self) -> float:
+        return self.history[-1]
+
+    @present_value.setter
+    def present_value(self, value: float) -> None:
+        self.history[-1] = value
+        self._store()
+
+    @property
+    def previous_value(self) -> float:
+        return self.history[-2]
+
+    @previous_value.setter
+    def previous_value(self, value: float) -> None:
+        self.history[-2] = value
+        self._store()
+
+    @property
+    def updated_at(self) -> datetime:
+        return self._updated_at
+
+    @updated_at.setter
+    def updated_at(self, value: datetime) -> None:
+        self._updated_at = value
+        self._store()
+
     def is_actual(self) -> bool:
         return self.updated_at + timedelta(seconds=self.indicator.interval.timeout) > datetime.now()
 
+    def has_history(self) -> bool:
+        return len(self.history) >= self.indicator.history_size
+
+    def needs_history(self, updated_at: datetime) -> bool:
+        # The values of a candle at updated_at continue the history only if it is the same or the next one
+        if not self.has_history():
+            return True
+        bar_time = int(self.indicator.interval.last_close_time(updated_at).timestamp())
+        last_time = self.history.last_time()
+        return bar_time not in (last_time, last_time + self.indicator.interval.timeout)
+
+    def set_values(
+            self,
+            present_value: float,
+            previous_value: float,
+            updated_at: datetime,
+            history: Sequence[float] = None,
+    ) -> None:
+        # The next candle is appended, a repeated one is overwritten, after a gap the history starts again
+        timeout = self.indicator.interval.timeout
+        bar_time = int(self.indicator.interval.last_close_time(updated_at).timestamp())
+        last_time = self.history.last_time()
+
+        if len(self.history) >= 2 and bar_time == last_time:
+            self.history[-2] = previous_value
+            self.history[-1] = present_value
+        elif len(self.history) >= 2 and bar_time == last_time + timeout:
+            self.history[-1] = previous_value
+            self.history.append(present_value, bar_time)
+        else:
+            self.history.clear()
+            self.history.append(previous_value, bar_time - timeout)
+            self.history.append(present_value, bar_time)
+
+        if history is not None and len(history) > len(self.history):
+            seed = history[-self.history.size:]
+            self.history.clear()
+            for position, value in enumerate(seed):
+                self.history.append(value, bar_time - (len(seed) - 1 - position) * timeout)
+
+        self.updated_at = updated_at
+
+    def attach(self, table: IndicatorValueTable, row: int) -> None:
+        self._table = table
+        self._row = row
+        self._store()
+
+    def _store(self) -> None:
+        if self._table is not None:
+            self._table.store(self._row, self)
+
 
 class IndicatorValueManager:
     def __init__(self) -> None:
         self._indicator_values = []
         self._indicator_values_by_key = {}
+        self._tables: Dict[Indicator, IndicatorValueTable] = {}
+        self._changed = set()
 
     def get(
             self,
@@ -49,19 +226,25 @@ class IndicatorValueManager:
             symbol: Symbol,
             present_value: float,
             previous_value: float,
+            history: Sequence[float] = None,
     ) -> IndicatorValue:
         ind_value = self.get(indicator, symbol)
 
         if ind_value:
-            ind_value.present_value = present_value
-            ind_value.previous_value = previous_value
-            ind_value.updated_at = datetime.now()
+            # A refreshed stale value makes the conditions checkable again, even if it is the same
+            if (ind_value.present_value != present_value
+                    or ind_value.previous_value != previous_value
+                    or not ind_value.is_actual()):
+                self._changed.add((indicator, symbol))
+
+            ind_value.set_values(present_value, previous_value, datetime.now(), history)
         else:
             ind_value = self.create(
                 indicator=indicator,
                 symbol=symbol,
                 present_value=present_value,
                 previous_value=previous_value,
+                history=history,
             )
 
         return ind_value
@@ -72,23 +255,65 @@ class IndicatorValueManager:
             symbol: Symbol,
             present_value: float,
             previous_value: float,
+            history: Sequence[float] = None,
     ) -> IndicatorValue:
         indicator_value = IndicatorValue(
             indicator=indicator,
             symbol=symbol,
             present_value=present_value,
             previous_value=previous_value,
-            updated_at=datetime.now()
+            updated_at=datetime.now(),
+            history=history,
         )
+        self._add(indicator_value)
 
-        self._indicator_values_by_key[self._key(indicator, symbol)] = indicator_value
-        self._indicator_values.append(indicator_value)
+        return indicator_value
+
+    def restore(
+            self,
+            indicator: Indicator,
+            symbol: Symbol,
+            history: Sequence[float],
+            updated_at: datetime,
+    ) -> Optional[IndicatorValue]:
+        if len(history) < 2 or self.get(indicator, symbol):
+            return None
+
+        indicator_value = IndicatorValue(
+            indicator=indicator,
+            symbol=symbol,
+            present_value=history[-1],
+            previous_value=history[-2],
+            updated_at=updated_at,
+            history=history,
+        )
+        if not indicator_value.is_actual():
+            return None
 
+        self._add(indicator_value)
         return indicator_value
 
+    def get_table(self, indicator: Indicator) -> Optional[IndicatorValueTable]:
+        return self._tables.get(indicator)
+
     def list(self) -> [IndicatorValue]:
         return self._indicator_values.copy()
 
+    def pop_changed(self) -> Set[Tuple[Indicator, Symbol]]:
+        changed = self._changed
+        self._changed = set()
+        return changed
+
+    def _add(self, indicator_value: IndicatorValue) -> None:
+        self._indicator_values_by_key[self._key(indicator_value.indicator, indicator_value.symbol)] = indicator_value
+        self._indicator_values.append(indicator_value)
+        indicator = indicator_value.indicator
+        if indicator not in self._tables:
+            self._tables[indicator] = IndicatorValueTable(indicator)
+        table = self._tables[indicator]
+        indicator_value.attach(table, table.add(indicator_value.symbol))
+        self._changed.add((indicator_value.indicator, indicator_value.symbol))
+
     @staticmethod
     def _key(indicator: Indicator, symbol: Symbol):
         return f'{indicator.name}_{symbol.name}'
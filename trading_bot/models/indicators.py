@@ -1,3 +1,4 @@
+from datetime import datetime, timedelta
 from typing import Dict, List
 
 
@@ -15,10 +16,23 @@ class Indicator:
             '1d': 86400,
             '1w': 604800,
         }
+        # Candles are aligned to the unix epoch, except weekly ones:
+        # they open on Monday, and the epoch started on Thursday.
+        offsets = {
+            '1w': 345600,
+        }
 
         def __init__(self, name: str) -> None:
             self.name = name
             self.timeout = self.valid_values.get(name)
+            self.offset = self.offsets.get(name, 0)
+
+        def last_close_time(self, now: datetime) -> datetime:
+            timestamp = now.timestamp()
+            return datetime.fromtimestamp(timestamp - (timestamp - self.offset) % self.timeout)
+
+        def next_close_time(self, now: datetime) -> datetime:
+            return self.last_close_time(now) + timedelta(seconds=self.timeout)
 
     def __init__(
             self,
@@ -31,6 +45,8 @@ class Indicator:
         self.indicator_type = indicator_type
         self.interval = interval
         self.optional = optional or {}
+        # How many last values the conditions use, 2 is the present and the previous value
+        self.history_size = 2
 
     def __str__(self) -> str:
         return self.name
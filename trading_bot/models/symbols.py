@@ -1,4 +1,4 @@
-from typing import List, Dict, Union
+from typing import List, Dict, Optional, Union
 
 from trading_bot.models.exchanges import Exchange
 
@@ -38,6 +38,9 @@ class Symbol:
 class SymbolManager:
     def __init__(self) -> None:
         self._symbols = []
+        self._symbols_by_name = {}
+        # alias template -> alias -> symbol, an index is built on the first lookup with its template
+        self._symbols_by_alias = {}
 
     def create(
             self,
@@ -54,17 +57,32 @@ class SymbolManager:
         )
 
         self._symbols.append(symbol)
+        # The first symbol with the name wins, as it did when the list was searched
+        self._symbols_by_name.setdefault(symbol.name, symbol)
+        for alias_template, symbols_by_alias in self._symbols_by_alias.items():
+            symbols_by_alias.setdefault(self._get_alias(symbol, alias_template), symbol)
 
         return symbol
 
     def list(self) -> List[Symbol]:
         return self._symbols.copy()
 
+    def get(self, name: str) -> Optional[Symbol]:
+        return self._symbols_by_name.get(name)
+
     def find_by_alias(self, alias: str, alias_template: str) -> Union[Symbol, None]:
-        for symbol in self.list():
-            if alias_template.format(
-                    base_currency=symbol.base_currency,
-                    quote_currency=symbol.quote_currency,
-            ) == alias:
-                return symbol
-        return None
+        symbols_by_alias = self._symbols_by_alias.get(alias_template)
+        if symbols_by_alias is None:
+            symbols_by_alias = {}
+            for symbol in self._symbols:
+                symbols_by_alias.setdefault(self._get_alias(symbol, alias_template), symbol)
+            self._symbols_by_alias[alias_template] = symbols_by_alias
+
+        return symbols_by_alias.get(alias)
+
+    @staticmethod
+    def _get_alias(symbol: Symbol, alias_template: str) -> str:
+        return alias_template.format(
+            base_currency=symbol.base_currency,
+            quote_currency=symbol.quote_currency,
+        )
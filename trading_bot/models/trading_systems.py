@@ -1,5 +1,9 @@
+import re
 from enum import Enum, auto
-from typing import Dict, Any, List
+from operator import gt, lt
+from typing import Dict, Any, List, Sequence
+
+import numpy as np
 
 from trading_bot.models.exchanges import Exchange, ExchangeManager
 from trading_bot.models.indicator_values import IndicatorValue
@@ -62,17 +66,33 @@ class TradingSystemSettingsValidator:
                 raise ValueError
 
 
+def _equal(first_operand_value: float, second_operand_value: float) -> bool:
+    return abs(first_operand_value - second_operand_value) < 1e-6
+
+
 class Condition:
     class Operand:
         class OperandType(Enum):
             INDICATOR_VALUE = auto()
             NUMBER = auto()
 
+        # Positions of the values in the vector that DecisionMaker builds for every indicator,
+        # the vector goes back in time, so `value[-k]` (k-th last value) is at position k - 1
+        value_names = ('present_value', 'previous_value')
+        value_pattern = re.compile(r'value\[-(\d+)\]')
+
         def __init__(self, operand_type: OperandType, comparison_value: str) -> None:
             self.operand_type = operand_type
             self.comparison_value = comparison_value
+            self.indicator_name = None
+            self.value_name = None
+            self.indicator_index = None
+            self.value_index = None
+
             if operand_type is self.OperandType.NUMBER:
                 self.comparison_value = float(self.comparison_value)
+            else:
+                self.indicator_name, self.value_name = self.comparison_value.split('.')
 
         def __str__(self) -> str:
             return str(self.comparison_value)
@@ -80,14 +100,53 @@ class Condition:
         def __repr__(self) -> str:
             return f'{self.comparison_value} {self.operand_type}'
 
+        def compile(self, indicators: List[Indicator]) -> None:
+            if self.operand_type is self.OperandType.INDICATOR_VALUE:
+                indicator_names = [indicator.name for indicator in indicators]
+                if self.indicator_name not in indicator_names:
+                    raise ValueError
+
+                self.indicator_index = indicator_names.index(self.indicator_name)
+                self.value_index = self._parse_value_index(self.value_name)
+
+                # The indicator has to keep enough values for the deepest operand
+                indicator = indicators[self.indicator_index]
+                indicator.history_size = max(indicator.history_size, self.value_index + 1)
+
+        @classmethod
+        def _parse_value_index(cls, value_name: str) -> int:
+            if value_name in cls.value_names:
+                return cls.value_names.index(value_name)
+
+            match = cls.value_pattern.fullmatch(value_name)
+            if not match or int(match.group(1)) < 1:
+                raise ValueError
+            return int(match.group(1)) - 1
+
         def get_operand_value(self, indicator_values: List[IndicatorValue]) -> float:
             if self.operand_type is self.OperandType.NUMBER:
                 return self.comparison_value
             else:
-                indicator_name, value_name = self.comparison_value.split('.')
                 for indicator_value in indicator_values:
-                    if indicator_value.indicator.name == indicator_name:
-                        return getattr(indicator_value, value_name)
+                    if indicator_value.indicator.name == self.indicator_name:
+                        return indicator_value.history[-self._parse_value_index(self.value_name) - 1]
+
+        def get_compiled_value(self, values: Sequence[Sequence[float]]) -> float:
+            if self.operand_type is self.OperandType.NUMBER:
+                return self.comparison_value
+            return values[self.indicator_index][self.value_index]
+
+        def get_compiled_column(self, values: np.ndarray) -> np.ndarray:
+            # values has shape (symbols, indicators, depth), so one column holds this operand for every symbol
+            if self.operand_type is self.OperandType.NUMBER:
+                return self.comparison_value
+            return values[:, self.indicator_index, self.value_index]
+
+    operator_functions = {
+        '>': gt,
+        '<': lt,
+        '=': _equal,
+    }
 
     def __init__(
             self,
@@ -100,11 +159,6 @@ class Condition:
         self.operator = operator
         self.second_operand = second_operand
         self.is_close_condition = is_close_condition
-        self._operator_methods = {
-            '>': self._more_than,
-            '<': self._less_than,
-            '=': self._equal,
-        }
 
     def __str__(self) -> str:
         return f'{self.first_operand} {self.operator} {self.second_operand}'
@@ -112,20 +166,33 @@ class Condition:
     def __repr__(self) -> str:
         return f'{self.first_operand} {self.operator} {self.second_operand}'
 
-    def is_satisfied(self, first_operand_value: float, second_operand_value: float) -> bool:
-        return self._operator_methods[self.operator](first_operand_value, second_operand_value)
+    @property
+    def operator(self) -> str:
+        return self._operator
 
-    @staticmethod
-    def _less_than(first_operand_value: float, second_operand_value: float) -> bool:
-        return first_operand_value < second_operand_value
+    @operator.setter
+    def operator(self, value: str) -> None:
+        self._operator = value
+        self.operator_function = self.operator_functions[value]
 
-    @staticmethod
-    def _more_than(first_operand_value: float, second_operand_value: float) -> bool:
-        return first_operand_value > second_operand_value
+    def compile(self, indicators: List[Indicator]) -> None:
+        self.first_operand.compile(indicators)
+        self.second_operand.compile(indicators)
 
-    @staticmethod
-    def _equal(first_operand_value: float, second_operand_value: float) -> bool:
-        return abs(first_operand_value - second_operand_value) < 1e-6
+    def is_satisfied(self, first_operand_value: float, second_operand_value: float) -> bool:
+        return self.operator_function(first_operand_value, second_operand_value)
+
+    def evaluate(self, values: Sequence[Sequence[float]]) -> bool:
+        return self.operator_function(
+            self.first_operand.get_compiled_value(values),
+            self.second_operand.get_compiled_value(values),
+        )
+
+    def evaluate_batch(self, values: np.ndarray) -> np.ndarray:
+        return self.operator_function(
+            self.first_operand.get_compiled_column(values),
+            self.second_operand.get_compiled_column(values),
+        )
 
 
 class TradingSystem:
@@ -150,6 +217,10 @@ class TradingSystem:
     def __repr__(self) -> str:
         return f'{self.name}'
 
+    @property
+    def history_size(self) -> int:
+        return max(indicator.history_size for indicator in self.indicators)
+
 
 class TradingSystemManager:
     validator = TradingSystemSettingsValidator
@@ -160,6 +231,7 @@ class TradingSystemManager:
             exchange_manager: ExchangeManager,
     ) -> None:
         self._trading_systems = []
+        self._trading_systems_by_indicator = {}
         self._indicator_manager = indicator_manager
         self._exchange_manager = exchange_manager
 
@@ -168,8 +240,8 @@ class TradingSystemManager:
 
         indicators = self._indicators(settings['indicators'])
         exchanges = self._exchanges(settings['exchanges'])
-        conditions_to_buy = self._create_conditions(settings['conditions_to_buy'])
-        conditions_to_sell = self._create_conditions(settings['conditions_to_sell'])
+        conditions_to_buy = self._create_conditions(settings['conditions_to_buy'], indicators)
+        conditions_to_sell = self._create_conditions(settings['conditions_to_sell'], indicators)
 
         trading_system = TradingSystem(
             name=name,
@@ -180,6 +252,8 @@ class TradingSystemManager:
         )
 
         self._trading_systems.append(trading_system)
+        for indicator in indicators:
+            self._trading_systems_by_indicator.setdefault(indicator.name, []).append(trading_system)
 
         return trading_system
 
@@ -209,7 +283,10 @@ class TradingSystemManager:
         return exchanges
 
     @staticmethod
-    def _create_conditions(conditions_settings: List[Dict[str, Any]]) -> List[Condition]:
+    def _create_conditions(
+            conditions_settings: List[Dict[str, Any]],
+            indicators: List[Indicator],
+    ) -> List[Condition]:
         conditions = []
         for setting in conditions_settings:
             first_operand = Condition.Operand(
@@ -220,16 +297,20 @@ class TradingSystemManager:
                 operand_type=Condition.Operand.OperandType[setting['second_operand']['operand_type']],
                 comparison_value=setting['second_operand']['value'],
             )
-            conditions.append(
-                Condition(
-                    first_operand=first_operand,
-                    operator=setting['operator'],
-                    second_operand=second_operand,
-                    is_close_condition=setting['is_close_condition']
-                )
+            condition = Condition(
+                first_operand=first_operand,
+                operator=setting['operator'],
+                second_operand=second_operand,
+                is_close_condition=setting['is_close_condition']
             )
+            # Resolved once here, so checking a condition is just two lookups and a comparison
+            condition.compile(indicators)
+            conditions.append(condition)
 
         return conditions
 
     def list(self) -> List[TradingSystem]:
         return self._trading_systems.copy()
+
+    def list_by_indicator(self, indicator: Indicator) -> List[TradingSystem]:
+        return self._trading_systems_by_indicator.get(indicator.name, []).copy()
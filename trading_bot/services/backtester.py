@@ -0,0 +1,324 @@
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from trading_bot.adapters.history_files import AdapterHistoryFiles, AdapterHistoryCache
+from trading_bot.models.indicators import Indicator
+from trading_bot.models.symbols import Symbol
+from trading_bot.models.trading_systems import TradingSystem
+from trading_bot.services.dealer import Dealer
+from trading_bot.services.decision_maker import DealSide, DecisionMaker
+from trading_bot.services.indicator_engine import calculate
+
+logger = logging.getLogger('logger')
+
+
+def resample_candles(candles: np.ndarray, interval: Indicator.Interval) -> np.ndarray:
+    interval_ms = interval.timeout * 1000
+    offset_ms = interval.offset * 1000
+
+    groups = (candles[:, 0] - offset_ms) // interval_ms
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    ends = np.r_[starts[1:], len(candles)] - 1
+
+    result = np.empty((len(starts), 6))
+    result[:, 0] = groups[starts] * interval_ms + offset_ms
+    result[:, 1] = candles[starts, 1]
+    result[:, 2] = np.maximum.reduceat(candles[:, 2], starts)
+    result[:, 3] = np.minimum.reduceat(candles[:, 3], starts)
+    result[:, 4] = candles[ends, 4]
+    result[:, 5] = np.add.reduceat(candles[:, 5], starts)
+
+    # When the history starts in the middle of the interval, the first candle is incomplete
+    if len(result) and result[0, 0] != candles[0, 0]:
+        result = result[1:]
+
+    return result
+
+
+class IndicatorCache:
+    # Backtests of similar settings do not calculate the same indicators again
+
+    def __init__(self, size: int = 256) -> None:
+        self._size = size
+        self._values = OrderedDict()
+
+    def get(self, key: tuple) -> Optional[np.ndarray]:
+        values = self._values.get(key)
+        if values is not None:
+            self._values.move_to_end(key)
+        return values
+
+    def set(self, key: tuple, values: np.ndarray) -> None:
+        self._values[key] = values
+        if len(self._values) > self._size:
+            self._values.popitem(last=False)
+
+
+class Trade:
+    def __init__(
+            self,
+            symbol: Symbol,
+            trading_system: TradingSystem,
+            side: DealSide,
+            size: float,
+            entry_time: int,
+            entry_price: float,
+            stop_loss: float,
+    ) -> None:
+        self.symbol = symbol
+        self.trading_system = trading_system
+        self.side = side
+        self.size = size
+        self.entry_time = entry_time  # ms
+        self.entry_price = entry_price
+        self.stop_loss = stop_loss
+        self.exit_time: Optional[int] = None  # ms
+        self.exit_price: Optional[float] = None
+        self.exit_reason: Optional[str] = None
+
+    def __str__(self) -> str:
+        return f'{self.symbol} {self.side} {self.entry_price} -> {self.exit_price} ({self.exit_reason})'
+
+    def __repr__(self) -> str:
+        return f'{self.symbol} {self.side} {self.entry_price} -> {self.exit_price} ({self.exit_reason})'
+
+    @property
+    def profit(self) -> float:
+        direction = 1 if self.side == DealSide.BUY else -1
+        return (self.exit_price - self.entry_price) * self.size * direction
+
+    def close(self, exit_time: int, exit_price: float, exit_reason: str) -> None:
+        self.exit_time = exit_time
+        self.exit_price = exit_price
+        self.exit_reason = exit_reason
+
+
+class Backtester:
+    # Decides at every close of the shortest interval by the rules of DecisionMaker, Dealer and StopLossManager
+
+    def __init__(
+            self,
+            history_adapter: Union[AdapterHistoryFiles, AdapterHistoryCache],
+            trading_systems: List[TradingSystem],
+            stop_loss_indicator: Indicator = None,
+            indicator_cache: IndicatorCache = None,
+    ) -> None:
+        self._history_adapter = history_adapter
+        self._trading_systems = trading_systems
+        self._indicator_cache = indicator_cache
+        self._stop_loss_indicator = stop_loss_indicator or Indicator(
+            name='ParabolicSAR_1h',
+            indicator_type='ParabolicSAR',
+            interval=Indicator.Interval('1h'),
+        )
+
+    def run(self, symbols: List[Symbol]) -> List[Trade]:
+        trades = []
+        for symbol in symbols:
+            try:
+                trades.extend(self.run_symbol(symbol))
+            except Warning:
+                logger.warning(f'I did not backtest {symbol}')
+        return trades
+
+    def run_symbol(self, symbol: Symbol) -> List[Trade]:
+        indicators = {self._stop_loss_indicator.name: self._stop_loss_indicator}
+        for trading_system in self._trading_systems:
+            indicators.update({indicator.name: indicator for indicator in trading_system.indicators})
+
+        intervals = {indicator.interval.name: indicator.interval for indicator in indicators.values()}
+        base_interval = min(intervals.values(), key=lambda interval: interval.timeout)
+
+        candles = {base_interval.name: self._history_adapter.get_candles(symbol, base_interval)}
+        for interval in intervals.values():
+            if interval.name not in candles:
+                candles[interval.name] = self._get_candles(symbol, interval, candles[base_interval.name])
+
+        # Decisions are taken when the candles of the shortest interval close
+        base_candles = candles[base_interval.name]
+        times = base_candles[:, 0] + base_interval.timeout * 1000
+
+        # Every indicator gets as many last values as the deepest condition needs
+        depth = max(indicator.history_size for indicator in indicators.values())
+        values = {}
+        positions = {}
+        for indicator in indicators.values():
+            values[indicator.name], positions[indicator.name] = self._get_indicator_values(
+                symbol, indicator, candles[indicator.interval.name], times, depth
+            )
+
+        trades = []
+        for trading_system in self._trading_systems:
+            trades.extend(self._replay(
+                symbol=symbol,
+                trading_system=trading_system,
+                times=times,
+                candles=base_candles,
+                values=np.stack([values[indicator.name] for indicator in trading_system.indicators], axis=1),
+                updated=self._get_updated_mask([positions[indicator.name] for indicator in trading_system.indicators]),
+                stop_loss_values=values[self._stop_loss_indicator.name][:, 0],
+            ))
+        return trades
+
+    @staticmethod
+    def summarize(trades: List[Trade]) -> Dict[str, Dict[str, float]]:
+        summary = {}
+        for trade in trades:
+            result = summary.setdefault(trade.trading_system.name, {'trades': 0, 'wins': 0, 'profit': 0.0})
+            result['trades'] += 1
+            result['wins'] += trade.profit > 0
+            result['profit'] += trade.profit
+
+        for name, result in summary.items():
+            result['win_rate'] = result['wins'] / result['trades']
+
+            # The deepest fall of the total profit, with the deals of all symbols in the order they were closed
+            closed = sorted((trade for trade in trades if trade.trading_system.name == name),
+                            key=lambda trade: trade.exit_time)
+            equity = np.r_[0, np.cumsum([trade.profit for trade in closed])]
+            result['drawdown'] = float(np.max(np.maximum.accumulate(equity) - equity))
+        return summary
+
+    def _get_candles(self, symbol: Symbol, interval: Indicator.Interval, base_candles: np.ndarray) -> np.ndarray:
+        if self._history_adapter.has_candles(symbol, interval):
+            return self._history_adapter.get_candles(symbol, interval)
+
+        logger.info(f'I build {symbol} {interval.name} candles from the shorter interval')
+        return resample_candles(base_candles, interval)
+
+    def _get_indicator_values(
+            self,
+            symbol: Symbol,
+            indicator: Indicator,
+            candles: np.ndarray,
+            times: np.ndarray,
+            depth: int = 2,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        indicator_values = self._calculate(symbol, indicator, candles)
+
+        # The last candle of the indicator's interval that is closed at each decision time
+        positions = np.searchsorted(candles[:, 0] + indicator.interval.timeout * 1000, times, side='right') - 1
+
+        # Column k holds the value k candles back, so column 0 is the present value and column 1 the previous one
+        padded = np.r_[np.full(depth, np.nan), indicator_values]
+        return np.stack([padded[positions + depth - k] for k in range(depth)], axis=1), positions
+
+    def _calculate(self, symbol: Symbol, indicator: Indicator, candles: np.ndarray) -> np.ndarray:
+        key = (symbol.name, indicator.indicator_type, indicator.interval.name, tuple(sorted(indicator.optional.items())))
+        if self._indicator_cache is not None:
+            indicator_values = self._indicator_cache.get(key)
+            if indicator_values is not None:
+                return indicator_values
+
+        try:
+            indicator_values = calculate(
+                indicator_type=indicator.indicator_type,
+                optional=indicator.optional,
+                high=candles[:, 2],
+                low=candles[:, 3],
+                close=candles[:, 4],
+            )
+        except ValueError:
+            logger.warning(f'I can not calculate {indicator.indicator_type} locally ({indicator})')
+            raise Warning
+
+        if self._indicator_cache is not None:
+            self._indicator_cache.set(key, indicator_values)
+        return indicator_values
+
+    @staticmethod
+    def _get_updated_mask(positions: List[np.ndarray]) -> np.ndarray:
+        updated = np.zeros(len(positions[0]), dtype=bool)
+        updated[0] = True
+        for indicator_positions in positions:
+            updated[1:] |= indicator_positions[1:] != indicator_positions[:-1]
+        return updated
+
+    def _replay(
+            self,
+            symbol: Symbol,
+            trading_system: TradingSystem,
+            times: np.ndarray,
+            candles: np.ndarray,
+            values: np.ndarray,
+            updated: np.ndarray,
+            stop_loss_values: np.ndarray,
+    ) -> List[Trade]:
+        has_values = ~np.isnan(values).any(axis=(1, 2))
+        buy = DecisionMaker._check_conditions_in_batch(values, trading_system.conditions_to_buy) & has_values
+        sell = DecisionMaker._check_conditions_in_batch(values, trading_system.conditions_to_sell) & has_values
+        close_buy = DecisionMaker._check_conditions_in_batch(
+            values, DecisionMaker._get_close_conditions(trading_system, DealSide.BUY)
+        ) & has_values
+        close_sell = DecisionMaker._check_conditions_in_batch(
+            values, DecisionMaker._get_close_conditions(trading_system, DealSide.SELL)
+        ) & has_values
+
+        # The loop below is sequential by nature, plain lists are much faster to index there than arrays
+        times = times.astype(np.int64).tolist()
+        opens, highs, lows, closes = (candles[:, column].tolist() for column in (1, 2, 3, 4))
+        buy, sell, close_buy, close_sell, updated = (
+            mask.tolist() for mask in (buy, sell, close_buy, close_sell, updated)
+        )
+        stop_loss_values = stop_loss_values.tolist()
+        size = symbol.deal_opening_params.qty or 1
+
+        trades = []
+        deal = None
+        last_pause = None
+        for i in range(len(times)):
+            if deal is not None:
+                stop_price = self._get_stop_price(deal, opens[i], highs[i], lows[i])
+                if stop_price is not None:
+                    deal.close(times[i], stop_price, 'stop_loss')
+                    trades.append(deal)
+                    deal = None
+
+            pause = deal is not None
+            if updated[i] or pause is not last_pause:
+                if not pause:
+                    if buy[i] or sell[i]:
+                        side = DealSide.BUY if buy[i] else DealSide.SELL
+                        deal = Trade(
+                            symbol=symbol,
+                            trading_system=trading_system,
+                            side=side,
+                            size=size,
+                            entry_time=times[i],
+                            entry_price=closes[i],
+                            stop_loss=Dealer._count_stop_loss_value(side, closes[i]),
+                        )
+                elif close_buy[i] if deal.side == DealSide.BUY else close_sell[i]:
+                    deal.close(times[i], closes[i], 'close_condition')
+                    trades.append(deal)
+                    deal = None
+
+                last_pause = deal is not None
+
+            if deal is not None:
+                deal.stop_loss = self._get_new_stop_loss_value(deal, closes[i], stop_loss_values[i])
+
+        if deal is not None:
+            deal.close(times[-1], closes[-1], 'end_of_history')
+            trades.append(deal)
+
+        return trades
+
+    @staticmethod
+    def _get_stop_price(deal: Trade, open_price: float, high: float, low: float) -> Optional[float]:
+        # When the price gaps over the stop loss, the deal is closed at the open price
+        if deal.side == DealSide.BUY:
+            if low <= deal.stop_loss:
+                return min(open_price, deal.stop_loss)
+        elif high >= deal.stop_loss:
+            return max(open_price, deal.stop_loss)
+        return None
+
+    @staticmethod
+    def _get_new_stop_loss_value(deal: Trade, current_price: float, stop_loss_value: float) -> float:
+        if deal.side == DealSide.BUY:
+            return stop_loss_value if current_price > stop_loss_value > deal.stop_loss else deal.stop_loss
+        return stop_loss_value if current_price < stop_loss_value < deal.stop_loss else deal.stop_loss
@@ -0,0 +1,198 @@
+import asyncio
+import copy
+import logging
+import statistics
+import time
+import tracemalloc
+from typing import Any, Dict, List
+
+from config import Config
+from trading_bot import app, create_app
+from trading_bot.adapters.stand_ins import StandInServer
+from trading_bot.services.metrics import Metrics
+
+logger = logging.getLogger('logger')
+
+
+class Benchmark:
+    # A cycle is what the bot does after a candle closes
+
+    loops = ('indicator_updater', 'decision_maker', 'stop_loss_manager', 'pause_checker')
+
+    def __init__(
+            self,
+            symbols_count: int,
+            trading_systems_count: int,
+            cycles: int = 3,
+            latency: float = 0.05,
+            jitter: float = 0.02,
+            error_rate: float = 0,
+            seed: int = 0,
+            lag_interval: float = 0.01,
+    ) -> None:
+        self._symbols_count = symbols_count
+        self._trading_systems_count = trading_systems_count
+        self._cycles = cycles
+        self._latency = latency
+        self._jitter = jitter
+        self._error_rate = error_rate
+        self._seed = seed
+        self._lag_interval = lag_interval
+        self._lags: List[float] = []
+
+    async def run(self) -> Dict[str, Any]:
+        server = StandInServer(latency=self._latency, jitter=self._jitter, error_rate=self._error_rate, seed=self._seed)
+        await server.open()
+
+        create_app(self.create_config(server.url, self._symbols_count, self._trading_systems_count))
+        # Every taapi answer is logged with INFO, which would be measured too
+        logger.setLevel(logging.ERROR)
+        app.metrics = Metrics()
+        server.prices = {
+            app.deals_adapter.symbol_template.format(
+                base_currency=symbol.base_currency,
+                quote_currency=symbol.quote_currency,
+            ): 100.0
+            for symbol in app.symbol_manager.list()
+        }
+
+        await app.deals_adapter.open()
+        await app.indicators_adapter.open()
+        await app.notifier.open()
+        lag_sampler = asyncio.create_task(self._sample_lag())
+        try:
+            cycles = [await self._run_cycle(server) for _ in range(self._cycles)]
+
+            # tracemalloc slows everything down, so the memory is measured by a cycle of its own
+            tracemalloc.start()
+            await self._run_cycle(server)
+            _, memory_peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        finally:
+            lag_sampler.cancel()
+            await asyncio.gather(lag_sampler, return_exceptions=True)
+            await app.deals_adapter.close()
+            await app.indicators_adapter.close()
+            await app.notifier.close()
+            await server.close()
+
+        return self._summarize(cycles, memory_peak)
+
+    @staticmethod
+    def create_config(url: str, symbols_count: int, trading_systems_count: int) -> type:
+        trading_systems = []
+        for n in range(trading_systems_count):
+            base = Config.TRADING_SYSTEMS_SETTINGS[n % len(Config.TRADING_SYSTEMS_SETTINGS)]
+            trading_systems.append({
+                'name': f'{base["name"]}_{n}',
+                'settings': Benchmark._rename_indicators(base['settings'], suffix=str(n)),
+            })
+
+        return type('BenchmarkConfig', (Config,), {
+            'SYMBOLS': [
+                {
+                    'base_currency': f'COIN{n}',
+                    'quote_currency': 'USDT',
+                    'exchanges': ['ByBit'],
+                    'deal_opening_params': {'qty': 1},
+                }
+                for n in range(symbols_count)
+            ],
+            'TRADING_SYSTEMS_SETTINGS': trading_systems,
+            'TELEGRAM_TOKEN': 'benchmark',
+            'TELEGRAM_CHAT_ID': 'benchmark',
+            'TELEGRAM_URL': f'{url}/telegram',
+            'TELEGRAM_FLUSH_INTERVAL': 0.1,
+            'TA_API_KEY': 'benchmark',
+            'TA_API_URL': f'{url}/ta_api/',
+            'TA_API_TIMEOUT': 0,  # the stand-in has no rate limit
+            'TA_API_BULK': True,
+            'INDICATORS_SOURCE': 'ta_api',
+            'INDICATORS_STREAM': False,
+            'INDICATORS_CACHE_PATH': None,
+            'BY_BIT_API_KEY': 'benchmark',
+            'BY_BIT_API_SECRET': 'benchmark',
+            'BY_BIT_URL': f'{url}/by_bit/',
+            'BY_BIT_STREAM': False,
+            'METRICS_PORT': 0,
+        })
+
+    @staticmethod
+    def _rename_indicators(settings: Dict[str, Any], suffix: str) -> Dict[str, Any]:
+        # Every trading system gets indicators of its own, so the universe grows with the trading systems
+        settings = copy.deepcopy(settings)
+        names = {}
+        for indicator in settings['indicators']:
+            names[indicator['name']] = f'{indicator["name"]}_{suffix}'
+            indicator['name'] = names[indicator['name']]
+
+        for condition in settings['conditions_to_buy'] + settings['conditions_to_sell']:
+            for operand in (condition['first_operand'], condition['second_operand']):
+                if isinstance(operand['value'], str):
+                    name, _, value_name = operand['value'].partition('.')
+                    if name in names:
+                        operand['value'] = f'{names[name]}.{value_name}'
+
+        return settings
+
+    async def _run_cycle(self, server: StandInServer) -> Dict[str, Any]:
+        # Every indicator is due, as after the close of a candle of every interval
+        app.indicator_updater._last_updates = {}
+        server.requests.clear()
+
+        timings = {}
+        started_at = time.perf_counter()
+        for loop, run_loop in zip(self.loops, (
+                app.indicator_updater._update,
+                app.decision_maker.decide,
+                app.stop_loss_manager._update_stop_losses,
+                app.pause_checker._check_open_deals,
+        )):
+            loop_started_at = time.perf_counter()
+            await run_loop()
+            timings[loop] = time.perf_counter() - loop_started_at
+        timings['cycle'] = time.perf_counter() - started_at
+
+        return {'seconds': timings, 'requests': dict(server.requests)}
+
+    async def _sample_lag(self) -> None:
+        while True:
+            started_at = time.perf_counter()
+            await asyncio.sleep(self._lag_interval)
+            self._lags.append(time.perf_counter() - started_at - self._lag_interval)
+
+    def _summarize(self, cycles: List[Dict[str, Any]], memory_peak: int) -> Dict[str, Any]:
+        signal_to_order = app.metrics.get_histogram('signal_to_order_seconds')
+        return {
+            'symbols': self._symbols_count,
+            'trading_systems': self._trading_systems_count,
+            'indicators': len(app.indicator_manager.list()),
+            'cycles': len(cycles),
+            'cycle_seconds': {
+                loop: self._describe([cycle['seconds'][loop] for cycle in cycles])
+                for loop in ('cycle',) + self.loops
+            },
+            'requests_per_cycle': {
+                service: statistics.mean(cycle['requests'].get(service, 0) for cycle in cycles)
+                for service in ('ta_api', 'by_bit', 'telegram')
+            },
+            'loop_lag_seconds': self._describe(self._lags),
+            'memory_peak_mb': round(memory_peak / 2 ** 20, 2),
+            'signal_to_order_seconds': {
+                'count': signal_to_order.count,
+                'mean': signal_to_order.sum / signal_to_order.count if signal_to_order.count else None,
+            },
+        }
+
+    @staticmethod
+    def _describe(values: List[float]) -> Dict[str, float]:
+        if not values:
+            return {'mean': 0, 'p50': 0, 'p99': 0, 'max': 0}
+
+        values = sorted(values)
+        return {
+            'mean': statistics.mean(values),
+            'p50': values[len(values) // 2],
+            'p99': values[min(len(values) - 1, int(len(values) * 0.99))],
+            'max': values[-1],
+        }
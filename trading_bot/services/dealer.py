@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 import logging
-from typing import List
+import time
+from typing import Any, Dict, List
 
 from trading_bot import app
 from trading_bot.models.exchanges import DealOpeningMethod
@@ -68,6 +69,7 @@ class Dealer:
                     logger.warning(f'I did not open the deal for {decision}')
                     return
 
+                app.metrics.observe('signal_to_order_seconds', time.monotonic() - decision.created_at)
                 msg = f'I just opened the deal. ({decision})'
                 logger.info(msg)
                 await app.notifier.notify(msg=msg)
@@ -106,8 +108,29 @@ class Dealer:
             logger.warning(f'I did not get position info for {symbol}')
             raise Warning
 
+        return self._parse_deals(response.get('result'))
+
+    async def get_all_deals(self) -> Dict[Symbol, List[Deal]]:
+        # Symbols without deals are left out
+        try:
+            positions = await self._deals_adapter.get_all_positions(
+                aliases=[self._get_alias(symbol) for symbol in app.symbol_manager.list()],
+            )
+        except Warning:
+            logger.warning(f'I did not get position info')
+            raise Warning
+
+        deals = {}
+        for alias_positions in positions.values():
+            for deal in self._parse_deals(alias_positions):
+                # Positions of the symbols the bot does not trade are not its business
+                if deal.symbol is not None:
+                    deals.setdefault(deal.symbol, []).append(deal)
+        return deals
+
+    def _parse_deals(self, positions: List[Dict[str, Any]]) -> List[Deal]:
         deals = []
-        for res in response.get('result'):
+        for res in positions:
             if res['size'] != 0:
                 deals.append(
                     Deal(
@@ -132,6 +155,23 @@ class Dealer:
             logger.warning(f'I did not get current price for {symbol}')
             raise Warning
 
+    async def get_current_prices(self) -> Dict[Symbol, float]:
+        # Symbols without a ticker are left out
+        aliases = {symbol: self._get_alias(symbol) for symbol in app.symbol_manager.list()}
+        try:
+            prices = await self._deals_adapter.get_prices(list(dict.fromkeys(aliases.values())))
+        except Warning:
+            logger.warning(f'I did not get current prices')
+            raise Warning
+
+        return {symbol: prices[alias] for symbol, alias in aliases.items() if alias in prices}
+
+    def _get_alias(self, symbol: Symbol) -> str:
+        return self._deals_adapter.symbol_template.format(
+            base_currency=symbol.base_currency,
+            quote_currency=symbol.quote_currency,
+        )
+
     async def set_stop_loss(self, deal: Deal, stop_loss: float) -> None:
         try:
             await self._deals_adapter.set_stop_loss(deal, stop_loss)
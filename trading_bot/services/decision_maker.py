@@ -1,12 +1,23 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime
 from enum import Enum, auto
 import logging
-from typing import List
+import time
+from typing import TYPE_CHECKING, List, Dict, Optional, Sequence, Set, Tuple
+
+import numpy as np
 
 from trading_bot import app
 from trading_bot.models.indicator_values import IndicatorValueManager, IndicatorValue
+from trading_bot.models.indicators import Indicator
 from trading_bot.models.symbols import Symbol, SymbolManager
 from trading_bot.models.trading_systems import TradingSystem, TradingSystemManager, Condition
 
+if TYPE_CHECKING:
+    from trading_bot.services.dealer import Deal
+
 logger = logging.getLogger('logger')
 
 
@@ -26,6 +37,7 @@ class DecisionMaker:
             self.symbol = symbol
             self.side = side
             self.trading_system = trading_system
+            self.created_at = time.monotonic()
 
         def __str__(self) -> str:
             return f'{self.symbol} {self.side} {self.trading_system}'
@@ -33,82 +45,257 @@ class DecisionMaker:
         def __repr__(self) -> str:
             return f'{self.symbol} {self.side} {self.trading_system}'
 
+    class Masks:
+        def __init__(
+                self,
+                symbols: List[Symbol],
+                has_values: np.ndarray,
+                buy: np.ndarray,
+                sell: np.ndarray,
+                close_buy: np.ndarray,
+                close_sell: np.ndarray,
+        ) -> None:
+            self.positions = {symbol: position for position, symbol in enumerate(symbols)}
+            self.has_values = has_values
+            self.buy = buy
+            self.sell = sell
+            self.close_buy = close_buy
+            self.close_sell = close_sell
+
     def __init__(
             self,
             trading_system_manager: TradingSystemManager,
             symbol_manager: SymbolManager,
             indicator_value_manager: IndicatorValueManager,
+            batch: bool = False,
+            concurrency: int = 10,
     ) -> None:
         self._trading_system_manager = trading_system_manager
         self._symbol_manager = symbol_manager
         self._indicator_value_manager = indicator_value_manager
+        self._batch = batch
+        self._concurrency = concurrency
+        self._last_pauses = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._symbol_locks: Dict[Symbol, asyncio.Lock] = {}
 
     async def decide(self) -> None:
-        for symbol in self._symbol_manager.list():
+        changed = self._indicator_value_manager.pop_changed()
+        affected = self._get_affected_trading_systems(changed)
+
+        masks = {}
+        if self._batch and affected:
+            affected_trading_systems = {ts for trading_systems in affected.values() for ts in trading_systems}
+            masks = self._evaluate_in_batch(
+                list(affected),
+                [ts for ts in self._trading_system_manager.list() if ts in affected_trading_systems],
+            )
+
+        # The deals of all paused symbols come with one request
+        all_deals = None
+        if any(symbol.pause for symbol in affected):
+            try:
+                all_deals = await app.dealer.get_all_deals()
+            except Warning:
+                logger.warning(f'I did not get deals info and did not check close deal conditions')
+
+        # The symbols wait for their orders side by side, so the last one does not get its order
+        # after all the others
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._concurrency)
+        await asyncio.gather(*(
+            self._decide_for_symbol(symbol, trading_systems, masks, all_deals)
+            for symbol, trading_systems in affected.items()
+        ))
+
+    async def _decide_for_symbol(
+            self,
+            symbol: Symbol,
+            trading_systems: List[TradingSystem],
+            masks: Dict[TradingSystem, Masks],
+            all_deals: Optional[Dict[Symbol, List[Deal]]],
+    ) -> None:
+        # The lock keeps an overlapping decision from opening the same symbol twice,
+        # the pause is read again under it
+        lock = self._symbol_locks.setdefault(symbol, asyncio.Lock())
+        async with self._semaphore, lock:
             if not symbol.pause:
-                await self._check_opening_conditions(symbol)
+                if self._batch:
+                    await self._check_opening_masks(symbol, trading_systems, masks)
+                else:
+                    await self._check_opening_conditions(symbol, trading_systems)
             else:
-                await self._check_closing_conditions(symbol)
+                if all_deals is None:
+                    # Without the deals the symbol is checked completely next time
+                    self._last_pauses.pop(symbol, None)
+                    return
+
+                deals = all_deals.get(symbol, [])
+                if self._batch:
+                    await self._check_closing_masks(symbol, trading_systems, masks, deals)
+                else:
+                    await self._check_closing_conditions(symbol, trading_systems, deals)
+
+            self._last_pauses[symbol] = symbol.pause
+
+    def _get_affected_trading_systems(
+            self,
+            changed: Set[Tuple[Indicator, Symbol]],
+    ) -> Dict[Symbol, List[TradingSystem]]:
+        changed_indicators_by_symbol = {}
+        for indicator, symbol in changed:
+            changed_indicators_by_symbol.setdefault(symbol, []).append(indicator)
 
-    async def _check_opening_conditions(self, symbol: Symbol) -> None:
-        for trading_system in self._trading_system_manager.list():
+        trading_systems = self._trading_system_manager.list()
+        affected = {}
+        for symbol in self._symbol_manager.list():
+            # A symbol seen for the first time or paused/unpaused since the last decision is checked completely
+            if self._last_pauses.get(symbol) is not symbol.pause:
+                affected[symbol] = trading_systems
+                continue
+
+            affected_trading_systems = set()
+            for indicator in changed_indicators_by_symbol.get(symbol, []):
+                affected_trading_systems.update(self._trading_system_manager.list_by_indicator(indicator))
+
+            if affected_trading_systems:
+                affected[symbol] = [ts for ts in trading_systems if ts in affected_trading_systems]
+
+        return affected
+
+    async def _check_opening_conditions(self, symbol: Symbol, trading_systems: List[TradingSystem] = None) -> None:
+        if trading_systems is None:
+            trading_systems = self._trading_system_manager.list()
+
+        for trading_system in trading_systems:
             indicator_values = self._get_actual_indicator_values(symbol, trading_system)
 
             if self._all_required_indicators_has_values(trading_system, indicator_values):
-                buy = await self._check_buy_conditions(indicator_values, trading_system)
-                sell = await self._check_sell_conditions(indicator_values, trading_system)
+                values = self._get_values_vector(indicator_values)
+                buy = await self._check_buy_conditions(values, trading_system)
+                sell = await self._check_sell_conditions(values, trading_system)
 
                 if buy or sell:
-                    symbol.pause = True
-                    side = DealSide.BUY if buy else DealSide.SELL
-
-                    decision = self.Decision(
-                        symbol=symbol,
-                        side=side,
-                        trading_system=trading_system,
-                    )
+                    await self._open_deal(symbol, trading_system, buy)
+                    # One deal per symbol, the other trading systems wait until it is closed
+                    return
 
-                    logger.info(f'I decide to open deal for for {symbol} because '
-                                f'{trading_system.conditions_to_buy if buy else trading_system.conditions_to_sell}')
-
-                    await app.dealer.open_deal(decision=decision)
+    async def _check_closing_conditions(
+            self,
+            symbol: Symbol,
+            trading_systems: List[TradingSystem] = None,
+            deals: List[Deal] = None,
+    ) -> None:
+        if trading_systems is None:
+            trading_systems = self._trading_system_manager.list()
 
-    async def _check_closing_conditions(self, symbol: Symbol) -> None:
-        for trading_system in self._trading_system_manager.list():
+        for trading_system in trading_systems:
             indicator_values = self._get_actual_indicator_values(symbol, trading_system)
 
             if self._all_required_indicators_has_values(trading_system, indicator_values):
+                if deals is None:
+                    try:
+                        deals = await app.dealer.get_deals_by_symbol(symbol)
+                    except Warning:
+                        logger.warning(f'I did not get deals info for {symbol} and did not check close deal conditions')
+                        continue
+
+                values = self._get_values_vector(indicator_values)
+                for deal in deals:
+                    close_condition = self._get_close_conditions(trading_system, deal.side)
+                    close = self._check_conditions(values, close_condition)
+
+                    if close:
+                        await self._close_deal(symbol, trading_system, deal.side, close_condition)
+
+    async def _check_opening_masks(
+            self,
+            symbol: Symbol,
+            trading_systems: List[TradingSystem],
+            masks: Dict[TradingSystem, Masks],
+    ) -> None:
+        for trading_system in trading_systems:
+            position = masks[trading_system].positions[symbol]
+            if not masks[trading_system].has_values[position]:
+                continue
+
+            buy = bool(masks[trading_system].buy[position])
+            sell = bool(masks[trading_system].sell[position])
+
+            if buy or sell:
+                await self._open_deal(symbol, trading_system, buy)
+                return
+
+    async def _check_closing_masks(
+            self,
+            symbol: Symbol,
+            trading_systems: List[TradingSystem],
+            masks: Dict[TradingSystem, Masks],
+            deals: List[Deal] = None,
+    ) -> None:
+        for trading_system in trading_systems:
+            position = masks[trading_system].positions[symbol]
+            if not masks[trading_system].has_values[position]:
+                continue
+
+            if deals is None:
                 try:
                     deals = await app.dealer.get_deals_by_symbol(symbol)
                 except Warning:
                     logger.warning(f'I did not get deals info for {symbol} and did not check close deal conditions')
                     continue
 
-                for deal in deals:
-                    if deal.side == DealSide.BUY:
-                        close_condition = list(filter(
-                            lambda condition: condition.is_close_condition, trading_system.conditions_to_sell
-                        ))
-                        closing_deal_side = DealSide.SELL
-                    else:
-                        close_condition = list(filter(
-                            lambda condition: condition.is_close_condition, trading_system.conditions_to_buy
-                        ))
-                        closing_deal_side = DealSide.BUY
-
-                    close = self._check_conditions(indicator_values, close_condition)
+            for deal in deals:
+                if deal.side == DealSide.BUY:
+                    close = bool(masks[trading_system].close_buy[position])
+                else:
+                    close = bool(masks[trading_system].close_sell[position])
 
-                    if close:
-                        symbol.pause = False
+                if close:
+                    close_condition = self._get_close_conditions(trading_system, deal.side)
+                    await self._close_deal(symbol, trading_system, deal.side, close_condition)
+
+    async def _open_deal(self, symbol: Symbol, trading_system: TradingSystem, buy: bool) -> None:
+        symbol.pause = True
+        side = DealSide.BUY if buy else DealSide.SELL
+
+        decision = self.Decision(
+            symbol=symbol,
+            side=side,
+            trading_system=trading_system,
+        )
+
+        logger.info(f'I decide to open deal for for {symbol} because '
+                    f'{trading_system.conditions_to_buy if buy else trading_system.conditions_to_sell}')
+
+        await app.dealer.open_deal(decision=decision)
+
+    async def _close_deal(
+            self,
+            symbol: Symbol,
+            trading_system: TradingSystem,
+            deal_side: DealSide,
+            close_condition: List[Condition],
+    ) -> None:
+        symbol.pause = False
+
+        decision = self.Decision(
+            symbol=symbol,
+            side=DealSide.SELL if deal_side == DealSide.BUY else DealSide.BUY,
+            trading_system=trading_system,
+        )
+        logger.info(f'I decide to close deal for for {symbol} because {close_condition}')
 
-                        decision = self.Decision(
-                            symbol=symbol,
-                            side=closing_deal_side,
-                            trading_system=trading_system,
-                        )
-                        logger.info(f'I decide to close deal for for {symbol} because {close_condition}')
+        await app.dealer.close_deal(decision=decision)
 
-                        await app.dealer.close_deal(decision=decision)
+    @staticmethod
+    def _get_close_conditions(trading_system: TradingSystem, deal_side: DealSide) -> List[Condition]:
+        # A buy deal is closed by the close conditions of selling and vice versa
+        if deal_side == DealSide.BUY:
+            conditions = trading_system.conditions_to_sell
+        else:
+            conditions = trading_system.conditions_to_buy
+        return [condition for condition in conditions if condition.is_close_condition]
 
     def _get_actual_indicator_values(
             self,
@@ -118,7 +305,8 @@ class DecisionMaker:
         indicator_values = []
         for indicator in trading_system.indicators:
             indicator_value = self._indicator_value_manager.get(indicator=indicator, symbol=symbol)
-            if indicator_value and indicator_value.is_actual():
+            # Conditions over older values can not be checked until the history is long enough
+            if indicator_value and indicator_value.is_actual() and indicator_value.has_history():
                 indicator_values.append(indicator_value)
         return indicator_values
 
@@ -129,33 +317,96 @@ class DecisionMaker:
     ) -> bool:
         return len(trading_system.indicators) == len(indicator_values)
 
+    @staticmethod
+    def _get_values_vector(indicator_values: List[IndicatorValue]) -> List[Sequence[float]]:
+        # The order matches trading_system.indicators, which the conditions were compiled against.
+        # Every row goes back in time (present value first) and is a view of the indicator's history.
+        return [
+            indicator_value.history.last(indicator_value.indicator.history_size)[::-1]
+            for indicator_value in indicator_values
+        ]
+
     async def _check_sell_conditions(
             self,
-            indicator_values: List[IndicatorValue],
+            values: List[Sequence[float]],
             trading_system: TradingSystem
     ) -> bool:
-        return self._check_conditions(indicator_values, trading_system.conditions_to_sell)
+        return self._check_conditions(values, trading_system.conditions_to_sell)
 
     async def _check_buy_conditions(
             self,
-            indicator_values: List[IndicatorValue],
+            values: List[Sequence[float]],
             trading_system: TradingSystem
     ) -> bool:
-        return self._check_conditions(indicator_values, trading_system.conditions_to_buy)
+        return self._check_conditions(values, trading_system.conditions_to_buy)
 
     @staticmethod
     def _check_conditions(
-            indicator_values: List[IndicatorValue],
+            values: List[Sequence[float]],
             conditions: List[Condition]
     ) -> bool:
-        is_satisfied = True
         for condition in conditions:
-            if is_satisfied:
-                first_operand_value = condition.first_operand.get_operand_value(indicator_values=indicator_values)
-                second_operand_value = condition.second_operand.get_operand_value(indicator_values=indicator_values)
-
-                is_satisfied = condition.is_satisfied(
-                    first_operand_value=first_operand_value,
-                    second_operand_value=second_operand_value,
-                )
-        return is_satisfied
+            if not condition.evaluate(values):
+                return False
+        return True
+
+    def _evaluate_in_batch(
+            self,
+            symbols: List[Symbol],
+            trading_systems: List[TradingSystem],
+    ) -> Dict[TradingSystem, Masks]:
+        masks = {}
+        for trading_system in trading_systems:
+            values, has_values = self._get_values_matrix(symbols, trading_system)
+
+            masks[trading_system] = self.Masks(
+                symbols=symbols,
+                has_values=has_values,
+                buy=self._check_conditions_in_batch(values, trading_system.conditions_to_buy),
+                sell=self._check_conditions_in_batch(values, trading_system.conditions_to_sell),
+                close_buy=self._check_conditions_in_batch(
+                    values, self._get_close_conditions(trading_system, DealSide.BUY)
+                ),
+                close_sell=self._check_conditions_in_batch(
+                    values, self._get_close_conditions(trading_system, DealSide.SELL)
+                ),
+            )
+        return masks
+
+    def _get_values_matrix(
+            self,
+            symbols: List[Symbol],
+            trading_system: TradingSystem,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        # Shape (symbols, indicators, depth): the same vector as _get_values_vector for every symbol
+        values = np.full((len(symbols), len(trading_system.indicators), trading_system.history_size), np.nan)
+        has_values = np.ones(len(symbols), dtype=bool)
+        now = datetime.now().timestamp()
+
+        for indicator_position, indicator in enumerate(trading_system.indicators):
+            table = self._indicator_value_manager.get_table(indicator)
+            if table is None:
+                has_values[:] = False
+                continue
+
+            rows = table.get_rows(symbols)
+            found = rows >= 0
+            rows[~found] = 0
+            depth = min(indicator.history_size, table.depth)
+            # The same checks as is_actual and has_history, for all the symbols at once
+            has_values &= found
+            has_values &= table.updated_at[rows] + indicator.interval.timeout > now
+            has_values &= table.lengths[rows] >= indicator.history_size
+            values[:, indicator_position, :depth] = table.values[rows, :depth]
+
+        return values, has_values
+
+    @staticmethod
+    def _check_conditions_in_batch(
+            values: np.ndarray,
+            conditions: List[Condition]
+    ) -> np.ndarray:
+        mask = np.ones(len(values), dtype=bool)
+        for condition in conditions:
+            mask &= condition.evaluate_batch(values)
+        return mask
@@ -0,0 +1,274 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from trading_bot.adapters.binance import AdapterBinance
+from trading_bot.models.candles import Candle, CandleManager, CandleWindow
+from trading_bot.models.indicators import Indicator
+from trading_bot.models.symbols import Symbol
+
+logger = logging.getLogger('logger')
+
+
+def moving_average(close: np.ndarray, period: int = 30) -> np.ndarray:
+    result = np.full(len(close), np.nan)
+    if len(close) >= period:
+        cumsum = np.cumsum(np.insert(close, 0, 0.0))
+        result[period - 1:] = (cumsum[period:] - cumsum[:-period]) / period
+    return result
+
+
+def momentum(close: np.ndarray, period: int = 10) -> np.ndarray:
+    result = np.full(len(close), np.nan)
+    if len(close) > period:
+        result[period:] = close[period:] - close[:-period]
+    return result
+
+
+def adx(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 14) -> np.ndarray:
+    result = np.full(len(close), np.nan)
+    if len(close) < 2 * period:
+        return result
+
+    up_move = high[1:] - high[:-1]
+    down_move = low[:-1] - low[1:]
+    plus_dm = np.where((up_move > down_move) & (up_move > 0), up_move, 0.0)
+    minus_dm = np.where((down_move > up_move) & (down_move > 0), down_move, 0.0)
+    true_range = np.maximum.reduce([
+        high[1:] - low[1:],
+        np.abs(high[1:] - close[:-1]),
+        np.abs(low[1:] - close[:-1]),
+    ])
+
+    smoothed_tr = _wilder_sum(true_range, period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        plus_di = 100 * _wilder_sum(plus_dm, period) / smoothed_tr
+        minus_di = 100 * _wilder_sum(minus_dm, period) / smoothed_tr
+        dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+    dx = np.nan_to_num(dx)
+
+    # The first ADX is the mean of the first `period` DX values, then Wilder smoothing
+    adx_values = np.empty(len(dx) - period + 1)
+    adx_values[0] = dx[:period].mean()
+    for i in range(1, len(adx_values)):
+        adx_values[i] = (adx_values[i - 1] * (period - 1) + dx[i + period - 1]) / period
+
+    result[2 * period - 1:] = adx_values
+    return result
+
+
+def parabolic_sar(
+        high: np.ndarray,
+        low: np.ndarray,
+        acceleration: float = 0.02,
+        maximum: float = 0.2,
+) -> np.ndarray:
+    result = np.full(len(high), np.nan)
+    if len(high) < 2:
+        return result
+
+    # SAR depends on its own previous value, so it is a plain loop over the window (like in TA-Lib)
+    down_move = low[0] - low[1]
+    is_long = not (down_move > 0 and down_move > high[1] - high[0])
+    factor = acceleration
+    if is_long:
+        extreme, sar = high[1], low[0]
+    else:
+        extreme, sar = low[1], high[0]
+
+    # On the first bar TA-Lib compares with the bar itself, not with the seed bar
+    previous_high, previous_low = high[1], low[1]
+    for i in range(1, len(high)):
+        if i > 1:
+            previous_high, previous_low = high[i - 1], low[i - 1]
+
+        if is_long:
+            if low[i] <= sar:
+                is_long = False
+                sar = max(extreme, previous_high, high[i])
+                result[i] = sar
+                factor = acceleration
+                extreme = low[i]
+                sar = max(sar + factor * (extreme - sar), previous_high, high[i])
+            else:
+                result[i] = sar
+                if high[i] > extreme:
+                    extreme = high[i]
+                    factor = min(factor + acceleration, maximum)
+                sar = min(sar + factor * (extreme - sar), previous_low, low[i])
+        else:
+            if high[i] >= sar:
+                is_long = True
+                sar = min(extreme, previous_low, low[i])
+                result[i] = sar
+                factor = acceleration
+                extreme = high[i]
+                sar = min(sar + factor * (extreme - sar), previous_low, low[i])
+            else:
+                result[i] = sar
+                if low[i] < extreme:
+                    extreme = low[i]
+                    factor = min(factor + acceleration, maximum)
+                sar = max(sar + factor * (extreme - sar), previous_high, high[i])
+
+    return result
+
+
+def calculate(
+        indicator_type: str,
+        optional: Dict[str, float],
+        high: np.ndarray,
+        low: np.ndarray,
+        close: np.ndarray,
+) -> np.ndarray:
+    # taapi.io names the period `period`, the older settings use TA-Lib's `optInTimePeriod`
+    period = optional.get('period') or optional.get('optInTimePeriod')
+
+    if indicator_type == 'MovingAverage':
+        return moving_average(close, int(period or 30))
+    if indicator_type == 'Momentum':
+        return momentum(close, int(period or 10))
+    if indicator_type == 'ADX':
+        return adx(high, low, close, int(period or 14))
+    if indicator_type == 'ParabolicSAR':
+        return parabolic_sar(
+            high,
+            low,
+            acceleration=optional.get('acceleration', 0.02),
+            maximum=optional.get('maximum', 0.2),
+        )
+    raise ValueError
+
+
+def _wilder_sum(values: np.ndarray, period: int) -> np.ndarray:
+    # Seeded with the sum of the first period - 1 values, the same way TA-Lib does it
+    result = np.empty(len(values) - period + 1)
+    previous = values[:period - 1].sum()
+    for i in range(len(result)):
+        previous = previous - previous / period + values[i + period - 1]
+        result[i] = previous
+    return result
+
+
+class LocalIndicatorEngine:
+
+    def __init__(self, candles_adapter: AdapterBinance, window_size: int = 500) -> None:
+        self._candles_adapter = candles_adapter
+        self._window_size = window_size
+        self._candle_manager = CandleManager(window_size=window_size)
+        self._locks = {}
+        self._calculated = {}
+
+    async def open(self) -> None:
+        await self._candles_adapter.open()
+
+    async def close(self) -> None:
+        await self._candles_adapter.close()
+
+    async def get_indicator_values(
+            self,
+            symbol: Symbol,
+            indicator: Indicator,
+    ) -> Dict[str, float]:
+        window = await self._get_actual_window(symbol, indicator.interval)
+
+        # The values change only when a new candle closes, until then they are served from memory
+        key = f'{indicator.name}_{symbol.name}'
+        last_open_time, values = self._calculated.get(key, (None, None))
+        if last_open_time != window.last_open_time():
+            values = self._calculate(indicator, window)
+            self._calculated[key] = (window.last_open_time(), values)
+            logger.info(f'{symbol} {indicator} {values}')
+
+        return values
+
+    async def get_bulk_indicator_values(
+            self,
+            symbol: Symbol,
+            indicators: List[Indicator],
+    ) -> Dict[Indicator, Dict[str, float]]:
+        indicator_values = {}
+        for indicator in indicators:
+            try:
+                indicator_values[indicator] = await self.get_indicator_values(symbol, indicator)
+            except Warning:
+                continue
+        return indicator_values
+
+    def add_candle(self, symbol: Symbol, interval: Indicator.Interval, candle: Candle) -> bool:
+        # False when the window has to be fetched by REST
+        window = self._candle_manager.get(symbol, interval)
+        if window is None or not len(window):
+            return False
+
+        # After a gap the missing candles are fetched on the next request, a single candle would hide them
+        next_open_time = window.last_open_time() + interval.timeout * 1000
+        if candle.open_time not in (window.last_open_time(), next_open_time):
+            return False
+
+        window.append(candle)
+        return True
+
+    async def _get_actual_window(self, symbol: Symbol, interval: Indicator.Interval) -> CandleWindow:
+        key = f'{symbol.name}_{interval.name}'
+        if key not in self._locks:
+            self._locks[key] = asyncio.Lock()
+
+        # Indicators of one symbol and interval share the window, so only the first of them fetches candles
+        async with self._locks[key]:
+            window = self._candle_manager.get_or_create(symbol, interval)
+            now_ms = int(time.time() * 1000)
+            interval_ms = interval.timeout * 1000
+
+            if len(window) and window.last_close_time() + interval_ms >= now_ms:
+                return window
+
+            # Only the missing candles are fetched, unless the gap is longer than the whole window
+            start_time = None
+            if len(window) and now_ms - window.last_close_time() < self._window_size * interval_ms:
+                start_time = window.last_open_time() + interval_ms
+            else:
+                window.clear()
+
+            candles = await self._candles_adapter.get_candles(
+                symbol=symbol,
+                interval=interval,
+                limit=self._window_size + 1,
+                start_time=start_time,
+            )
+
+            # The last candle from the exchange is usually still open
+            window.extend([candle for candle in candles if candle.close_time < now_ms])
+
+        return window
+
+    @staticmethod
+    def _calculate(indicator: Indicator, window: CandleWindow) -> Dict[str, float]:
+        try:
+            values = calculate(
+                indicator_type=indicator.indicator_type,
+                optional=indicator.optional,
+                high=window.high,
+                low=window.low,
+                close=window.close,
+            )
+        except ValueError:
+            logger.warning(f'I can not calculate {indicator.indicator_type} locally ({indicator})')
+            raise Warning
+
+        if len(values) < 2 or np.isnan(values[-2]):
+            logger.warning(f'{window} is too short for {indicator}')
+            raise Warning
+
+        indicator_values = {
+            'present_value': float(values[-1]),
+            'previous_value': float(values[-2]),
+        }
+        # Older values are only needed by the conditions like `value[-3]`, they fill the history at once
+        if indicator.history_size > 2:
+            history = values[-indicator.history_size:]
+            indicator_values['history'] = history[~np.isnan(history)].tolist()
+        return indicator_values
@@ -1,9 +1,12 @@
 import asyncio
 from datetime import datetime, timedelta
 import logging
+from typing import List
 
-from trading_bot import app, DecisionMaker, AdapterTaAPI
+from trading_bot import app, DecisionMaker, AdapterTaAPI, IndicatorValueStore
+from trading_bot.models.candles import Candle
 from trading_bot.models.indicators import Indicator
+from trading_bot.models.symbols import Symbol
 
 logger = logging.getLogger('logger')
 
@@ -14,25 +17,42 @@ class IndicatorUpdater:
             self,
             indicator_adapter: AdapterTaAPI,
             decision_maker: DecisionMaker,
+            bulk: bool = False,
+            settle_delay: float = 5,
+            decision_delay: float = 1,
+            value_store: IndicatorValueStore = None,
     ) -> None:
         self._last_updates = {}
+        self._bulk = bulk
+        self._settle_delay = timedelta(seconds=settle_delay)
+        self._decision_delay = decision_delay
+        self._decision_task = None
+        self._decision_pending = False
+        self._decision_lock = None
+        self._value_store = value_store
         self._values_updated = False
         self._indicator_adapter = indicator_adapter
         self._decision_maker = decision_maker
 
     async def run(self) -> None:
+        if self._value_store is not None:
+            self._restore_values()
+
         while True:
             logger.info(f'I started to update indicator values.')
 
             self._values_updated = False
-            await self._update()
+            with app.metrics.timer('cycle_seconds', loop='indicator_updater'):
+                await self._update()
             if self._values_updated:
+                self._save_values()
                 await self._call_decision_maker()
 
+            next_update_time = self._next_update_time()
             logger.info(f'I just updated indicator values. '
-                        f'Next update at {datetime.now() + timedelta(seconds=app.indicator_update_timeout)}')
+                        f'Next update at {next_update_time}')
 
-            await asyncio.sleep(app.indicator_update_timeout)
+            await asyncio.sleep(max((next_update_time - datetime.now()).total_seconds(), 0))
 
     async def _update(self) -> None:
         min_timeout = 604800  # It's a week, which is just a huge number for the initialization.
@@ -41,14 +61,23 @@ class IndicatorUpdater:
         if not indicators:
             raise ValueError
 
+        indicators_to_update = []
         for indicator in indicators:
             if indicator.interval.timeout < min_timeout:
                 min_timeout = indicator.interval.timeout
 
             if self._its_time_to_update(indicator):
-                await self._update_indicator_values(indicator)
-                self._last_updates[indicator] = datetime.now()
-                self._values_updated = True
+                indicators_to_update.append(indicator)
+
+        # All pending requests are sent at once, the adapter's rate limiter paces them
+        if self._bulk:
+            await self._update_indicator_values_in_bulk(indicators_to_update)
+        else:
+            await asyncio.gather(*(self._update_indicator_values(indicator) for indicator in indicators_to_update))
+
+        for indicator in indicators_to_update:
+            self._last_updates[indicator] = datetime.now()
+            self._values_updated = True
 
         app.indicator_update_timeout = min_timeout / 2
 
@@ -58,33 +87,154 @@ class IndicatorUpdater:
         last_update_time = self._last_updates.get(indicator)
         if not last_update_time:
             its_time = True
-        elif (last_update_time + timedelta(seconds=(indicator.interval.timeout / 2))) <= datetime.now():
+        elif last_update_time < self._last_candle_close_time(indicator.interval, datetime.now()):
             its_time = True
 
         return its_time
 
+    def _next_update_time(self) -> datetime:
+        now = datetime.now()
+        # Values of closed candles change only at candle boundaries, so there is nothing to do until the next one
+        intervals = {indicator.interval.name: indicator.interval for indicator in app.indicator_manager.list()}
+        return min(
+            interval.next_close_time(now - self._settle_delay) + self._settle_delay
+            for interval in intervals.values()
+        )
+
+    def _last_candle_close_time(self, interval: Indicator.Interval, now: datetime) -> datetime:
+        # The exchange needs a few seconds after the close to publish the candle
+        return interval.last_close_time(now - self._settle_delay) + self._settle_delay
+
     async def _update_indicator_values(self, indicator: Indicator) -> None:
         symbols = app.symbol_manager.list()
         if not symbols:
             raise ValueError
 
-        for symbol in symbols:
-            if not symbol.pause:
-                try:
-                    new_values = await self._indicator_adapter.get_indicator_values(
-                        symbol=symbol,
-                        indicator=indicator
-                    )
-                except Warning:
-                    logger.warning(f'I did not get the new indicator values for {symbol}')
+        await asyncio.gather(*(
+            self._update_symbol_indicator_values(symbol, indicator) for symbol in symbols if not symbol.pause
+        ))
+
+    async def _update_symbol_indicator_values(self, symbol: Symbol, indicator: Indicator) -> None:
+        try:
+            new_values = await self._indicator_adapter.get_indicator_values(
+                symbol=symbol,
+                indicator=indicator
+            )
+        except Warning:
+            logger.warning(f'I did not get the new indicator values for {symbol}')
+            return
+
+        app.indicator_value_manager.update(
+            symbol=symbol,
+            indicator=indicator,
+            present_value=new_values['present_value'],
+            previous_value=new_values['previous_value'],
+            history=new_values.get('history'),
+        )
+
+    async def _update_indicator_values_in_bulk(self, indicators: List[Indicator]) -> None:
+        if not indicators:
+            return
+
+        symbols = app.symbol_manager.list()
+        if not symbols:
+            raise ValueError
+
+        indicators_by_interval = {}
+        for indicator in indicators:
+            indicators_by_interval.setdefault(indicator.interval.name, []).append(indicator)
+
+        await asyncio.gather(*(
+            self._update_symbol_indicator_values_in_bulk(symbol, interval_indicators)
+            for symbol in symbols if not symbol.pause
+            for interval_indicators in indicators_by_interval.values()
+        ))
+
+    async def _update_symbol_indicator_values_in_bulk(self, symbol: Symbol, indicators: List[Indicator]) -> None:
+        try:
+            new_values = await self._indicator_adapter.get_bulk_indicator_values(
+                symbol=symbol,
+                indicators=indicators,
+            )
+        except Warning:
+            logger.warning(f'I did not get the new indicator values for {symbol} {indicators}')
+            return
+
+        for indicator, values in new_values.items():
+            app.indicator_value_manager.update(
+                symbol=symbol,
+                indicator=indicator,
+                present_value=values['present_value'],
+                previous_value=values['previous_value'],
+                history=values.get('history'),
+            )
+
+    async def on_candle_closed(self, symbol: Symbol, interval: Indicator.Interval, candle: Candle) -> None:
+        if symbol.pause:
+            return
+
+        # When the candle does not fit the window, the engine fetches the missing candles by itself
+        self._indicator_adapter.add_candle(symbol, interval, candle)
+
+        indicators = [
+            indicator for indicator in app.indicator_manager.list() if indicator.interval.name == interval.name
+        ]
+        await asyncio.gather(*(self._update_symbol_indicator_values(symbol, indicator) for indicator in indicators))
+
+        self._schedule_decision()
+
+    def _schedule_decision(self) -> None:
+        # Candles of all symbols close at the same time, so they are decided together a bit later
+        if not self._decision_pending:
+            self._decision_pending = True
+            self._decision_task = asyncio.create_task(self._call_decision_maker_later())
+
+    async def _call_decision_maker_later(self) -> None:
+        await asyncio.sleep(self._decision_delay)
+        self._decision_pending = False
+        self._save_values()
+        await self._call_decision_maker()
+
+    def _restore_values(self) -> None:
+        try:
+            rows = self._value_store.load()
+        except Warning:
+            return
+
+        restored = 0
+        for row in rows:
+            indicator = app.indicator_manager.get(row['indicator'])
+            symbol = app.symbol_manager.get(row['symbol'])
+            if indicator is None or symbol is None:
+                continue
+            if app.indicator_value_manager.restore(indicator, symbol, row['history'], row['updated_at']):
+                restored += 1
+
+        # An indicator restored for every symbol is not due until its next candle closes
+        for indicator in app.indicator_manager.list():
+            updates = []
+            for symbol in app.symbol_manager.list():
+                if symbol.pause:
                     continue
+                indicator_value = app.indicator_value_manager.get(indicator, symbol)
+                updates.append(indicator_value.updated_at if indicator_value else None)
+            if updates and None not in updates:
+                self._last_updates[indicator] = min(updates)
+
+        logger.info(f'I restored {restored} indicator values')
 
-                app.indicator_value_manager.update(
-                    symbol=symbol,
-                    indicator=indicator,
-                    present_value=new_values['present_value'],
-                    previous_value=new_values['previous_value']
-                )
+    def _save_values(self) -> None:
+        if self._value_store is None:
+            return
+        try:
+            self._value_store.save(app.indicator_value_manager.list())
+        except Warning:
+            pass
 
     async def _call_decision_maker(self) -> None:
-        await self._decision_maker.decide()
+        # The stream and the schedule may both want a decision, they must not open the same deal twice
+        if self._decision_lock is None:
+            self._decision_lock = asyncio.Lock()
+        async with self._decision_lock:
+            with app.metrics.timer('cycle_seconds', loop='decision_maker'):
+                await self._decision_maker.decide()
@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Dict, List, Optional
+
+from trading_bot import app
+
+logger = logging.getLogger('logger')
+
+module_path = os.path.abspath(__file__)
+project_dir = os.path.dirname(os.path.dirname(os.path.dirname(module_path)))
+
+
+class LoopLagMonitor:
+    # A watchdog thread takes the stack of the loop thread while the blocking call is still running
+
+    def __init__(self, interval: float = 0.1, threshold: float = 0.25) -> None:
+        if threshold <= interval:
+            raise ValueError
+        self._interval = interval
+        self._threshold = threshold
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._stall_stack: Optional[traceback.StackSummary] = None
+        self._stopped = threading.Event()
+        self._offenders: Dict[str, Dict[str, Any]] = {}
+
+    async def run(self) -> None:
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        watchdog = threading.Thread(target=self._watch, name='Loop watchdog', daemon=True)
+        watchdog.start()
+
+        try:
+            while True:
+                started_at = time.monotonic()
+                await asyncio.sleep(self._interval)
+                self._heartbeat = time.monotonic()
+
+                lag = self._heartbeat - started_at - self._interval
+                app.metrics.observe('loop_lag_seconds', lag)
+                if lag > self._threshold:
+                    self._record_stall(lag)
+                else:
+                    # The stack of a wake up late but under the threshold must not be blamed for the next stall
+                    self._stall_stack = None
+        finally:
+            self._stopped.set()
+            watchdog.join()
+            if self._offenders:
+                logger.info(f'The event loop was blocked by: {self.report()}')
+
+    def report(self) -> List[Dict[str, Any]]:
+        return sorted(
+            ({'location': location, **offender} for location, offender in self._offenders.items()),
+            key=lambda offender: offender['seconds'],
+            reverse=True,
+        )
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(self._threshold / 2):
+            # The heartbeat is `interval` old even when the loop is on time
+            if self._stall_stack is None and time.monotonic() - self._heartbeat > self._interval + self._threshold:
+                frame = sys._current_frames().get(self._loop_thread_id)
+                if frame is not None:
+                    self._stall_stack = traceback.extract_stack(frame)
+
+    def _record_stall(self, lag: float) -> None:
+        stack, self._stall_stack = self._stall_stack, None
+        location = self._get_location(stack) if stack else 'unknown'
+
+        offender = self._offenders.setdefault(location, {'count': 0, 'seconds': 0})
+        offender['count'] += 1
+        offender['seconds'] += lag
+        app.metrics.inc('loop_stalls_total', location=location)
+
+        msg = f'The event loop was blocked for {lag:.3f}s at {location}'
+        if offender['count'] == 1 and stack:
+            # The whole stack only for the first time, later it is the same one
+            msg += '\n' + ''.join(stack.format())
+        logger.warning(msg)
+
+    @staticmethod
+    def _get_location(stack: traceback.StackSummary) -> str:
+        for frame in reversed(stack):
+            if frame.filename.startswith(project_dir) and frame.filename != module_path:
+                return f'{os.path.relpath(frame.filename, project_dir)}:{frame.lineno} {frame.name}'
+
+        frame = stack[-1]
+        return f'{frame.filename}:{frame.lineno} {frame.name}'
@@ -0,0 +1,103 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+
+LabelValues = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    # Seconds, from a quick local calculation to a slow exchange
+    buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+    def __init__(self) -> None:
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for position, bucket in enumerate(self.buckets):
+            if value <= bucket:
+                self.counts[position] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    def __init__(self, prefix: str = 'trading_bot') -> None:
+        self._prefix = prefix
+        self._histograms: Dict[str, Dict[LabelValues, Histogram]] = {}
+        self._counters: Dict[str, Dict[LabelValues, float]] = {}
+        self._gauges: Dict[str, Dict[LabelValues, float]] = {}
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        histograms = self._histograms.setdefault(name, {})
+        key = self._get_key(labels)
+        if key not in histograms:
+            histograms[key] = Histogram()
+        histograms[key].observe(value)
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        counters = self._counters.setdefault(name, {})
+        key = self._get_key(labels)
+        counters[key] = counters.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels: str) -> None:
+        self._gauges.setdefault(name, {})[self._get_key(labels)] = value
+
+    @contextmanager
+    def timer(self, name: str, **labels: str) -> Iterator[None]:
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started_at, **labels)
+
+    def get_counter(self, name: str, **labels: str) -> float:
+        return self._counters.get(name, {}).get(self._get_key(labels), 0)
+
+    def get_gauge(self, name: str, **labels: str) -> float:
+        return self._gauges.get(name, {}).get(self._get_key(labels), 0)
+
+    def get_histogram(self, name: str, **labels: str) -> Histogram:
+        return self._histograms.get(name, {}).get(self._get_key(labels), Histogram())
+
+    def render(self) -> str:
+        lines = []
+        for metric_type, metrics in (('counter', self._counters), ('gauge', self._gauges)):
+            for name, values in sorted(metrics.items()):
+                full_name = f'{self._prefix}_{name}'
+                lines.append(f'# TYPE {full_name} {metric_type}')
+                for key, value in sorted(values.items()):
+                    lines.append(f'{full_name}{self._format_labels(key)} {value}')
+
+        for name, histograms in sorted(self._histograms.items()):
+            full_name = f'{self._prefix}_{name}'
+            lines.append(f'# TYPE {full_name} histogram')
+            for key, histogram in sorted(histograms.items()):
+                # Prometheus buckets are cumulative
+                cumulative = 0
+                for bucket, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{full_name}_bucket{self._format_labels(key, le=str(bucket))} {cumulative}')
+                lines.append(f'{full_name}_bucket{self._format_labels(key, le="+Inf")} {histogram.count}')
+                lines.append(f'{full_name}_sum{self._format_labels(key)} {histogram.sum}')
+                lines.append(f'{full_name}_count{self._format_labels(key)} {histogram.count}')
+
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _get_key(labels: Dict[str, str]) -> LabelValues:
+        return tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+    @staticmethod
+    def _format_labels(key: LabelValues, **extra: str) -> str:
+        pairs: List[Tuple[str, str]] = list(key) + list(extra.items())
+        if not pairs:
+            return ''
+        labels = ','.join(f'{label}="{Metrics._escape(value)}"' for label, value in pairs)
+        return f'{{{labels}}}'
+
+    @staticmethod
+    def _escape(value: str) -> str:
+        return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -0,0 +1,161 @@
+import copy
+import itertools
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+from trading_bot.adapters.history_files import AdapterHistoryCache, AdapterHistoryFiles
+from trading_bot.models.exchanges import ExchangeManager
+from trading_bot.models.indicators import Indicator, IndicatorManager
+from trading_bot.models.symbols import Symbol
+from trading_bot.models.trading_systems import TradingSystem, TradingSystemManager
+from trading_bot.services.backtester import Backtester, IndicatorCache
+
+logger = logging.getLogger('logger')
+
+# State of a worker process, it is set once by _init_worker and only read by the backtests
+_worker = {}
+
+
+def parse_grid(params: List[str]) -> Dict[str, List[Any]]:
+    # `Indicator_name.param=values`, values are `1,2,5`, `1..5` or `1h,4h`
+    grid = {}
+    for param in params:
+        name, values = param.split('=', 1)
+        if '.' not in name:
+            raise ValueError
+
+        if '..' in values:
+            start, stop = values.split('..')
+            grid[name] = list(range(int(start), int(stop) + 1))
+        else:
+            grid[name] = [_parse_value(value) for value in values.split(',')]
+    return grid
+
+
+def _parse_value(value: str) -> Any:
+    for value_type in (int, float):
+        try:
+            return value_type(value)
+        except ValueError:
+            continue
+    return value
+
+
+def generate_settings(
+        settings: Dict[str, Any],
+        grid: Dict[str, List[Any]],
+) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    indicators_by_name = {indicator['name']: indicator for indicator in settings['indicators']}
+    for name in grid:
+        if name.split('.', 1)[0] not in indicators_by_name:
+            raise ValueError
+
+    combinations = []
+    for values in itertools.product(*grid.values()):
+        params = dict(zip(grid, values))
+        combination = copy.deepcopy(settings)
+        indicators_by_name = {indicator['name']: indicator for indicator in combination['indicators']}
+
+        # Indicator names stay the same, so the conditions do not have to change
+        for name, value in params.items():
+            indicator_name, param = name.split('.', 1)
+            if param == 'interval':
+                indicators_by_name[indicator_name]['interval'] = value
+            else:
+                indicators_by_name[indicator_name].setdefault('optional', {})[param] = value
+
+        combinations.append((params, combination))
+    return combinations
+
+
+def _init_worker(
+        history: AdapterHistoryCache,
+        symbols: List[Symbol],
+        exchanges_config: List[Dict[str, str]],
+        indicator_cache_size: int,
+) -> None:
+    # With fork the history is inherited from the parent process without copying
+    _worker['history'] = history
+    _worker['symbols'] = symbols
+    _worker['exchanges_config'] = exchanges_config
+    _worker['indicator_cache'] = IndicatorCache(size=indicator_cache_size)
+
+
+def _create_trading_system(
+        name: str,
+        settings: Dict[str, Any],
+        exchanges_config: List[Dict[str, str]],
+) -> TradingSystem:
+    # Every combination gets its own managers, because the indicators of combinations have the same names
+    exchange_manager = ExchangeManager()
+    for exchange in exchanges_config:
+        exchange_manager.create(name=exchange['name'], deal_opening_method=exchange['deal_opening_method'])
+
+    return TradingSystemManager(IndicatorManager(), exchange_manager).create(name=name, settings=settings)
+
+
+def _backtest(name: str, settings: Dict[str, Any]) -> Dict[str, float]:
+    trading_system = _create_trading_system(name, settings, _worker['exchanges_config'])
+
+    backtester = Backtester(
+        history_adapter=_worker['history'],
+        trading_systems=[trading_system],
+        indicator_cache=_worker['indicator_cache'],
+    )
+    trades = backtester.run(_worker['symbols'])
+
+    return Backtester.summarize(trades).get(name, {'trades': 0, 'wins': 0, 'profit': 0.0, 'win_rate': 0.0,
+                                                   'drawdown': 0.0})
+
+
+class Optimizer:
+    def __init__(
+            self,
+            history_adapter: AdapterHistoryFiles,
+            symbols: List[Symbol],
+            exchanges_config: List[Dict[str, str]],
+            workers: int = None,
+            indicator_cache_size: int = 256,
+    ) -> None:
+        self._history_adapter = history_adapter
+        self._symbols = symbols
+        self._exchanges_config = exchanges_config
+        self._workers = workers or os.cpu_count()
+        self._indicator_cache_size = indicator_cache_size
+
+    def run(self, name: str, settings: Dict[str, Any], grid: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+        combinations = generate_settings(settings, grid)
+        for params, combination in combinations:
+            try:
+                _create_trading_system(name, combination, self._exchanges_config)
+            except ValueError:
+                logger.warning(f'Settings of {name} are not valid with {params}')
+                raise
+
+        # The candles are read from disk once here and shared with all workers
+        intervals = {'1h': Indicator.Interval('1h')}
+        for _, combination in combinations:
+            for indicator in combination['indicators']:
+                intervals[indicator['interval']] = Indicator.Interval(indicator['interval'])
+        history = AdapterHistoryCache.load(self._history_adapter, self._symbols, list(intervals.values()))
+
+        chunk_size = max(1, len(combinations) // (self._workers * 4))
+        with ProcessPoolExecutor(
+                max_workers=self._workers,
+                initializer=_init_worker,
+                initargs=(history, self._symbols, self._exchanges_config, self._indicator_cache_size),
+        ) as executor:
+            results = executor.map(
+                _backtest,
+                itertools.repeat(name),
+                [combination for _, combination in combinations],
+                chunksize=chunk_size,
+            )
+
+            rows = []
+            for (params, _), result in zip(combinations, results):
+                rows.append({**params, **result})
+
+        return sorted(rows, key=lambda row: row['profit'], reverse=True)
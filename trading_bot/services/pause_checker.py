@@ -12,16 +12,25 @@ class PauseChecker:
 
     async def run(self) -> None:
         while True:
-            await self._check_open_deals()
+            with app.metrics.timer('cycle_seconds', loop='pause_checker'):
+                await self._check_open_deals()
             await asyncio.sleep(app.indicator_update_timeout)
 
     async def _check_open_deals(self) -> None:
-        for symbol in app.symbol_manager.list():
-            if symbol.pause:
-                if app.exchange_manager.get('ByBit') in symbol.exchanges:
-                    try:
-                        symbol.pause = await self._dealer.symbol_has_open_deal(symbol=symbol)
-                    except Warning:
-                        logger.warning(f'I did not update pause for {symbol}')
-                else:
-                    symbol.pause = False
+        paused_symbols = [symbol for symbol in app.symbol_manager.list() if symbol.pause]
+        by_bit = app.exchange_manager.get('ByBit')
+
+        # One snapshot of all positions instead of a request per paused symbol
+        deals = None
+        if any(by_bit in symbol.exchanges for symbol in paused_symbols):
+            try:
+                deals = await self._dealer.get_all_deals()
+            except Warning:
+                logger.warning(f'I did not update pauses')
+
+        for symbol in paused_symbols:
+            if by_bit in symbol.exchanges:
+                if deals is not None:
+                    symbol.pause = bool(deals.get(symbol))
+            else:
+                symbol.pause = False
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+from typing import Any, Dict, List, Optional
+
+from trading_bot import AdapterByBit, create_app, create_logger
+from trading_bot.adapters.shared_state import SharedStateServer
+
+logger = logging.getLogger('logger')
+
+
+def run_shard(config_class: type, shard: int, symbols: List[Dict[str, Any]], socket_path: str) -> None:
+    create_app(ShardCoordinator.create_shard_config(config_class, shard, symbols, socket_path)).run()
+
+
+class ShardCoordinator:
+    # A symbol lives in one shard, the positions and the tickers of the account come from the coordinator
+
+    def __init__(
+            self,
+            config_class: type,
+            shards: int,
+            socket_path: str = None,
+            check_interval: float = 5,
+    ) -> None:
+        if shards < 1:
+            raise ValueError
+        # Every shard needs its own key, otherwise they would share one quota
+        if config_class.INDICATORS_SOURCE == 'ta_api' and len(self._get_ta_api_keys(config_class)) < shards:
+            raise ValueError
+        self._config_class = config_class
+        self._shards = shards
+        self._socket_path = socket_path
+        self._check_interval = check_interval
+        # A forked child would inherit the running loop and the open sessions of the coordinator
+        self._context = multiprocessing.get_context('spawn')
+        self._processes: Dict[int, multiprocessing.process.BaseProcess] = {}
+
+    def run(self) -> None:
+        create_logger('[coordinator] ')
+        asyncio.run(self._run())
+
+    @staticmethod
+    def split_symbols(symbols: List[Dict[str, Any]], shards: int) -> List[List[Dict[str, Any]]]:
+        # Round robin, so the shards differ by one symbol at most
+        parts = [symbols[shard::shards] for shard in range(shards)]
+        return [part for part in parts if part]
+
+    @classmethod
+    def create_shard_config(
+            cls,
+            config_class: type,
+            shard: int,
+            symbols: List[Dict[str, Any]],
+            socket_path: str,
+    ) -> type:
+        attributes = {
+            'SHARD': shard,
+            'SYMBOLS': symbols,
+            'SHARED_STATE_SOCKET': socket_path,
+            # Each shard serves its own metrics on the next port
+            'METRICS_PORT': config_class.METRICS_PORT + shard if config_class.METRICS_PORT else 0,
+        }
+        ta_api_keys = cls._get_ta_api_keys(config_class)
+        if ta_api_keys:
+            attributes['TA_API_KEY'] = ta_api_keys[shard % len(ta_api_keys)]
+        if config_class.INDICATORS_CACHE_PATH:
+            attributes['INDICATORS_CACHE_PATH'] = f'{config_class.INDICATORS_CACHE_PATH}.{shard}'
+
+        return type(f'Shard{shard}Config', (config_class,), attributes)
+
+    async def _run(self) -> None:
+        temp_dir = None
+        socket_path = self._socket_path
+        if socket_path is None:
+            temp_dir = tempfile.mkdtemp(prefix='trading_bot_')
+            socket_path = os.path.join(temp_dir, 'shared_state.sock')
+
+        deals_adapter = AdapterByBit(
+            api_key=self._config_class.BY_BIT_API_KEY,
+            api_secret=self._config_class.BY_BIT_API_SECRET,
+            timeout=self._config_class.BY_BIT_TIMEOUT,
+            cache_ttl=self._config_class.BY_BIT_CACHE_TTL,
+            prices_max_age=self._config_class.BY_BIT_PRICES_MAX_AGE,
+            url=self._config_class.BY_BIT_URL,
+        )
+        server = SharedStateServer(deals_adapter=deals_adapter, path=socket_path)
+        await deals_adapter.open()
+        await server.open()
+
+        parts = self.split_symbols(self._config_class.SYMBOLS, self._shards)
+        logger.info(f'I split {len(self._config_class.SYMBOLS)} symbols between {len(parts)} shards')
+        try:
+            for shard, symbols in enumerate(parts):
+                self._start_shard(shard, symbols, socket_path)
+
+            while True:
+                await asyncio.sleep(self._check_interval)
+                for shard, symbols in enumerate(parts):
+                    process = self._processes[shard]
+                    if not process.is_alive():
+                        logger.warning(f'Shard {shard} exited with code {process.exitcode}, I restart it')
+                        self._start_shard(shard, symbols, socket_path)
+        finally:
+            self._stop_shards()
+            await server.close()
+            await deals_adapter.close()
+            if temp_dir is not None:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def _start_shard(self, shard: int, symbols: List[Dict[str, Any]], socket_path: str) -> None:
+        process = self._context.Process(
+            target=run_shard,
+            args=(self._config_class, shard, symbols, socket_path),
+            name=f'Shard {shard}',
+            daemon=True,
+        )
+        process.start()
+        self._processes[shard] = process
+
+    def _stop_shards(self, timeout: Optional[float] = 10) -> None:
+        for process in self._processes.values():
+            if process.is_alive():
+                process.terminate()
+        for process in self._processes.values():
+            process.join(timeout)
+        self._processes = {}
+
+    @staticmethod
+    def _get_ta_api_keys(config_class: type) -> List[str]:
+        return config_class.TA_API_KEYS or [key for key in [config_class.TA_API_KEY] if key]
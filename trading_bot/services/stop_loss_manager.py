@@ -25,21 +25,34 @@ class StopLossManager:
 
     async def run(self) -> None:
         while True:
-            await self._update_stop_losses()
+            with app.metrics.timer('cycle_seconds', loop='stop_loss_manager'):
+                await self._update_stop_losses()
             await asyncio.sleep(app.indicator_update_timeout)
 
     async def _update_stop_losses(self) -> None:
         symbols = self._get_symbols_with_open_deals()
+        if not symbols:
+            return
+
+        try:
+            all_deals = await app.dealer.get_all_deals()
+        except Warning:
+            logger.warning(f'I did not get deals info and did not update stop losses')
+            return
+
+        try:
+            current_prices = await app.dealer.get_current_prices()
+        except Warning:
+            logger.warning(f'I did not get current prices and did not update stop losses')
+            return
+
         for symbol in symbols:
-            try:
-                deals = await app.dealer.get_deals_by_symbol(symbol)
-            except Warning:
-                logger.warning(f'I did not get deals info for {symbol} and did not update stop loss')
+            deals = all_deals.get(symbol, [])
+            if not deals:
                 continue
 
-            try:
-                current_price = await app.dealer.get_current_price(symbol=symbol)
-            except Warning:
+            current_price = current_prices.get(symbol)
+            if current_price is None:
                 logger.warning(f'I did not get the current price for {symbol} and did not update stop loss')
                 continue
 
@@ -85,10 +98,10 @@ class StopLossManager:
         current_stop_loss = deal.stop_loss
 
         if deal.side == DealSide.BUY:
-            new_sl = (indicator_value if current_price > indicator_value.present_value > current_stop_loss
+            new_sl = (indicator_value.present_value if current_price > indicator_value.present_value > current_stop_loss
                       else current_stop_loss)
         else:
-            new_sl = (indicator_value if current_price < indicator_value.present_value < current_stop_loss
+            new_sl = (indicator_value.present_value if current_price < indicator_value.present_value < current_stop_loss
                       else current_stop_loss)
 
         return new_sl
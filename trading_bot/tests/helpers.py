@@ -1,3 +1,6 @@
+import copy
+from typing import Any, Dict
+
 from trading_bot import app, create_app
 
 
@@ -10,10 +13,33 @@ def reset_managers():
     create_app()
 
     app.symbol_manager._symbols = []
+    app.symbol_manager._symbols_by_name = {}
+    app.symbol_manager._symbols_by_alias = {}
     app.exchange_manager._exchanges = []
     app.exchange_manager._exchanges_by_name = {}
     app.indicator_manager._indicators = []
     app.indicator_manager._indicators_by_name = {}
     app.indicator_value_manager._indicator_values = []
     app.indicator_value_manager._indicator_values_by_key = {}
+    app.indicator_value_manager._tables = {}
     app.trading_system_manager._trading_systems = []
+    app.trading_system_manager._trading_systems_by_indicator = {}
+    app.indicator_value_manager._changed = set()
+
+
+def rename_indicators(settings: Dict[str, Any], suffix: str) -> Dict[str, Any]:
+    # Settings of another trading system with indicators of its own
+    settings = copy.deepcopy(settings)
+    names = {}
+    for indicator in settings['indicators']:
+        names[indicator['name']] = f'{indicator["name"]}_{suffix}'
+        indicator['name'] = names[indicator['name']]
+
+    for condition in settings['conditions_to_buy'] + settings['conditions_to_sell']:
+        for operand in (condition['first_operand'], condition['second_operand']):
+            if isinstance(operand['value'], str):
+                name, _, value_name = operand['value'].partition('.')
+                if name in names:
+                    operand['value'] = f'{names[name]}.{value_name}'
+
+    return settings
@@ -0,0 +1,158 @@
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from trading_bot import app
+from trading_bot.adapters.binance_stream import BinanceKlineStream
+from trading_bot.tests.helpers import reset_managers
+from trading_bot.tests.test_adapter_by_bit_stream import wait_for
+
+
+class FakeBinanceServer:
+    # Remembers every received message
+
+    def __init__(self) -> None:
+        self.received = []
+        self.connections = 0
+        self.socket = None
+
+        application = web.Application()
+        application.router.add_get('/stream', self._handle)
+        self.server = TestServer(application)
+
+    async def start(self) -> None:
+        await self.server.start_server()
+
+    async def close(self) -> None:
+        if self.socket is not None:
+            await self.socket.close()
+        await self.server.close()
+
+    def url(self) -> str:
+        return str(self.server.make_url('/stream'))
+
+    async def send_kline(self, alias: str, interval: str, open_time: int, close: str, closed: bool) -> None:
+        await self.socket.send_json({
+            'stream': f'{alias.lower()}@kline_{interval}',
+            'data': {
+                'e': 'kline',
+                's': alias,
+                'k': {
+                    't': open_time, 'T': open_time + 3599999, 's': alias, 'i': interval,
+                    'o': '100.0', 'h': '110.0', 'l': '90.0', 'c': close, 'v': '12.5', 'x': closed,
+                },
+            },
+        })
+
+    async def _handle(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+
+        self.socket = ws
+        self.connections += 1
+
+        async for message in ws:
+            request_message = message.json()
+            self.received.append(request_message)
+            await ws.send_json({'result': None, 'id': request_message['id']})
+        return ws
+
+
+class TestBinanceKlineStream(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self) -> None:
+        reset_managers()
+
+        by_bit = app.exchange_manager.create(name='ByBit', deal_opening_method='open_deal')
+        self.btc = app.symbol_manager.create(
+            base_currency='BTC',
+            quote_currency='USDT',
+            exchanges=[by_bit],
+            deal_opening_params={'qty': 2}
+        )
+        self.eth = app.symbol_manager.create(
+            base_currency='ETH',
+            quote_currency='USDT',
+            exchanges=[by_bit],
+            deal_opening_params={'qty': 2}
+        )
+        self.interval = app.indicator_manager.create(
+            name='MovingAverage_1h_period4',
+            indicator_type='MovingAverage',
+            interval='1h',
+        ).interval
+
+        self.candles = []
+
+        async def on_candle(symbol, interval, candle):
+            self.candles.append((symbol, interval, candle))
+
+        self.server = FakeBinanceServer()
+        await self.server.start()
+        self.stream = BinanceKlineStream(on_candle=on_candle, reconnect_delay=0.01, url=self.server.url())
+
+    async def asyncTearDown(self) -> None:
+        await self.stream.close()
+        await self.server.close()
+
+    async def test_stream(self):
+        await self.stream.open([self.btc, self.eth], [self.interval])
+        await wait_for(lambda: self.server.received)
+
+        with self.subTest(case='Stream should subscribe to the klines of every symbol and interval'):
+            self.assertEqual(self.server.received[0]['method'], 'SUBSCRIBE')
+            self.assertEqual(self.server.received[0]['params'], ['btcusdt@kline_1h', 'ethusdt@kline_1h'])
+
+        with self.subTest(case='Only closed candles should be passed to the handler'):
+            await self.server.send_kline('BTCUSDT', '1h', 1640995200000, '105.0', closed=False)
+            await self.server.send_kline('BTCUSDT', '1h', 1640995200000, '106.0', closed=True)
+            await wait_for(lambda: self.candles)
+
+            symbol, interval, candle = self.candles[0]
+            self.assertEqual(len(self.candles), 1)
+            self.assertIs(symbol, self.btc)
+            self.assertIs(interval, self.interval)
+            self.assertEqual(candle.open_time, 1640995200000)
+            self.assertEqual(candle.close_time, 1640998799999)
+            self.assertEqual(candle.close, 106.0)
+            self.assertEqual(candle.volume, 12.5)
+
+        with self.subTest(case='After reconnect the stream should subscribe again'):
+            await self.server.socket.close()
+
+            await wait_for(lambda: self.server.connections == 2 and len(self.server.received) == 2)
+            self.assertEqual(self.server.received[1]['params'], ['btcusdt@kline_1h', 'ethusdt@kline_1h'])
+
+            await self.server.send_kline('ETHUSDT', '1h', 1640998800000, '3700.0', closed=True)
+            await wait_for(lambda: len(self.candles) == 2)
+            self.assertIs(self.candles[1][0], self.eth)
+
+    async def test_unexpected_error(self):
+        await self.stream.open([self.btc], [self.interval])
+        await wait_for(lambda: self.server.received)
+
+        with self.subTest(case='Unexpected error should be logged and the stream should reconnect'):
+            with patch('trading_bot.adapters.binance_stream.logger') as mock_logger:
+                with patch.object(self.stream, '_handle_message', side_effect=RuntimeError):
+                    await self.server.send_kline('BTCUSDT', '1h', 1640995200000, '106.0', closed=True)
+                    await wait_for(lambda: self.server.connections == 2)
+
+            mock_logger.exception.assert_called_once()
+
+    async def test_subscription_limits(self):
+        self.stream = BinanceKlineStream(
+            on_candle=self.stream._on_candle,
+            url=self.server.url(),
+            max_streams_per_connection=1,
+        )
+
+        with self.subTest(case='Streams over the connection limit should get their own connection'):
+            await self.stream.open([self.btc, self.eth], [self.interval])
+
+            await wait_for(lambda: self.server.connections == 2 and len(self.server.received) == 2)
+            self.assertEqual(
+                sorted(message['params'][0] for message in self.server.received),
+                ['btcusdt@kline_1h', 'ethusdt@kline_1h'],
+            )
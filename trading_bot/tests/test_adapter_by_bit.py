@@ -0,0 +1,321 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch, MagicMock, AsyncMock
+
+from trading_bot import app
+from trading_bot.adapters.by_bit import AdapterByBit
+from trading_bot.adapters.resilience import Resilience, RetryPolicy, PermanentError, RateLimitError, TransientError
+from trading_bot.services.dealer import Dealer
+from trading_bot.services.decision_maker import DealSide
+from trading_bot.tests.helpers import reset_managers
+
+
+def mock_session(response_json):
+    response = MagicMock()
+    response.json = AsyncMock(return_value=response_json)
+
+    session = MagicMock()
+    session.closed = False
+    session.close = AsyncMock()
+    session.request.return_value.__aenter__.return_value = response
+
+    return session
+
+
+class TestAdapterByBit(IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        reset_managers()
+
+        app.exchange_manager.create(name='ByBit', deal_opening_method='open_deal')
+        self.symbol = app.symbol_manager.create(
+            base_currency='BTC',
+            quote_currency='USDT',
+            exchanges=[app.exchange_manager.get('ByBit')],
+            deal_opening_params={'qty': 0.001}
+        )
+
+    async def test_get_current_price(self):
+        adapter = AdapterByBit(
+            api_key='test key',
+            api_secret='test secret',
+            prices_max_age=0,
+            resilience=Resilience('by_bit', default_policy=RetryPolicy(attempts=2, base_delay=0)),
+        )
+
+        with self.subTest(case='Adapter should request the ticker of the symbol and return its last_price as float'):
+            adapter._session = mock_session({
+                'ret_code': 0,
+                'ret_msg': 'OK',
+                'result': [{'symbol': 'BTCUSDT', 'last_price': '43567.5'}],
+            })
+
+            current_price = await adapter.get_current_price(self.symbol)
+
+            self.assertEqual(current_price, 43567.5)
+            method, url = adapter._session.request.call_args.args
+            self.assertEqual(method, 'GET')
+            self.assertTrue(url.endswith('/v2/public/tickers'))
+            self.assertEqual(adapter._session.request.call_args.kwargs['params'], {'symbol': 'BTCUSDT'})
+
+        with self.subTest(case='When there is no ticker for the symbol, adapter should call logger and raise Warning'):
+            adapter._session = mock_session({
+                'ret_code': 0,
+                'ret_msg': 'OK',
+                'result': [{'symbol': 'ETHUSDT', 'last_price': '3021.1'}],
+            })
+
+            with patch('trading_bot.adapters.by_bit.logger') as mock_logger:
+                with self.assertRaises(Warning):
+                    await adapter.get_current_price(self.symbol)
+
+                mock_logger.warning.assert_called_once()
+
+        with self.subTest(case='Adapter should record the request time by endpoint'):
+            histogram = app.metrics.get_histogram('request_seconds', adapter='by_bit', endpoint='/v2/public/tickers')
+
+            self.assertGreater(histogram.count, 0)
+
+        with self.subTest(case='When ret_msg != OK, adapter should call logger and raise Warning '
+                               'without sending the wrong request again'):
+            adapter._session = mock_session({'ret_code': 10001, 'ret_msg': 'params error'})
+
+            with patch('trading_bot.adapters.by_bit.logger') as mock_logger:
+                with self.assertRaises(PermanentError):
+                    await adapter.get_current_price(self.symbol)
+
+                mock_logger.warning.assert_called_once()
+            adapter._session.request.assert_called_once()
+
+        with self.subTest(case='When the rate limit is exceeded, adapter should try again'):
+            adapter._session = mock_session({'ret_code': 10006, 'ret_msg': 'too many visits'})
+            rate_limited = app.metrics.get_counter('rate_limited_total', adapter='by_bit')
+
+            with patch('trading_bot.adapters.by_bit.logger'):
+                with self.assertRaises(RateLimitError):
+                    await adapter.get_current_price(self.symbol)
+
+            self.assertEqual(adapter._session.request.call_count, 2)
+            self.assertEqual(app.metrics.get_counter('rate_limited_total', adapter='by_bit'), rate_limited + 2)
+
+        with self.subTest(case='When request times out, adapter should call logger, try again and raise Warning'):
+            adapter._session = mock_session({})
+            adapter._session.request.return_value.__aenter__.side_effect = asyncio.TimeoutError
+
+            with patch('trading_bot.adapters.by_bit.logger') as mock_logger:
+                with self.assertRaises(TransientError):
+                    await adapter.get_current_price(self.symbol)
+
+                self.assertEqual(mock_logger.warning.call_count, 2)
+
+        with self.subTest(case='When the first request times out, adapter should return the result of the second'):
+            adapter._session = mock_session({
+                'ret_code': 0,
+                'ret_msg': 'OK',
+                'result': [{'symbol': 'BTCUSDT', 'last_price': '43567.5'}],
+            })
+            response = adapter._session.request.return_value.__aenter__.return_value
+            adapter._session.request.return_value.__aenter__.side_effect = [asyncio.TimeoutError, response]
+            # The failures above have opened the circuit
+            adapter._resilience = Resilience('by_bit', default_policy=RetryPolicy(attempts=2, base_delay=0))
+
+            with patch('trading_bot.adapters.by_bit.logger'):
+                self.assertEqual(await adapter.get_current_price(self.symbol), 43567.5)
+
+    async def test_create_order(self):
+        with self.subTest(case='Adapter should send signed params as strings, '
+                               'so the sign matches the sent query'):
+            adapter = AdapterByBit(api_key='test key', api_secret='test secret')
+            adapter._session = mock_session({'ret_code': 0, 'ret_msg': 'OK', 'result': {}})
+
+            await adapter.create_order(side=DealSide.BUY, symbol=self.symbol, stop_loss=42000.5)
+
+            method, url = adapter._session.request.call_args.args
+            query = adapter._session.request.call_args.kwargs['params']
+
+            self.assertEqual(method, 'POST')
+            self.assertTrue(url.endswith('private/linear/order/create'))
+            self.assertEqual(query['close_on_trigger'], 'False')
+            self.assertEqual(query['qty'], '0.001')
+            self.assertEqual(query['side'], 'Buy')
+            self.assertEqual(query['stop_loss'], '42000.5')
+
+            sign = query.pop('sign')
+            self.assertEqual(sign, adapter._sing_request_params(query))
+
+    async def test_open_close(self):
+        with self.subTest(case='Adapter should open one session and reuse it until close'):
+            adapter = AdapterByBit(api_key='test key', api_secret='test secret')
+
+            await adapter.open()
+            session = adapter._session
+            await adapter.open()
+
+            self.assertIs(adapter._session, session)
+            self.assertFalse(session.closed)
+
+            await adapter.close()
+
+            self.assertTrue(session.closed)
+            self.assertIsNone(adapter._session)
+
+    async def test_stream(self):
+        stream = MagicMock()
+        stream.open = AsyncMock()
+        stream.get_price = AsyncMock()
+        adapter = AdapterByBit(api_key='test key', api_secret='test secret', stream=stream, cache_ttl=0, prices_max_age=0)
+        adapter._session = mock_session({
+            'ret_code': 0,
+            'ret_msg': 'OK',
+            'result': [{'symbol': 'BTCUSDT', 'last_price': '43567.5'}],
+        })
+
+        with self.subTest(case='When the stream has the price, adapter should not send a request'):
+            stream.get_price.return_value = 43570
+
+            self.assertEqual(await adapter.get_current_price(self.symbol), 43570)
+            adapter._session.request.assert_not_called()
+
+        with self.subTest(case='When the stream has no price, adapter should fall back to REST'):
+            stream.get_price.return_value = None
+
+            self.assertEqual(await adapter.get_current_price(self.symbol), 43567.5)
+            adapter._session.request.assert_called_once()
+
+        with self.subTest(case='Positions from the stream should have the shape of the REST response'):
+            adapter._session.request.reset_mock()
+            stream.get_positions.return_value = [{'symbol': 'BTCUSDT', 'side': 'Buy', 'size': 0.01}]
+
+            resp = await adapter.get_positions_by_symbol(self.symbol)
+
+            self.assertEqual(resp['result'], [{'symbol': 'BTCUSDT', 'side': 'Buy', 'size': 0.01}])
+            adapter._session.request.assert_not_called()
+
+        with self.subTest(case='Positions from REST should seed the stream'):
+            stream.get_positions.return_value = None
+            positions = [{'symbol': 'BTCUSDT', 'side': 'Buy', 'size': 0}]
+            adapter._session = mock_session({'ret_code': 0, 'ret_msg': 'OK', 'result': positions})
+
+            await adapter.get_positions_by_symbol(self.symbol)
+
+            stream.set_positions.assert_called_once_with('BTCUSDT', positions)
+
+        with self.subTest(case='New order should invalidate the positions in the stream'):
+            await adapter.create_order(side=DealSide.BUY, symbol=self.symbol, stop_loss=42000.5)
+
+            stream.invalidate_positions.assert_called_once_with('BTCUSDT')
+
+    async def test_coalescing(self):
+        adapter = AdapterByBit(api_key='test key', api_secret='test secret', cache_ttl=10)
+        adapter._session = mock_session({'ret_code': 0, 'ret_msg': 'OK', 'result': []})
+
+        with self.subTest(case='Positions of one symbol requested together should take one request'):
+            await asyncio.gather(*(adapter.get_positions_by_symbol(self.symbol) for _ in range(3)))
+            await adapter.get_positions_by_symbol(self.symbol)
+
+            adapter._session.request.assert_called_once()
+
+        with self.subTest(case='New order should make the next positions request go to the exchange'):
+            await adapter.create_order(side=DealSide.BUY, symbol=self.symbol, stop_loss=42000.5)
+            adapter._session.request.reset_mock()
+
+            await adapter.get_positions_by_symbol(self.symbol)
+
+            adapter._session.request.assert_called_once()
+
+    async def test_get_all_positions(self):
+        adapter = AdapterByBit(api_key='test key', api_secret='test secret')
+        adapter._session = mock_session({'ret_code': 0, 'ret_msg': 'OK', 'result': [
+            {'is_valid': True, 'data': {'symbol': 'BTCUSDT', 'side': 'Buy', 'size': 0.01}},
+            {'is_valid': True, 'data': {'symbol': 'BTCUSDT', 'side': 'Sell', 'size': 0}},
+            {'is_valid': True, 'data': {'symbol': 'ETHUSDT', 'side': 'Buy', 'size': 0}},
+        ]})
+
+        with self.subTest(case='Adapter should request positions without a symbol and group them by alias'):
+            positions = await adapter.get_all_positions()
+
+            self.assertNotIn('symbol', adapter._session.request.call_args.kwargs['params'])
+            self.assertEqual(set(positions), {'BTCUSDT', 'ETHUSDT'})
+            self.assertEqual([position['side'] for position in positions['BTCUSDT']], ['Buy', 'Sell'])
+
+        with self.subTest(case='New order should make the next snapshot go to the exchange'):
+            await adapter.create_order(side=DealSide.BUY, symbol=self.symbol, stop_loss=42000.5)
+            adapter._session.request.reset_mock()
+
+            await adapter.get_all_positions()
+
+            adapter._session.request.assert_called_once()
+
+    async def test_get_all_positions_stream(self):
+        stream = MagicMock()
+        stream.open = AsyncMock()
+        adapter = AdapterByBit(api_key='test key', api_secret='test secret', stream=stream, cache_ttl=0)
+        adapter._session = mock_session({'ret_code': 0, 'ret_msg': 'OK', 'result': [
+            {'is_valid': True, 'data': {'symbol': 'BTCUSDT', 'side': 'Buy', 'size': 0.01}},
+        ]})
+
+        with self.subTest(case='When the stream has every alias, adapter should not send a request'):
+            stream.get_positions.side_effect = lambda alias: {
+                'BTCUSDT': [{'symbol': 'BTCUSDT', 'side': 'Buy', 'size': 0.01}],
+                'ETHUSDT': [],
+            }[alias]
+
+            positions = await adapter.get_all_positions(aliases=['BTCUSDT', 'ETHUSDT'])
+
+            self.assertEqual(positions, {'BTCUSDT': [{'symbol': 'BTCUSDT', 'side': 'Buy', 'size': 0.01}]})
+            adapter._session.request.assert_not_called()
+
+        with self.subTest(case='When the stream misses an alias, adapter should fall back to REST and seed it'):
+            stream.get_positions.side_effect = lambda alias: None if alias == 'ETHUSDT' else []
+
+            positions = await adapter.get_all_positions(aliases=['BTCUSDT', 'ETHUSDT'])
+
+            self.assertEqual(positions, {'BTCUSDT': [{'symbol': 'BTCUSDT', 'side': 'Buy', 'size': 0.01}]})
+            adapter._session.request.assert_called_once()
+            stream.set_positions.assert_any_call('BTCUSDT', [{'symbol': 'BTCUSDT', 'side': 'Buy', 'size': 0.01}])
+            stream.set_positions.assert_any_call('ETHUSDT', [])
+
+    async def test_get_all_prices(self):
+        adapter = AdapterByBit(api_key='test key', api_secret='test secret', prices_max_age=10)
+        adapter._session = mock_session({'ret_code': 0, 'ret_msg': 'OK', 'result': [
+            {'symbol': 'BTCUSDT', 'last_price': '43567.5'},
+            {'symbol': 'ETHUSDT', 'last_price': '3021.1'},
+        ]})
+
+        with self.subTest(case='Adapter should return last prices of all tickers by alias'):
+            self.assertEqual(await adapter.get_all_prices(), {'BTCUSDT': 43567.5, 'ETHUSDT': 3021.1})
+
+        with self.subTest(case='Prices of all symbols should come from one snapshot until it gets old'):
+            eth = app.symbol_manager.create(
+                base_currency='ETH',
+                quote_currency='USDT',
+                exchanges=[app.exchange_manager.get('ByBit')],
+                deal_opening_params={'qty': 0.01}
+            )
+
+            self.assertEqual(await adapter.get_current_price(self.symbol), 43567.5)
+            self.assertEqual(await adapter.get_current_price(eth), 3021.1)
+            adapter._session.request.assert_called_once()
+
+        with self.subTest(case='Dealer should return the prices by symbol'):
+            dealer = Dealer(deals_adapter=adapter)
+
+            self.assertEqual(await dealer.get_current_prices(), {self.symbol: 43567.5, eth: 3021.1})
+
+    async def test_get_prices_stream(self):
+        stream = MagicMock()
+        stream.open = AsyncMock()
+        stream.get_price = AsyncMock(side_effect=lambda alias: {'BTCUSDT': 43570}.get(alias))
+        adapter = AdapterByBit(api_key='test key', api_secret='test secret', stream=stream, prices_max_age=0)
+        adapter._session = mock_session({'ret_code': 0, 'ret_msg': 'OK', 'result': [
+            {'symbol': 'BTCUSDT', 'last_price': '43567.5'},
+            {'symbol': 'ETHUSDT', 'last_price': '3021.1'},
+        ]})
+
+        with self.subTest(case='When the stream has every price, adapter should not send a request'):
+            self.assertEqual(await adapter.get_prices(['BTCUSDT']), {'BTCUSDT': 43570})
+            adapter._session.request.assert_not_called()
+
+        with self.subTest(case='Only the prices the stream does not have should come from the snapshot'):
+            self.assertEqual(await adapter.get_prices(['BTCUSDT', 'ETHUSDT']), {'BTCUSDT': 43570, 'ETHUSDT': 3021.1})
+            adapter._session.request.assert_called_once()
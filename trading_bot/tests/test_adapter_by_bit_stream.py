@@ -0,0 +1,234 @@
+import asyncio
+import time
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from trading_bot.adapters.by_bit_stream import ByBitStream
+
+
+async def wait_for(condition, timeout: float = 2) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('Condition was not met in time')
+        await asyncio.sleep(0.01)
+
+
+class FakeByBitServer:
+    # Remembers every received message
+
+    def __init__(self) -> None:
+        self.received = {'public': [], 'private': []}
+        self.connections = {'public': 0, 'private': 0}
+        self.sockets = {}
+        self.rejected_ops = set()
+
+        application = web.Application()
+        application.router.add_get('/public', self._handle)
+        application.router.add_get('/private', self._handle)
+        self.server = TestServer(application)
+
+    async def start(self) -> None:
+        await self.server.start_server()
+
+    async def close(self) -> None:
+        for ws in self.sockets.values():
+            await ws.close()
+        await self.server.close()
+
+    def url(self, name: str) -> str:
+        return str(self.server.make_url(f'/{name}'))
+
+    async def send(self, name: str, message: dict) -> None:
+        await self.sockets[name].send_json(message)
+
+    async def _handle(self, request: web.Request) -> web.WebSocketResponse:
+        name = request.path.strip('/')
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+
+        self.sockets[name] = ws
+        self.connections[name] += 1
+
+        async for message in ws:
+            request = message.json()
+            self.received[name].append(request)
+            await ws.send_json({'success': request['op'] not in self.rejected_ops, 'ret_msg': '', 'request': request})
+        return ws
+
+
+class TestByBitStream(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self) -> None:
+        self.server = FakeByBitServer()
+        await self.server.start()
+
+    async def asyncTearDown(self) -> None:
+        await self.stream.close()
+        await self.server.close()
+
+    async def open_stream(self, **kwargs) -> None:
+        self.stream = ByBitStream(
+            api_key='test key',
+            api_secret='test secret',
+            reconnect_delay=0.01,
+            public_url=self.server.url('public'),
+            private_url=self.server.url('private'),
+            **kwargs,
+        )
+        await self.stream.open()
+        await wait_for(lambda: self.stream._is_live('public') and self.stream._is_live('private'))
+
+    async def test_get_price(self):
+        await self.open_stream()
+
+        with self.subTest(case='Unknown symbol should be subscribed and answered with None'):
+            self.assertIsNone(await self.stream.get_price('BTCUSDT'))
+
+            await wait_for(lambda: self.server.received['public'])
+            self.assertEqual(self.server.received['public'][0],
+                             {'op': 'subscribe', 'args': ['instrument_info.100ms.BTCUSDT']})
+
+        with self.subTest(case='Stream should keep the last price from the snapshot and the deltas'):
+            await self.server.send('public', {
+                'topic': 'instrument_info.100ms.BTCUSDT',
+                'type': 'snapshot',
+                'data': {'symbol': 'BTCUSDT', 'last_price_e4': '435675000', 'last_price': '43567.50'},
+            })
+            await wait_for(lambda: 'BTCUSDT' in self.stream._prices)
+            self.assertEqual(await self.stream.get_price('BTCUSDT'), 43567.5)
+
+            await self.server.send('public', {
+                'topic': 'instrument_info.100ms.BTCUSDT',
+                'type': 'delta',
+                'data': {'update': [{'symbol': 'BTCUSDT', 'last_price_e4': '435680000'}]},
+            })
+            await wait_for(lambda: self.stream._prices['BTCUSDT'][0] == 43568)
+
+        with self.subTest(case='After reconnect the stream should subscribe again and forget old prices'):
+            await self.server.sockets['public'].close()
+
+            await wait_for(lambda: self.server.connections['public'] == 2 and len(self.server.received['public']) == 2)
+            self.assertEqual(self.server.received['public'][1],
+                             {'op': 'subscribe', 'args': ['instrument_info.100ms.BTCUSDT']})
+            self.assertIsNone(await self.stream.get_price('BTCUSDT'))
+
+    async def test_stale_stream(self):
+        await self.open_stream(stale_after=0.2)
+        self.stream._symbols.add('BTCUSDT')
+        self.stream._prices['BTCUSDT'] = (43567.5, time.monotonic())
+
+        with self.subTest(case='When there are no messages for stale_after seconds, price should be None'):
+            self.assertEqual(await self.stream.get_price('BTCUSDT'), 43567.5)
+
+            await asyncio.sleep(0.3)
+
+            self.assertIsNone(await self.stream.get_price('BTCUSDT'))
+
+    async def test_stale_price(self):
+        await self.open_stream(stale_after=0.2)
+        self.stream._symbols.update({'BTCUSDT', 'ETHUSDT'})
+        self.stream._prices['BTCUSDT'] = (43567.5, time.monotonic())
+        self.stream._prices['ETHUSDT'] = (3021.1, time.monotonic())
+
+        with self.subTest(case='Price not updated for stale_after seconds should be None while the others are live'):
+            await asyncio.sleep(0.3)
+            await self.server.send('public', {
+                'topic': 'instrument_info.100ms.ETHUSDT',
+                'type': 'delta',
+                'data': {'update': [{'symbol': 'ETHUSDT', 'last_price': '3022.1'}]},
+            })
+            await wait_for(lambda: self.stream._prices['ETHUSDT'][0] == 3022.1)
+
+            self.assertIsNone(await self.stream.get_price('BTCUSDT'))
+            self.assertEqual(await self.stream.get_price('ETHUSDT'), 3022.1)
+
+    async def test_unexpected_error(self):
+        await self.open_stream()
+
+        with self.subTest(case='Unexpected error should be logged and the stream should reconnect'):
+            with patch('trading_bot.adapters.by_bit_stream.logger') as mock_logger:
+                with patch.object(self.stream, '_handle_message', side_effect=RuntimeError):
+                    await self.server.send('public', {'topic': 'instrument_info.100ms.BTCUSDT'})
+                    await wait_for(lambda: self.server.connections['public'] == 2)
+
+            mock_logger.exception.assert_called_once()
+
+    async def test_positions(self):
+        await self.open_stream()
+        await wait_for(lambda: len(self.server.received['private']) == 2)
+
+        with self.subTest(case='Private stream should authenticate and subscribe to positions and orders'):
+            auth, subscribe = self.server.received['private']
+
+            self.assertEqual(auth['op'], 'auth')
+            self.assertEqual(auth['args'][0], 'test key')
+            self.assertEqual(auth['args'][2], self.stream._sign(auth['args'][1]))
+            self.assertEqual(subscribe, {'op': 'subscribe', 'args': ['position', 'order']})
+
+        with self.subTest(case='Positions should be None until they are seeded by REST'):
+            self.assertIsNone(self.stream.get_positions('BTCUSDT'))
+
+            self.stream.set_positions('BTCUSDT', [
+                {'symbol': 'BTCUSDT', 'side': 'Buy', 'size': 0, 'entry_price': 0, 'stop_loss': 0, 'take_profit': 0},
+                {'symbol': 'BTCUSDT', 'side': 'Sell', 'size': 0, 'entry_price': 0, 'stop_loss': 0, 'take_profit': 0},
+            ])
+
+            self.assertEqual([position['size'] for position in self.stream.get_positions('BTCUSDT')], [0, 0])
+
+        with self.subTest(case='Position updates should change the book'):
+            await self.server.send('private', {
+                'topic': 'position',
+                'action': 'update',
+                'data': [{'symbol': 'BTCUSDT', 'side': 'Buy', 'size': '0.01', 'entry_price': '43567.5',
+                          'stop_loss': '42696.15', 'take_profit': '0'}],
+            })
+            await wait_for(lambda: self.stream.get_positions('BTCUSDT')[0]['size'] == 0.01)
+
+            self.assertEqual(self.stream.get_positions('BTCUSDT')[0]['stop_loss'], 42696.15)
+
+        with self.subTest(case='Order updates should invalidate the positions of the symbol'):
+            await self.server.send('private', {
+                'topic': 'order',
+                'action': '',
+                'data': [{'symbol': 'BTCUSDT', 'side': 'Sell', 'order_status': 'Filled'}],
+            })
+            await wait_for(lambda: self.stream.get_positions('BTCUSDT') is None)
+
+    async def test_rejected_auth(self):
+        self.server.rejected_ops.add('auth')
+
+        with patch('trading_bot.adapters.by_bit_stream.logger'):
+            self.stream = ByBitStream(
+                api_key='test key',
+                api_secret='wrong secret',
+                reconnect_delay=0.01,
+                public_url=self.server.url('public'),
+                private_url=self.server.url('private'),
+            )
+            await self.stream.open()
+
+            with self.subTest(case='Rejected auth should make the stream reconnect'):
+                await wait_for(lambda: self.server.connections['private'] >= 2)
+
+            with self.subTest(case='Positions should not be seeded or served without auth'):
+                self.assertFalse(self.stream._is_live('private'))
+
+                self.stream.set_positions('BTCUSDT', [])
+
+                self.assertIsNone(self.stream.get_positions('BTCUSDT'))
+
+            with self.subTest(case='Rejected subscription should drop the seeded book and reconnect'):
+                self.server.rejected_ops.clear()
+                await wait_for(lambda: self.stream._is_live('private'))
+                self.stream.set_positions('BTCUSDT', [])
+                connections = self.server.connections['private']
+
+                await self.server.send('private', {'success': False, 'ret_msg': 'error',
+                                                   'request': {'op': 'subscribe', 'args': ['position', 'order']}})
+                await wait_for(lambda: self.server.connections['private'] > connections)
+
+                self.assertNotIn('BTCUSDT', self.stream._positions)
@@ -1,21 +1,23 @@
 import json
 import os
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
 from unittest import IsolatedAsyncioTestCase
-from unittest.mock import patch, Mock
+from unittest.mock import patch, MagicMock, AsyncMock
 
 from trading_bot import app
 from trading_bot.adapters.ta_api import AdapterTaAPI
 from trading_bot.tests.helpers import reset_managers
 
 base_dir = os.path.abspath(os.path.dirname(__file__))
-settings_dir = f'{base_dir}\\static'
+settings_dir = os.path.join(base_dir, 'static')
 
 
 class TaAPIResponseLoader:
 
     @staticmethod
     def response():
-        with open(f'{settings_dir}\\ta_api_response.json') as f:
+        with open(os.path.join(settings_dir, 'ta_api_response.json')) as f:
             return json.load(f)
 
 
@@ -25,13 +27,15 @@ class TestAdapterTaAPI(IsolatedAsyncioTestCase):
         reset_managers()
 
     @patch('trading_bot.adapters.ta_api.logger')
-    @patch('trading_bot.adapters.ta_api.requests.get')
-    async def test_get_indicator_values(self, mock_get, mock_logger):
-        mock_response = Mock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = TaAPIResponseLoader.response()
+    async def test_get_indicator_values(self, mock_logger):
+        mock_response = MagicMock()
+        mock_response.status = 200
+        mock_response.json = AsyncMock(return_value=TaAPIResponseLoader.response())
 
-        mock_get.return_value = mock_response
+        mock_session = MagicMock()
+        mock_session.closed = False
+        mock_session.get.return_value.__aenter__.return_value = mock_response
+        mock_get = mock_session.get
 
         app.exchange_manager.create(name='ByBit', deal_opening_method='open_deal')
 
@@ -64,7 +68,9 @@ class TestAdapterTaAPI(IsolatedAsyncioTestCase):
                 'optInTimePeriod': 12,
             }
 
-            indicator_values = await AdapterTaAPI(api_key=test_api_key, timeout=0).get_indicator_values(
+            adapter = AdapterTaAPI(api_key=test_api_key, timeout=0)
+            adapter._session = mock_session
+            indicator_values = await adapter.get_indicator_values(
                 symbol=symbol,
                 indicator=indicator,
             )
@@ -90,7 +96,7 @@ class TestAdapterTaAPI(IsolatedAsyncioTestCase):
                 interval='1h'
             )
 
-            await AdapterTaAPI(api_key=test_api_key, timeout=0).get_indicator_values(
+            await adapter.get_indicator_values(
                 symbol=symbol,
                 indicator=indicator,
             )
@@ -101,16 +107,161 @@ class TestAdapterTaAPI(IsolatedAsyncioTestCase):
             mock_logger.reset_mock()
             mock_get.reset_mock()
 
-            mock_get.return_value = Mock(status_code=400, text='test response text')
+            mock_response.status = 400
+            mock_response.text = AsyncMock(return_value='test response text')
 
             with self.assertRaises(Warning):
-                await AdapterTaAPI(api_key=test_api_key, timeout=0).get_indicator_values(
+                await adapter.get_indicator_values(
                     symbol=symbol,
                     indicator=indicator,
                 )
 
             mock_logger.warning.assert_called_once()
 
+    async def test_get_bulk_indicator_values(self):
+        app.exchange_manager.create(name='ByBit', deal_opening_method='open_deal')
+
+        symbol = app.symbol_manager.create(
+            base_currency='BTC',
+            quote_currency='USDT',
+            exchanges=[app.exchange_manager.get('ByBit')],
+            deal_opening_params={'qty': 0.368}
+        )
+
+        ma4 = app.indicator_manager.create(
+            name='MovingAverage_1h_period4',
+            indicator_type='MovingAverage',
+            interval='1h',
+            optional={'period': 4}
+        )
+        adx = app.indicator_manager.create(
+            name='ADX_1h',
+            indicator_type='ADX',
+            interval='1h',
+        )
+
+        mock_response = MagicMock()
+        mock_response.status = 200
+        mock_response.json = AsyncMock(return_value={
+            'data': [
+                {'id': 'MovingAverage_1h_period4.present_value', 'result': {'value': 43001.5}, 'errors': []},
+                {'id': 'MovingAverage_1h_period4.previous_value', 'result': {'value': 42980.25}, 'errors': []},
+                {'id': 'ADX_1h.present_value', 'result': {'value': 21.4}, 'errors': []},
+                {'id': 'ADX_1h.previous_value', 'result': {}, 'errors': ['Something went wrong']},
+            ]
+        })
+
+        mock_session = MagicMock()
+        mock_session.closed = False
+        mock_session.post.return_value.__aenter__.return_value = mock_response
+
+        with self.subTest(case='Adapter should send one construct for all indicators of the interval '
+                               'and return values only for the indicators without errors'):
+            adapter = AdapterTaAPI(api_key='test api key', timeout=0)
+            adapter._session = mock_session
+
+            with patch('trading_bot.adapters.ta_api.logger'):
+                indicator_values = await adapter.get_bulk_indicator_values(
+                    symbol=symbol,
+                    indicators=[ma4, adx],
+                )
+
+            mock_session.post.assert_called_once()
+            url = mock_session.post.call_args.args[0]
+            construct = mock_session.post.call_args.kwargs['json']['construct']
+
+            self.assertEqual(url, 'https://api.taapi.io/bulk')
+            self.assertEqual(construct['symbol'], 'BTC/USDT')
+            self.assertEqual(construct['interval'], '1h')
+            self.assertIn(
+                {'id': 'MovingAverage_1h_period4.previous_value', 'indicator': 'ma', 'backtrack': 2, 'period': 4},
+                construct['indicators'],
+            )
+            self.assertEqual(len(construct['indicators']), 4)
+
+            self.assertEqual(indicator_values, {
+                ma4: {'present_value': 43001.5, 'previous_value': 42980.25},
+            })
+
+        with self.subTest(case='When indicators do not fit into one construct, '
+                               'adapter should split them into several requests'):
+            mock_session.post.reset_mock()
+
+            adapter = AdapterTaAPI(api_key='test api key', timeout=0, bulk_limit=2)
+            adapter._session = mock_session
+
+            with patch('trading_bot.adapters.ta_api.logger'):
+                await adapter.get_bulk_indicator_values(
+                    symbol=symbol,
+                    indicators=[ma4, adx],
+                )
+
+            self.assertEqual(mock_session.post.call_count, 2)
+
+    async def test_backtracks(self):
+        app.exchange_manager.create(name='ByBit', deal_opening_method='open_deal')
+        symbol = app.symbol_manager.create(
+            base_currency='BTC',
+            quote_currency='USDT',
+            exchanges=[app.exchange_manager.get('ByBit')],
+            deal_opening_params={'qty': 0.368}
+        )
+        indicator = app.indicator_manager.create(name='ADX_1h', indicator_type='ADX', interval='1h')
+        indicator.history_size = 4
+
+        mock_response = MagicMock()
+        mock_response.status = 200
+        mock_response.json = AsyncMock(return_value=[
+            {'value': 4, 'backtrack': 0},
+            {'value': 3, 'backtrack': 1},
+            {'value': 2, 'backtrack': 2},
+            {'value': 1, 'backtrack': 3},
+        ])
+        mock_session = MagicMock()
+        mock_session.closed = False
+        mock_session.get.return_value.__aenter__.return_value = mock_response
+        mock_session.post.return_value.__aenter__.return_value = mock_response
+
+        adapter = AdapterTaAPI(api_key='test api key', timeout=0)
+        adapter._session = mock_session
+
+        with self.subTest(case='First fetch should ask for the whole history'):
+            with patch('trading_bot.adapters.ta_api.logger'):
+                values = await adapter.get_indicator_values(symbol=symbol, indicator=indicator)
+
+            self.assertEqual(mock_session.get.call_args.kwargs['params']['backtracks'], 4)
+            app.indicator_value_manager.update(indicator, symbol, values['present_value'], values['previous_value'],
+                                               history=values['history'])
+
+        with self.subTest(case='Next fetch should ask for 2 values, the history keeps the older ones'):
+            with patch('trading_bot.adapters.ta_api.logger'):
+                await adapter.get_indicator_values(symbol=symbol, indicator=indicator)
+
+            self.assertEqual(mock_session.get.call_args.kwargs['params']['backtracks'], 2)
+
+        with self.subTest(case='Bulk construct should take 2 calculations for an indicator with the history'):
+            mock_response.json = AsyncMock(return_value={'data': []})
+
+            with patch('trading_bot.adapters.ta_api.logger'):
+                await adapter.get_bulk_indicator_values(symbol=symbol, indicators=[indicator])
+
+            construct = mock_session.post.call_args.kwargs['json']['construct']
+            self.assertEqual(len(construct['indicators']), 2)
+
+        with self.subTest(case='After a gap the whole history should be asked for again'):
+            indicator_value = app.indicator_value_manager.get(indicator, symbol)
+            indicator_value.history.clear()
+            indicator_value.history.append(1, 0)
+            indicator_value.history.append(2, 3600)
+            indicator_value.history.append(3, 7200)
+            indicator_value.history.append(4, 10800)
+
+            with patch('trading_bot.adapters.ta_api.logger'):
+                await adapter.get_bulk_indicator_values(symbol=symbol, indicators=[indicator])
+
+            construct = mock_session.post.call_args.kwargs['json']['construct']
+            self.assertEqual(len(construct['indicators']), 4)
+
     async def test__parse_response(self):
         with self.subTest(case='Test response parser'):
             response = TaAPIResponseLoader.response()
@@ -120,3 +271,27 @@ class TestAdapterTaAPI(IsolatedAsyncioTestCase):
 
             self.assertEqual(parsed_response['present_value'], 2020.9800000000032)
             self.assertEqual(parsed_response['previous_value'], 2016.9000000000015)
+
+        with self.subTest(case='With more backtracks parser should return the history, the present value last'):
+            response = [
+                {'value': 3, 'backtrack': 0},
+                {'value': 2, 'backtrack': 1},
+                {'value': 1, 'backtrack': 2},
+            ]
+
+            parsed_response = AdapterTaAPI(api_key='test api key', timeout=0)._parse_response(response)
+
+            self.assertEqual(parsed_response, {'present_value': 3, 'previous_value': 2, 'history': [1, 2, 3]})
+
+    def test__get_retry_after(self):
+        with self.subTest(case='Seconds should be taken as they are'):
+            self.assertEqual(AdapterTaAPI._get_retry_after('3'), 3)
+
+        with self.subTest(case='HTTP date should be turned into the seconds left'):
+            retry_at = datetime.now(timezone.utc) + timedelta(seconds=60)
+
+            self.assertAlmostEqual(AdapterTaAPI._get_retry_after(format_datetime(retry_at, usegmt=True)), 60, delta=2)
+
+        with self.subTest(case='Missing or malformed value should fall back to the default backoff'):
+            self.assertIsNone(AdapterTaAPI._get_retry_after(None))
+            self.assertIsNone(AdapterTaAPI._get_retry_after('soon'))
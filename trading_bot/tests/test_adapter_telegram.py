@@ -0,0 +1,96 @@
+import asyncio
+import time
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch, MagicMock, AsyncMock
+
+from trading_bot.adapters.telegram import AdapterTelegram
+
+
+def mock_session(*responses):
+    session = MagicMock()
+    session.closed = False
+    session.close = AsyncMock()
+    response = session.post.return_value.__aenter__.return_value
+    response.json = AsyncMock(side_effect=list(responses))
+
+    return session
+
+
+def sent_texts(session):
+    return [call.kwargs['json']['text'] for call in session.post.call_args_list]
+
+
+class TestAdapterTelegram(IsolatedAsyncioTestCase):
+
+    async def test_notify(self):
+        with self.subTest(case='notify should not wait for telegram'):
+            notifier = AdapterTelegram(token='token', chat_id='chat', flush_interval=0.05)
+            notifier._session = mock_session({'ok': True})
+
+            async def slow_post(*args, **kwargs):
+                await asyncio.sleep(1)
+
+            notifier._session.post.return_value.__aenter__.side_effect = slow_post
+
+            started_at = time.monotonic()
+            await notifier.notify('I just opened the deal.')
+
+            self.assertLess(time.monotonic() - started_at, 0.05)
+            notifier._drain_timeout = 0
+            with patch('trading_bot.adapters.telegram.logger'):
+                await notifier.close()
+
+        with self.subTest(case='Messages put within flush_interval should be sent as one message'):
+            notifier = AdapterTelegram(token='token', chat_id='chat', flush_interval=0.05)
+            notifier._session = session = mock_session({'ok': True}, {'ok': True})
+
+            await notifier.notify('first')
+            await notifier.notify('second')
+            await notifier.close()
+
+            self.assertEqual(sent_texts(session), ['first\n\nsecond'])
+            self.assertEqual(session.post.call_args.kwargs['json']['chat_id'], 'chat')
+
+        with self.subTest(case='Message longer than telegram allows should be split'):
+            notifier = AdapterTelegram(token='token', chat_id='chat', flush_interval=0, window=0)
+            notifier._session = session = mock_session({'ok': True}, {'ok': True})
+
+            await notifier.notify('a' * (notifier.max_message_length + 1))
+            await notifier.close()
+
+            self.assertEqual([len(text) for text in sent_texts(session)], [notifier.max_message_length, 1])
+
+    async def test_send(self):
+        with self.subTest(case='When telegram answers 429, notifier should wait retry_after and send again'):
+            notifier = AdapterTelegram(token='token', chat_id='chat', flush_interval=0, window=0)
+            notifier._session = session = mock_session(
+                {'ok': False, 'error_code': 429, 'parameters': {'retry_after': 0.05}},
+                {'ok': True},
+            )
+
+            with patch('trading_bot.adapters.telegram.logger') as mock_logger:
+                started_at = time.monotonic()
+                await notifier._send('msg')
+
+                self.assertGreaterEqual(time.monotonic() - started_at, 0.05)
+                self.assertEqual(session.post.call_count, 2)
+                mock_logger.warning.assert_called_once()
+
+        with self.subTest(case='When the message is wrong, notifier should not send it again'):
+            notifier._session = session = mock_session({'ok': False, 'error_code': 400, 'description': 'bad'})
+
+            with patch('trading_bot.adapters.telegram.logger'):
+                await notifier._send('msg')
+
+            session.post.assert_called_once()
+
+        with self.subTest(case='When the request fails, notifier should back off and give up after max_retries'):
+            notifier = AdapterTelegram(token='token', chat_id='chat', window=0, retry_delay=0, max_retries=3)
+            notifier._session = session = mock_session()
+            session.post.return_value.__aenter__.side_effect = asyncio.TimeoutError
+
+            with patch('trading_bot.adapters.telegram.logger') as mock_logger:
+                await notifier._send('msg')
+
+                self.assertEqual(session.post.call_count, 3)
+                self.assertEqual(mock_logger.warning.call_count, 4)
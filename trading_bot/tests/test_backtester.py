@@ -0,0 +1,157 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from trading_bot import app
+from trading_bot.adapters.history_files import AdapterHistoryFiles
+from trading_bot.models.indicators import Indicator
+from trading_bot.services.backtester import Backtester, resample_candles
+from trading_bot.services.decision_maker import DealSide
+from trading_bot.tests.helpers import reset_managers
+from trading_bot.tests.test_trading_systems import TradingSystemSettingsLoader
+
+HOUR = 3600000
+
+
+def hourly_candles(count: int, start: int = 0) -> np.ndarray:
+    open_time = start + np.arange(count) * HOUR
+    close = np.arange(count, dtype=float) + 100
+    return np.stack([open_time, close - 0.5, close + 1, close - 1, close, np.ones(count)], axis=1)
+
+
+class TestResampleCandles(TestCase):
+
+    def test_resample_candles(self):
+        # The history starts at 02:00, so the first 4h candle is incomplete
+        candles = hourly_candles(10, start=2 * HOUR)
+        resampled = resample_candles(candles, Indicator.Interval('4h'))
+
+        with self.subTest(case='Incomplete first candle should be dropped'):
+            self.assertEqual(list(resampled[:, 0]), [4 * HOUR, 8 * HOUR])
+
+        with self.subTest(case='OHLCV should be aggregated over the interval'):
+            np.testing.assert_allclose(resampled[0, 1:], [101.5, 106, 101, 105, 4])
+
+
+class TestAdapterHistoryFiles(TestCase):
+
+    def setUp(self) -> None:
+        reset_managers()
+
+        by_bit = app.exchange_manager.create(name='ByBit', deal_opening_method='open_deal')
+        self.symbol = app.symbol_manager.create(
+            base_currency='BTC',
+            quote_currency='USDT',
+            exchanges=[by_bit],
+            deal_opening_params={'qty': 0.001}
+        )
+
+    def test_get_candles(self):
+        start = 1640995200000  # 2022-01-01
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, 'BTCUSDT-1h-2022-01.csv'), 'w') as f:
+                f.write('open_time,open,high,low,close,volume,close_time\n')
+                f.write(f'{start},1,2,0.5,1.5,10,{start + HOUR - 1}\n')
+                f.write(f'{start + HOUR},1.5,3,1,2.5,10,{start + 2 * HOUR - 1}\n')
+            with open(os.path.join(directory, 'BTCUSDT-1h-2022-02.json'), 'w') as f:
+                # The same candle again and the next one with timestamps in microseconds
+                json.dump([
+                    [start + HOUR, '1.5', '3', '1', '2.5', '10', start + 2 * HOUR - 1],
+                    [(start + 2 * HOUR) * 1000, '2.5', '4', '2', '3.5', '10', (start + 3 * HOUR) * 1000 - 1],
+                ], f)
+            with open(os.path.join(directory, 'BTCUSDT-12h.csv'), 'w') as f:
+                f.write(f'{start},1,2,0.5,1.5,10,{start + 12 * HOUR - 1}\n')
+
+            adapter = AdapterHistoryFiles(directory)
+
+            with self.subTest(case='Files of the interval should be merged without duplicates'):
+                candles = adapter.get_candles(self.symbol, Indicator.Interval('1h'))
+
+                self.assertEqual(list(candles[:, 0]), [start, start + HOUR, start + 2 * HOUR])
+                self.assertEqual(list(candles[:, 4]), [1.5, 2.5, 3.5])
+
+            with self.subTest(case='When there are no files for the interval, adapter should raise Warning'):
+                self.assertFalse(adapter.has_candles(self.symbol, Indicator.Interval('1d')))
+
+                with self.assertRaises(Warning):
+                    adapter.get_candles(self.symbol, Indicator.Interval('1d'))
+
+
+class TestBacktester(TestCase):
+
+    def setUp(self) -> None:
+        reset_managers()
+
+        by_bit = app.exchange_manager.create(name='ByBit', deal_opening_method='open_deal')
+        app.exchange_manager.create(name='StormGain', deal_opening_method='send_message')
+        self.symbol = app.symbol_manager.create(
+            base_currency='BTC',
+            quote_currency='USDT',
+            exchanges=[by_bit],
+            deal_opening_params={'qty': 2}
+        )
+        settings = TradingSystemSettingsLoader.correct_settings()
+        self.trading_system = app.trading_system_manager.create(
+            name=settings[0]['name'],
+            settings=settings[0]['settings']
+        )
+
+    def test__get_indicator_values(self):
+        indicator = Indicator(name='MA', indicator_type='MovingAverage', interval=Indicator.Interval('4h'),
+                              optional={'period': 1})
+        candles = resample_candles(hourly_candles(12), indicator.interval)
+        times = hourly_candles(12)[:, 0] + HOUR
+
+        backtester = Backtester(history_adapter=AdapterHistoryFiles(''), trading_systems=[self.trading_system])
+        values, positions = backtester._get_indicator_values(self.symbol, indicator, candles, times)
+
+        with self.subTest(case='Indicator should use only the candles closed at the decision time'):
+            self.assertEqual(list(positions), [-1, -1, -1, 0, 0, 0, 0, 1, 1, 1, 1, 2])
+            self.assertTrue(np.isnan(values[2]).all())
+            self.assertEqual(values[3, 0], 103)
+            self.assertTrue(np.isnan(values[3, 1]))
+            self.assertEqual(list(values[7]), [107, 103])
+
+    def test__replay(self):
+        # Indicators: Momentum_1w, MA_4h_4, MA_4h_9, MA_1w_4, MA_1w_9
+        buy = [(1, 0), (2, 0), (1, 0), (2, 0), (1, 0)]
+        sell = [(-1, 0), (1, 0), (2, 0), (1, 0), (2, 0)]
+        neutral = [(0, 0), (1, 0), (1, 0), (1, 0), (1, 0)]
+
+        values = np.array([buy, neutral, neutral, sell, buy, buy], dtype=float)
+        candles = np.array([[i * HOUR, 100, 101, 99, 100, 1] for i in range(6)], dtype=float)
+
+        trades = Backtester(history_adapter=AdapterHistoryFiles(''), trading_systems=[self.trading_system])._replay(
+            symbol=self.symbol,
+            trading_system=self.trading_system,
+            times=candles[:, 0] + HOUR,
+            candles=candles,
+            values=values,
+            updated=np.array([True, True, True, True, True, False]),
+            stop_loss_values=np.array([np.nan, 99.5, np.nan, np.nan, np.nan, np.nan]),
+        )
+
+        with self.subTest(case='Buy deal should be stopped out after the stop loss was trailed by SAR'):
+            self.assertEqual(trades[0].side, DealSide.BUY)
+            self.assertEqual((trades[0].entry_price, trades[0].exit_price), (100, 99.5))
+            self.assertEqual(trades[0].exit_reason, 'stop_loss')
+            self.assertEqual(trades[0].profit, -1)
+
+        with self.subTest(case='Sell deal should be closed by the close conditions of buying'):
+            self.assertEqual(trades[1].side, DealSide.SELL)
+            self.assertEqual(trades[1].exit_reason, 'close_condition')
+            self.assertEqual(trades[1].exit_time, 5 * HOUR)
+
+        with self.subTest(case='Without new indicator values nothing should be checked'):
+            self.assertEqual(len(trades), 2)
+
+        with self.subTest(case='Summary should be grouped by trading system'):
+            summary = Backtester.summarize(trades)
+
+            self.assertEqual(summary[self.trading_system.name]['trades'], 2)
+            self.assertEqual(summary[self.trading_system.name]['win_rate'], 0)
+            self.assertEqual(summary[self.trading_system.name]['profit'], -1)
+            self.assertEqual(summary[self.trading_system.name]['drawdown'], 1)
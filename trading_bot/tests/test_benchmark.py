@@ -0,0 +1,65 @@
+from unittest import IsolatedAsyncioTestCase
+
+import aiohttp
+
+from trading_bot.adapters.stand_ins import StandInServer
+from trading_bot.services.benchmark import Benchmark
+
+
+class TestStandInServer(IsolatedAsyncioTestCase):
+
+    async def test_requests(self):
+        server = StandInServer(seed=0)
+        await server.open()
+        server.prices = {'BTCUSDT': 100.0}
+
+        try:
+            async with aiohttp.ClientSession() as session:
+                with self.subTest(case='taapi stand-in should answer every calculation of a bulk construct'):
+                    payload = {'construct': {'indicators': [{'id': 'ADX_1d.present_value'},
+                                                            {'id': 'ADX_1d.previous_value'}]}}
+                    async with session.post(f'{server.url}/ta_api/bulk', json=payload) as response:
+                        data = (await response.json())['data']
+
+                    self.assertEqual([item['id'] for item in data], ['ADX_1d.present_value', 'ADX_1d.previous_value'])
+
+                with self.subTest(case='ByBit stand-in should open a position by an order'):
+                    params = {'symbol': 'BTCUSDT', 'side': 'Buy', 'qty': '1', 'stop_loss': '98'}
+                    async with session.post(f'{server.url}/by_bit//private/linear/order/create', params=params):
+                        pass
+                    async with session.get(f'{server.url}/by_bit/private/linear/position/list') as response:
+                        positions = (await response.json())['result']
+
+                    self.assertEqual(positions[0]['data']['size'], 1)
+                    self.assertEqual(positions[0]['data']['entry_price'], 100.0)
+
+                with self.subTest(case='Server should count the requests by service'):
+                    self.assertEqual(server.requests, {'ta_api': 1, 'by_bit': 2})
+        finally:
+            await server.close()
+
+        with self.subTest(case='With error_rate 1 every request should fail'):
+            server = StandInServer(error_rate=1)
+            await server.open()
+            try:
+                async with aiohttp.ClientSession() as session:
+                    async with session.get(f'{server.url}/by_bit/v2/public/tickers') as response:
+                        self.assertNotEqual((await response.json())['ret_msg'], 'OK')
+            finally:
+                await server.close()
+
+
+class TestBenchmark(IsolatedAsyncioTestCase):
+
+    async def test_run(self):
+        result = await Benchmark(symbols_count=3, trading_systems_count=2, cycles=1, latency=0, jitter=0).run()
+
+        with self.subTest(case='Every trading system should get indicators of its own'):
+            # 5 indicators of the trading system from settings.json and the stop loss one
+            self.assertEqual(result['indicators'], 11)
+
+        with self.subTest(case='Result should have the timings and the requests of the cycles'):
+            self.assertEqual(result['cycles'], 1)
+            self.assertGreater(result['cycle_seconds']['cycle']['mean'], 0)
+            self.assertGreater(result['requests_per_cycle']['ta_api'], 0)
+            self.assertGreater(result['memory_peak_mb'], 0)
@@ -0,0 +1,85 @@
+from unittest import TestCase
+
+from trading_bot import app
+from trading_bot.models.candles import CandleWindow, Candle, CandleManager
+from trading_bot.models.indicators import Indicator
+from trading_bot.tests.helpers import reset_managers
+
+
+def candle(open_time: int, close: float) -> Candle:
+    return Candle(
+        open_time=open_time,
+        open_price=close,
+        high=close + 1,
+        low=close - 1,
+        close=close,
+        volume=1,
+        close_time=open_time + 3599999,
+    )
+
+
+class TestCandleWindow(TestCase):
+
+    def setUp(self) -> None:
+        reset_managers()
+
+        by_bit = app.exchange_manager.create(name='ByBit', deal_opening_method='open_deal')
+        self.symbol = app.symbol_manager.create(
+            base_currency='BTC',
+            quote_currency='USDT',
+            exchanges=[by_bit],
+            deal_opening_params={'qty': 0.001}
+        )
+
+    def test_append(self):
+        interval = Indicator.Interval('1h')
+
+        with self.subTest(case='Window should keep only the last `size` candles in order'):
+            window = CandleWindow(symbol=self.symbol, interval=interval, size=3)
+            for i in range(10):
+                window.append(candle(i * 3600000, i))
+
+            self.assertEqual(len(window), 3)
+            self.assertEqual(list(window.close), [7, 8, 9])
+            self.assertEqual(window.last_open_time(), 9 * 3600000)
+            self.assertEqual(window.last_close_time(), 10 * 3600000 - 1)
+
+        with self.subTest(case='Candle with the same open time should replace the last candle'):
+            window.append(candle(9 * 3600000, 99))
+
+            self.assertEqual(list(window.close), [7, 8, 99])
+
+        with self.subTest(case='Older candles should be ignored'):
+            window.append(candle(3 * 3600000, 3))
+
+            self.assertEqual(list(window.close), [7, 8, 99])
+
+        with self.subTest(case='After clear the window should be empty'):
+            window.clear()
+
+            self.assertEqual(len(window), 0)
+            self.assertEqual(window.last_open_time(), 0)
+
+
+class TestCandleManager(TestCase):
+
+    def setUp(self) -> None:
+        reset_managers()
+
+    def test_get_or_create(self):
+        by_bit = app.exchange_manager.create(name='ByBit', deal_opening_method='open_deal')
+        symbol = app.symbol_manager.create(
+            base_currency='BTC',
+            quote_currency='USDT',
+            exchanges=[by_bit],
+            deal_opening_params={'qty': 0.001}
+        )
+        interval = Indicator.Interval('1h')
+
+        with self.subTest(case='Manager should return the same (even empty) window for the symbol and interval'):
+            candle_manager = CandleManager(window_size=10)
+            window = candle_manager.get_or_create(symbol, interval)
+
+            self.assertIs(candle_manager.get_or_create(symbol, interval), window)
+            self.assertEqual(candle_manager.list(), [window])
+            self.assertIsNone(candle_manager.get(symbol, Indicator.Interval('1d')))
@@ -1,5 +1,7 @@
+import asyncio
+import copy
 from datetime import datetime, timedelta
-from random import random
+from random import random, seed
 from unittest import IsolatedAsyncioTestCase
 from unittest.mock import patch, AsyncMock
 
@@ -7,7 +9,7 @@ from trading_bot import app
 from trading_bot.models.trading_systems import Condition
 from trading_bot.services.dealer import Deal
 from trading_bot.services.decision_maker import DecisionMaker, DealSide
-from trading_bot.tests.helpers import reset_managers
+from trading_bot.tests.helpers import rename_indicators, reset_managers
 from trading_bot.tests.test_trading_systems import TradingSystemSettingsLoader
 
 
@@ -16,9 +18,12 @@ class TestDecisionMaker(IsolatedAsyncioTestCase):
     def setUp(self) -> None:
         reset_managers()
 
+    @patch('trading_bot.services.decision_maker.app.dealer', new_callable=AsyncMock)
     @patch('trading_bot.services.decision_maker.DecisionMaker._check_opening_conditions', new_callable=AsyncMock)
     @patch('trading_bot.services.decision_maker.DecisionMaker._check_closing_conditions', new_callable=AsyncMock)
-    async def test_decide(self, mock__check_closing_conditions, mock__check_opening_conditions):
+    async def test_decide(self, mock__check_closing_conditions, mock__check_opening_conditions, mock__dealer):
+        mock__dealer.get_all_deals.return_value = {}
+
         with self.subTest(case='When there are no symbols,'
                                'method should do nothing'):
             await DecisionMaker(
@@ -71,6 +76,65 @@ class TestDecisionMaker(IsolatedAsyncioTestCase):
             mock__check_opening_conditions.assert_not_called()
             mock__check_closing_conditions.assert_called_once()
 
+        with self.subTest(case='When nothing has changed since the last decision, '
+                               'method should not check the symbol again'):
+            decision_maker = DecisionMaker(
+                trading_system_manager=app.trading_system_manager,
+                symbol_manager=app.symbol_manager,
+                indicator_value_manager=app.indicator_value_manager,
+            )
+            await decision_maker.decide()
+
+            mock__check_opening_conditions.reset_mock()
+            mock__check_closing_conditions.reset_mock()
+
+            await decision_maker.decide()
+
+            mock__check_opening_conditions.assert_not_called()
+            mock__check_closing_conditions.assert_not_called()
+
+        with self.subTest(case='When the pause of the symbol has changed since the last decision, '
+                               'method should check all trading systems for the symbol'):
+            symbol.pause = False
+
+            await decision_maker.decide()
+
+            mock__check_opening_conditions.assert_called_once_with(symbol, app.trading_system_manager.list())
+            mock__check_closing_conditions.assert_not_called()
+
+        with self.subTest(case='When an indicator value has changed, '
+                               'method should check only the trading systems that use the indicator'):
+            mock__check_opening_conditions.reset_mock()
+
+            settings = TradingSystemSettingsLoader.correct_settings()
+            first_trading_system = app.trading_system_manager.create(
+                name=settings[0]['name'],
+                settings=settings[0]['settings']
+            )
+            other_settings = copy.deepcopy(settings[0]['settings'])
+            other_settings['indicators'][0]['name'] = 'Momentum_1d'
+            other_settings['indicators'][0]['interval'] = '1d'
+            for condition in other_settings['conditions_to_buy'] + other_settings['conditions_to_sell']:
+                for operand in (condition['first_operand'], condition['second_operand']):
+                    if isinstance(operand['value'], str):
+                        operand['value'] = operand['value'].replace('Momentum_1w', 'Momentum_1d')
+            second_trading_system = app.trading_system_manager.create(
+                name='Other',
+                settings=other_settings
+            )
+
+            app.indicator_value_manager.update(
+                indicator=app.indicator_manager.get('Momentum_1d'),
+                symbol=symbol,
+                present_value=2,
+                previous_value=1,
+            )
+
+            await decision_maker.decide()
+
+            mock__check_opening_conditions.assert_called_once_with(symbol, [second_trading_system])
+            self.assertNotIn(first_trading_system, mock__check_opening_conditions.call_args.args[1])
+
     @patch('trading_bot.services.decision_maker.app.dealer', new_callable=AsyncMock)
     async def test__check_opening_conditions(self, mock__dealer):
         symbol = app.symbol_manager.create(
@@ -694,6 +758,9 @@ class TestDecisionMaker(IsolatedAsyncioTestCase):
             optional={'optInTimePeriod': 4},
         )
 
+        for condition in conditions:
+            condition.compile([mom, ma])
+
         with self.subTest(case='When the indicator values satisfy all condition, '
                                'method should return True.'):
             values = [
@@ -712,7 +779,7 @@ class TestDecisionMaker(IsolatedAsyncioTestCase):
             ]
 
             self.assertTrue(app.decision_maker._check_conditions(
-                indicator_values=values,
+                values=app.decision_maker._get_values_vector(values),
                 conditions=conditions
             ))
 
@@ -721,10 +788,235 @@ class TestDecisionMaker(IsolatedAsyncioTestCase):
             app.indicator_value_manager.get(indicator=ma, symbol=btc).present_value = 8.545
 
             self.assertFalse(app.decision_maker._check_conditions(
-                indicator_values=values,
+                values=app.decision_maker._get_values_vector(values),
                 conditions=conditions
             ))
 
+    def test__evaluate_in_batch(self):
+        seed(0)
+        by_bit = app.exchange_manager.create('ByBit', 'open_deal')
+        app.exchange_manager.create('StormGain', 'send_message')
+        settings = TradingSystemSettingsLoader.correct_settings()
+        tr_system = app.trading_system_manager.create(
+            name=settings[0]['name'],
+            settings=settings[0]['settings']
+        )
+
+        symbols = []
+        for n in range(50):
+            symbol = app.symbol_manager.create(
+                base_currency=f'COIN{n}',
+                quote_currency='USDT',
+                exchanges=[by_bit],
+                deal_opening_params={'qty': 1}
+            )
+            symbols.append(symbol)
+
+            # The last symbol has no value for one of the indicators
+            indicators = tr_system.indicators[:-1] if n == 49 else tr_system.indicators
+            for indicator in indicators:
+                app.indicator_value_manager.create(
+                    indicator=indicator,
+                    symbol=symbol,
+                    present_value=round(random() * 4 - 2),
+                    previous_value=round(random() * 4 - 2),
+                )
+
+        decision_maker = DecisionMaker(
+            trading_system_manager=app.trading_system_manager,
+            symbol_manager=app.symbol_manager,
+            indicator_value_manager=app.indicator_value_manager,
+            batch=True,
+        )
+
+        masks = decision_maker._evaluate_in_batch(symbols, [tr_system])[tr_system]
+
+        with self.subTest(case='Batch masks should match the results of _check_conditions for every symbol'):
+            for symbol in symbols:
+                position = masks.positions[symbol]
+                indicator_values = decision_maker._get_actual_indicator_values(symbol, tr_system)
+                has_values = decision_maker._all_required_indicators_has_values(tr_system, indicator_values)
+
+                self.assertEqual(masks.has_values[position], has_values)
+                if not has_values:
+                    continue
+
+                values = decision_maker._get_values_vector(indicator_values)
+                expected = {
+                    'buy': decision_maker._check_conditions(values, tr_system.conditions_to_buy),
+                    'sell': decision_maker._check_conditions(values, tr_system.conditions_to_sell),
+                    'close_buy': decision_maker._check_conditions(
+                        values, decision_maker._get_close_conditions(tr_system, DealSide.BUY)
+                    ),
+                    'close_sell': decision_maker._check_conditions(
+                        values, decision_maker._get_close_conditions(tr_system, DealSide.SELL)
+                    ),
+                }
+                for name, result in expected.items():
+                    self.assertEqual(bool(getattr(masks, name)[position]), result, f'{symbol} {name}')
+
+        with self.subTest(case='The symbol without all indicator values should be marked in has_values'):
+            self.assertFalse(masks.has_values[masks.positions[symbols[-1]]])
+
+        with self.subTest(case='The symbol with a stale value should be marked in has_values'):
+            app.indicator_value_manager.get(tr_system.indicators[0], symbols[0]).updated_at = \
+                datetime.now() - timedelta(days=8)
+
+            masks = decision_maker._evaluate_in_batch(symbols, [tr_system])[tr_system]
+
+            self.assertFalse(masks.has_values[masks.positions[symbols[0]]])
+            self.assertTrue(masks.has_values[masks.positions[symbols[1]]])
+
+    @patch('trading_bot.services.decision_maker.app.dealer', new_callable=AsyncMock)
+    async def test_decide_in_batch(self, mock__dealer):
+        seed(0)
+        by_bit = app.exchange_manager.create('ByBit', 'open_deal')
+        app.exchange_manager.create('StormGain', 'send_message')
+        settings = TradingSystemSettingsLoader.correct_settings()
+        tr_system = app.trading_system_manager.create(
+            name=settings[0]['name'],
+            settings=settings[0]['settings']
+        )
+
+        for n in range(30):
+            symbol = app.symbol_manager.create(
+                base_currency=f'COIN{n}',
+                quote_currency='USDT',
+                exchanges=[by_bit],
+                deal_opening_params={'qty': 1}
+            )
+            symbol.pause = n % 3 == 0
+            for indicator in tr_system.indicators:
+                app.indicator_value_manager.create(
+                    indicator=indicator,
+                    symbol=symbol,
+                    present_value=round(random() * 4 - 2),
+                    previous_value=round(random() * 4 - 2),
+                )
+        pauses = [symbol.pause for symbol in app.symbol_manager.list()]
+        changed = app.indicator_value_manager.pop_changed()
+
+        async def decide(batch: bool):
+            for symbol, pause in zip(app.symbol_manager.list(), pauses):
+                symbol.pause = pause
+            app.indicator_value_manager._changed = set(changed)
+            mock__dealer.reset_mock()
+            mock__dealer.get_all_deals.return_value = {
+                symbol: [
+                    Deal(
+                        symbol=symbol,
+                        side=DealSide.BUY if symbol.base_currency[-1] in '02468' else DealSide.SELL,
+                        size=1,
+                        entry_price=1,
+                        stop_loss=0,
+                        take_profit=2,
+                    )
+                ]
+                for symbol in app.symbol_manager.list()
+            }
+
+            await DecisionMaker(
+                trading_system_manager=app.trading_system_manager,
+                symbol_manager=app.symbol_manager,
+                indicator_value_manager=app.indicator_value_manager,
+                batch=batch,
+            ).decide()
+
+            return (
+                [(c.kwargs['decision'].symbol, c.kwargs['decision'].side) for c in mock__dealer.open_deal.call_args_list],
+                [(c.kwargs['decision'].symbol, c.kwargs['decision'].side) for c in mock__dealer.close_deal.call_args_list],
+                [symbol.pause for symbol in app.symbol_manager.list()],
+            )
+
+        with self.subTest(case='Batch mode should open and close the same deals in the same order as scalar mode'):
+            self.assertEqual(await decide(batch=True), await decide(batch=False))
+
+        with self.subTest(case='Deals of all paused symbols should be fetched with one request'):
+            mock__dealer.get_all_deals.assert_called_once()
+            mock__dealer.get_deals_by_symbol.assert_not_called()
+
+    @patch('trading_bot.services.decision_maker.app.dealer', new_callable=AsyncMock)
+    async def test_decide_in_batch_affected(self, mock__dealer):
+        by_bit = app.exchange_manager.create('ByBit', 'open_deal')
+        app.exchange_manager.create('StormGain', 'send_message')
+        settings = TradingSystemSettingsLoader.correct_settings()
+        tr_system = app.trading_system_manager.create(
+            name=settings[0]['name'],
+            settings=settings[0]['settings']
+        )
+        other_tr_system = app.trading_system_manager.create(
+            name=f'{settings[0]["name"]}_other',
+            settings=rename_indicators(settings[0]['settings'], suffix='other')
+        )
+        symbol = app.symbol_manager.create(
+            base_currency='BTC',
+            quote_currency='USDT',
+            exchanges=[by_bit],
+            deal_opening_params={'qty': 1}
+        )
+        for indicator in tr_system.indicators + other_tr_system.indicators:
+            app.indicator_value_manager.create(indicator=indicator, symbol=symbol, present_value=0, previous_value=0)
+        mock__dealer.get_all_deals.return_value = {}
+
+        decision_maker = DecisionMaker(
+            trading_system_manager=app.trading_system_manager,
+            symbol_manager=app.symbol_manager,
+            indicator_value_manager=app.indicator_value_manager,
+            batch=True,
+        )
+        await decision_maker.decide()
+
+        with self.subTest(case='Only the trading systems of the changed indicators should be evaluated'):
+            app.indicator_value_manager.update(tr_system.indicators[0], symbol, present_value=1, previous_value=0)
+
+            with patch.object(decision_maker, '_evaluate_in_batch', wraps=decision_maker._evaluate_in_batch) as mock:
+                await decision_maker.decide()
+
+            self.assertEqual(mock.call_args.args[1], [tr_system])
+
+    @patch('trading_bot.services.decision_maker.app.dealer', new_callable=AsyncMock)
+    async def test_decide_concurrently(self, mock__dealer):
+        by_bit = app.exchange_manager.create('ByBit', 'open_deal')
+        for n in range(20):
+            app.symbol_manager.create(
+                base_currency=f'COIN{n}',
+                quote_currency='USDT',
+                exchanges=[by_bit],
+                deal_opening_params={'qty': 1}
+            )
+        running = []
+        max_running = []
+        opened = []
+
+        async def open_deal(symbol, trading_systems):
+            if symbol.pause:
+                return
+            running.append(symbol)
+            max_running.append(len(running))
+            await asyncio.sleep(0.05)
+            symbol.pause = True
+            opened.append(symbol)
+            running.remove(symbol)
+
+        decision_maker = DecisionMaker(
+            trading_system_manager=app.trading_system_manager,
+            symbol_manager=app.symbol_manager,
+            indicator_value_manager=app.indicator_value_manager,
+            concurrency=5,
+        )
+
+        with patch.object(decision_maker, '_check_opening_conditions', side_effect=open_deal):
+            with self.subTest(case='Symbols should be checked concurrently, but not more than concurrency at once'):
+                started_at = asyncio.get_running_loop().time()
+                await asyncio.gather(decision_maker.decide(), decision_maker.decide())
+
+                self.assertLess(asyncio.get_running_loop().time() - started_at, 0.5)
+                self.assertEqual(max(max_running), 5)
+
+            with self.subTest(case='Overlapping decisions should not open a deal for one symbol twice'):
+                self.assertEqual(len(opened), 20)
+                self.assertEqual(set(opened), set(app.symbol_manager.list()))
+
     def test__get_actual_indicator_values(self):
 
         btc = app.symbol_manager.create(
@@ -790,8 +1082,8 @@ class TestDecisionMaker(IsolatedAsyncioTestCase):
             app.indicator_value_manager.create(
                 indicator=tr_system.indicators[n],
                 symbol=btc,
-                present_value=random,
-                previous_value=random,
+                present_value=random(),
+                previous_value=random(),
             )
 
         with self.subTest(case='When there is no value for at least one trading system`s indicator,'
@@ -805,8 +1097,8 @@ class TestDecisionMaker(IsolatedAsyncioTestCase):
             app.indicator_value_manager.create(
                 indicator=tr_system.indicators[len(tr_system.indicators) - 1],
                 symbol=btc,
-                present_value=random,
-                previous_value=random,
+                present_value=random(),
+                previous_value=random(),
             )
 
             ind_values = app.indicator_value_manager.list()
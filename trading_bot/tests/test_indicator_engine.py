@@ -0,0 +1,181 @@
+import json
+import os
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch, AsyncMock
+
+import numpy as np
+
+from trading_bot import app
+from trading_bot.adapters.binance import AdapterBinance
+from trading_bot.models.candles import Candle
+from trading_bot.services.indicator_engine import LocalIndicatorEngine, moving_average, momentum, adx, \
+    parabolic_sar, calculate
+from trading_bot.tests.helpers import reset_managers
+
+base_dir = os.path.abspath(os.path.dirname(__file__))
+static_dir = os.path.join(base_dir, 'static')
+
+
+class CandlesLoader:
+
+    @staticmethod
+    def candles():
+        # Rows in the format of binance klines, the expected values are calculated with TA-Lib
+        with open(os.path.join(static_dir, 'candles_1h.json')) as f:
+            return AdapterBinance._parse_candles(json.load(f))
+
+
+class TestIndicatorKernels(IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        candles = CandlesLoader.candles()
+        self.high = np.array([candle.high for candle in candles])
+        self.low = np.array([candle.low for candle in candles])
+        self.close = np.array([candle.close for candle in candles])
+
+    def test_moving_average(self):
+        with self.subTest(case='Moving average should match TA-Lib SMA'):
+            values = moving_average(self.close, 4)
+
+            self.assertTrue(np.isnan(values[2]))
+            np.testing.assert_allclose(values[-2:], [84.3075, 84.345])
+
+        with self.subTest(case='When there are less candles than the period, all values should be nan'):
+            self.assertTrue(np.isnan(moving_average(self.close[:3], 4)).all())
+
+    def test_momentum(self):
+        with self.subTest(case='Momentum should match TA-Lib MOM'):
+            values = momentum(self.close, 10)
+
+            self.assertTrue(np.isnan(values[9]))
+            np.testing.assert_allclose(values[-2:], [-3.16, -3.39])
+
+    def test_adx(self):
+        with self.subTest(case='ADX should match TA-Lib ADX'):
+            values = adx(self.high, self.low, self.close, 14)
+
+            self.assertTrue(np.isnan(values[26]))
+            self.assertFalse(np.isnan(values[27]))
+            np.testing.assert_allclose(values[-2:], [45.11253043, 44.85437633])
+
+    def test_parabolic_sar(self):
+        with self.subTest(case='Parabolic SAR should match TA-Lib SAR'):
+            values = parabolic_sar(self.high, self.low, 0.02, 0.2)
+
+            self.assertTrue(np.isnan(values[0]))
+            np.testing.assert_allclose(values[-2:], [83.2746, 83.318308])
+
+    def test_calculate(self):
+        with self.subTest(case='calculate should read the period from `period` or `optInTimePeriod`'):
+            np.testing.assert_allclose(
+                calculate('MovingAverage', {'period': 4}, self.high, self.low, self.close),
+                calculate('MovingAverage', {'optInTimePeriod': 4}, self.high, self.low, self.close),
+            )
+
+        with self.subTest(case='For unknown indicator type calculate should raise ValueError'):
+            with self.assertRaises(ValueError):
+                calculate('RSI', {}, self.high, self.low, self.close)
+
+
+class TestLocalIndicatorEngine(IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        reset_managers()
+
+        by_bit = app.exchange_manager.create(name='ByBit', deal_opening_method='open_deal')
+        self.symbol = app.symbol_manager.create(
+            base_currency='BTC',
+            quote_currency='USDT',
+            exchanges=[by_bit],
+            deal_opening_params={'qty': 0.001}
+        )
+        self.ma4 = app.indicator_manager.create(
+            name='MovingAverage_1h_period4',
+            indicator_type='MovingAverage',
+            interval='1h',
+            optional={'period': 4},
+        )
+        self.sar = app.indicator_manager.create(
+            name='ParabolicSAR_1h',
+            indicator_type='ParabolicSAR',
+            interval='1h',
+        )
+
+    @patch('trading_bot.services.indicator_engine.time')
+    @patch('trading_bot.services.indicator_engine.logger')
+    async def test_get_indicator_values(self, mock_logger, mock_time):
+        candles = CandlesLoader.candles()
+        # The last candle is still open
+        mock_time.time.return_value = candles[-1].open_time / 1000 + 60
+
+        mock_adapter = AsyncMock()
+        mock_adapter.get_candles.return_value = candles
+
+        engine = LocalIndicatorEngine(candles_adapter=mock_adapter, window_size=100)
+
+        with self.subTest(case='Engine should return values for the last two closed candles'):
+            values = await engine.get_indicator_values(self.symbol, self.ma4)
+
+            self.assertEqual(set(values), {'present_value', 'previous_value'})
+            self.assertAlmostEqual(values['present_value'], float(np.mean([c.close for c in candles[-5:-1]])))
+            self.assertAlmostEqual(values['previous_value'], float(np.mean([c.close for c in candles[-6:-2]])))
+
+        with self.subTest(case='Indicators of the same symbol and interval should share one candle fetch'):
+            await engine.get_indicator_values(self.symbol, self.sar)
+
+            mock_adapter.get_candles.assert_called_once()
+
+        with self.subTest(case='When a new candle closes, engine should fetch only the missing candles'):
+            mock_time.time.return_value = candles[-1].close_time / 1000 + 60
+            mock_adapter.get_candles.return_value = candles[-1:]
+
+            values = await engine.get_indicator_values(self.symbol, self.ma4)
+
+            self.assertEqual(mock_adapter.get_candles.call_count, 2)
+            self.assertEqual(mock_adapter.get_candles.call_args.kwargs['start_time'], candles[-1].open_time)
+            self.assertAlmostEqual(values['present_value'], float(np.mean([c.close for c in candles[-4:]])))
+
+        with self.subTest(case='When there are not enough candles, engine should raise Warning'):
+            engine = LocalIndicatorEngine(candles_adapter=mock_adapter, window_size=100)
+            mock_adapter.get_candles.return_value = candles[:3]
+
+            with self.assertRaises(Warning):
+                await engine.get_indicator_values(self.symbol, self.ma4)
+
+    @patch('trading_bot.services.indicator_engine.time')
+    @patch('trading_bot.services.indicator_engine.logger')
+    async def test_add_candle(self, mock_logger, mock_time):
+        candles = CandlesLoader.candles()
+        mock_time.time.return_value = candles[-2].close_time / 1000 + 60
+
+        mock_adapter = AsyncMock()
+        mock_adapter.get_candles.return_value = candles[:-1]
+
+        engine = LocalIndicatorEngine(candles_adapter=mock_adapter, window_size=100)
+
+        with self.subTest(case='Before the first fetch the candle should be left to REST'):
+            self.assertFalse(engine.add_candle(self.symbol, self.ma4.interval, candles[-1]))
+
+        await engine.get_indicator_values(self.symbol, self.ma4)
+
+        with self.subTest(case='Candle after a gap should be left to REST'):
+            gap_candle = Candle(
+                open_time=candles[-1].open_time + 3600000,
+                open_price=1,
+                high=1,
+                low=1,
+                close=1,
+                volume=1,
+                close_time=candles[-1].close_time + 3600000,
+            )
+
+            self.assertFalse(engine.add_candle(self.symbol, self.ma4.interval, gap_candle))
+
+        with self.subTest(case='Next closed candle should be appended and used without a new fetch'):
+            mock_time.time.return_value = candles[-1].close_time / 1000 + 1
+
+            self.assertTrue(engine.add_candle(self.symbol, self.ma4.interval, candles[-1]))
+            values = await engine.get_indicator_values(self.symbol, self.ma4)
+
+            mock_adapter.get_candles.assert_called_once()
+            self.assertAlmostEqual(values['present_value'], float(np.mean([c.close for c in candles[-4:]])))
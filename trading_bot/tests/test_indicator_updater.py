@@ -7,6 +7,9 @@ from trading_bot.models.indicators import IndicatorManager
 from trading_bot.tests.helpers import reset_managers
 from trading_bot.services.indicator_updater import IndicatorUpdater
 
+# 2022-01-01 03:32:00 UTC: 3h32m after the daily candle close, 32 min after the hourly one
+TIME_NOW = datetime.fromtimestamp(1640995200 + 3 * 3600 + 32 * 60)
+
 
 class TestIndicatorUpdater(IsolatedAsyncioTestCase):
 
@@ -69,7 +72,7 @@ class TestIndicatorUpdater(IsolatedAsyncioTestCase):
                                'IndicatorUpdater should update app.indicator_update_timeout (150)'):
             mock_update_indicator_values.reset_mock()
 
-            time_now = datetime.now()
+            time_now = TIME_NOW
             mock_datetime.now.return_value = time_now
 
             ind_updater = IndicatorUpdater(
@@ -104,7 +107,7 @@ class TestIndicatorUpdater(IsolatedAsyncioTestCase):
                                'only for [1MovingAverage_1h_period4, MovingAverage_5m_period9]'):
             mock_update_indicator_values.reset_mock()
 
-            time_now = datetime.now()
+            time_now = TIME_NOW
             mock_datetime.now.return_value = time_now
 
             ind_updater = IndicatorUpdater(
@@ -140,7 +143,7 @@ class TestIndicatorUpdater(IsolatedAsyncioTestCase):
                                'IndicatorUpdater should update app.indicator_update_timeout (150)'):
             mock_update_indicator_values.reset_mock()
 
-            time_now = datetime.now()
+            time_now = TIME_NOW
             mock_datetime.now.return_value = time_now
 
             ind_updater = IndicatorUpdater(
@@ -205,44 +208,77 @@ class TestIndicatorUpdater(IsolatedAsyncioTestCase):
 
             self.assertTrue(ind_updater._its_time_to_update(indicator))
 
-        with self.subTest(case='When self._last_updates contains last indicator updates time '
-                               'and last_update_time + indicator.interval.timeout = datetime.now()'
-                               '_its_time_to_update should return True'):
-            with patch('trading_bot.services.indicator_updater.datetime') as mock_datetime:
-                datetime_now = datetime.now()
-                mock_datetime.now.return_value = datetime_now
+        with patch('trading_bot.services.indicator_updater.datetime') as mock_datetime:
+            # 2 minutes after the 03:30 close of a 5m candle
+            mock_datetime.now.return_value = TIME_NOW
 
+            with self.subTest(case='When the last update was before the last candle close (+ settle delay) '
+                                   '_its_time_to_update should return True'):
                 ind_updater = IndicatorUpdater(
                     indicator_adapter=MagicMock(),
                     decision_maker=MagicMock()
                 )
-                ind_updater._last_updates[indicator] = datetime_now - timedelta(seconds=indicator.interval.timeout)
+                ind_updater._last_updates[indicator] = TIME_NOW - timedelta(minutes=2, seconds=1)
 
                 self.assertTrue(ind_updater._its_time_to_update(indicator))
 
-        with self.subTest(case='When self._last_updates contains last indicator updates time '
-                               'and last_update_time + indicator.interval.timeout > datetime.now()'
-                               '_its_time_to_update should return True'):
-            ind_updater = IndicatorUpdater(
-                indicator_adapter=MagicMock(),
-                decision_maker=MagicMock()
+            with self.subTest(case='When the last update was after the last candle close (+ settle delay) '
+                                   '_its_time_to_update should return False'):
+                ind_updater = IndicatorUpdater(
+                    indicator_adapter=MagicMock(),
+                    decision_maker=MagicMock()
+                )
+                ind_updater._last_updates[indicator] = TIME_NOW - timedelta(seconds=20)
+
+                self.assertFalse(ind_updater._its_time_to_update(indicator))
+
+            with self.subTest(case='When the candle has just closed, but the settle delay has not passed yet '
+                                   '_its_time_to_update should return False'):
+                ind_updater = IndicatorUpdater(
+                    indicator_adapter=MagicMock(),
+                    decision_maker=MagicMock(),
+                    settle_delay=180,
+                )
+                ind_updater._last_updates[indicator] = TIME_NOW - timedelta(minutes=3)
+
+                self.assertFalse(ind_updater._its_time_to_update(indicator))
+
+    @patch('trading_bot.services.indicator_updater.datetime')
+    def test__next_update_time(self, mock_datetime):
+        mock_datetime.now.return_value = TIME_NOW
+
+        app.indicator_manager.create(
+            name='Momentum_1d',
+            indicator_type='Momentum',
+            interval='1d',
+        )
+
+        with self.subTest(case='Next update should be at the next close of the shortest interval + settle delay'):
+            app.indicator_manager.create(
+                name='MovingAverage_1h_period4',
+                indicator_type='MovingAverage',
+                interval='1h',
+                optional={'period': 4},
             )
-            ind_updater._last_updates[indicator] = (datetime.now() -
-                                                    timedelta(seconds=indicator.interval.timeout) -
-                                                    timedelta(seconds=60))
 
-            self.assertTrue(ind_updater._its_time_to_update(indicator))
+            next_update_time = IndicatorUpdater(
+                indicator_adapter=MagicMock(),
+                decision_maker=MagicMock(),
+                settle_delay=5,
+            )._next_update_time()
 
-        with self.subTest(case='When self._last_updates contains last indicator updates time '
-                               'and last_update_time + indicator.interval.timeout < datetime.now()'
-                               '_its_time_to_update should return False'):
-            ind_updater = IndicatorUpdater(
+            self.assertEqual(next_update_time, datetime.fromtimestamp(1640995200 + 4 * 3600 + 5))
+
+        with self.subTest(case='Within the settle delay the next update should be at the current boundary'):
+            mock_datetime.now.return_value = datetime.fromtimestamp(1640995200 + 4 * 3600 + 2)
+
+            next_update_time = IndicatorUpdater(
                 indicator_adapter=MagicMock(),
-                decision_maker=MagicMock()
-            )
-            ind_updater._last_updates[indicator] = datetime.now() - timedelta(seconds=20)
+                decision_maker=MagicMock(),
+                settle_delay=5,
+            )._next_update_time()
 
-            self.assertFalse(ind_updater._its_time_to_update(indicator))
+            self.assertEqual(next_update_time, datetime.fromtimestamp(1640995200 + 4 * 3600 + 5))
 
     @patch('trading_bot.services.indicator_updater.app.indicator_value_manager')
     async def test__update_indicator_values(self, mock_indicator_value_manager):
@@ -318,9 +354,197 @@ class TestIndicatorUpdater(IsolatedAsyncioTestCase):
                 indicator=indicator,
                 present_value=18,
                 previous_value=-6.76,
+                history=None,
             )
 
             with self.subTest(case='indicators_adapter.get_indicator_values raises Warning '
                                    'method should handle the exception and call the logger.'):
-                # TODO add test
-                pass
+                mock_indicator_value_manager.reset_mock()
+                mock_taapi_adapter.get_indicator_values.side_effect = Warning
+
+                with patch('trading_bot.services.indicator_updater.logger') as mock_logger:
+                    await IndicatorUpdater(
+                        indicator_adapter=mock_taapi_adapter,
+                        decision_maker=MagicMock()
+                    )._update_indicator_values(indicator)
+
+                    mock_logger.warning.assert_called()
+
+                mock_indicator_value_manager.update.assert_not_called()
+
+    @patch('trading_bot.services.indicator_updater.app.indicator_value_manager')
+    async def test__update_indicator_values_in_bulk(self, mock_indicator_value_manager):
+        ma4 = app.indicator_manager.create(
+            name='MovingAverage_1h_period4',
+            indicator_type='MovingAverage',
+            interval='1h',
+            optional={'period': 4}
+        )
+        ma9 = app.indicator_manager.create(
+            name='MovingAverage_1h_period9',
+            indicator_type='MovingAverage',
+            interval='1h',
+            optional={'period': 9}
+        )
+        adx = app.indicator_manager.create(
+            name='ADX_1d',
+            indicator_type='ADX',
+            interval='1d',
+        )
+
+        by_bit = app.exchange_manager.create(
+            name='ByBit',
+            deal_opening_method='open_deal'
+        )
+        btc = app.symbol_manager.create(
+            base_currency='BTC',
+            quote_currency='USDT',
+            exchanges=[by_bit],
+            deal_opening_params={'qty': 2}
+        )
+        eth = app.symbol_manager.create(
+            base_currency='ETH',
+            quote_currency='USDT',
+            exchanges=[by_bit],
+            deal_opening_params={'qty': 2}
+        )
+        eth.pause = True
+
+        mock_taapi_adapter = AsyncMock()
+        mock_taapi_adapter.get_bulk_indicator_values.return_value = {
+            ma4: {'present_value': 18, 'previous_value': 17},
+        }
+
+        with self.subTest(case='Updater should request indicators grouped by interval '
+                               'once per not paused symbol and update the returned values'):
+            await IndicatorUpdater(
+                indicator_adapter=mock_taapi_adapter,
+                decision_maker=MagicMock(),
+                bulk=True,
+            )._update_indicator_values_in_bulk([ma4, ma9, adx])
+
+            mock_taapi_adapter.get_bulk_indicator_values.assert_has_calls([
+                call(symbol=btc, indicators=[ma4, ma9]),
+                call(symbol=btc, indicators=[adx]),
+            ], any_order=True)
+            self.assertEqual(mock_taapi_adapter.get_bulk_indicator_values.call_count, 2)
+            mock_taapi_adapter.get_indicator_values.assert_not_called()
+
+            mock_indicator_value_manager.update.assert_called_with(
+                symbol=btc,
+                indicator=ma4,
+                present_value=18,
+                previous_value=17,
+                history=None,
+            )
+
+    @patch('trading_bot.services.indicator_updater.app.indicator_value_manager')
+    async def test_on_candle_closed(self, mock_indicator_value_manager):
+        ma4 = app.indicator_manager.create(
+            name='MovingAverage_1h_period4',
+            indicator_type='MovingAverage',
+            interval='1h',
+            optional={'period': 4},
+        )
+        mom = app.indicator_manager.create(
+            name='Momentum_1d',
+            indicator_type='Momentum',
+            interval='1d',
+        )
+
+        by_bit = app.exchange_manager.create(name='ByBit', deal_opening_method='open_deal')
+        btc = app.symbol_manager.create(
+            base_currency='BTC',
+            quote_currency='USDT',
+            exchanges=[by_bit],
+            deal_opening_params={'qty': 2}
+        )
+        eth = app.symbol_manager.create(
+            base_currency='ETH',
+            quote_currency='USDT',
+            exchanges=[by_bit],
+            deal_opening_params={'qty': 2}
+        )
+
+        mock_engine = AsyncMock()
+        mock_engine.add_candle = MagicMock(return_value=True)
+        mock_engine.get_indicator_values.return_value = {'present_value': 18, 'previous_value': 17}
+        mock_decision_maker = AsyncMock()
+        candle = MagicMock()
+
+        updater = IndicatorUpdater(
+            indicator_adapter=mock_engine,
+            decision_maker=mock_decision_maker,
+            decision_delay=0.05,
+        )
+
+        with self.subTest(case='Closed candle should update only the indicators of its interval'):
+            await updater.on_candle_closed(btc, ma4.interval, candle)
+
+            mock_engine.add_candle.assert_called_once_with(btc, ma4.interval, candle)
+            mock_engine.get_indicator_values.assert_called_once_with(symbol=btc, indicator=ma4)
+            mock_indicator_value_manager.update.assert_called_once_with(
+                symbol=btc,
+                indicator=ma4,
+                present_value=18,
+                previous_value=17,
+                history=None,
+            )
+
+        with self.subTest(case='Candles closed together should be decided once'):
+            await updater.on_candle_closed(eth, ma4.interval, candle)
+            mock_decision_maker.decide.assert_not_called()
+
+            await updater._decision_task
+
+            mock_decision_maker.decide.assert_called_once()
+
+        with self.subTest(case='Candle of a paused symbol should be skipped'):
+            mock_engine.reset_mock()
+            eth.pause = True
+
+            await updater.on_candle_closed(eth, mom.interval, candle)
+
+            mock_engine.get_indicator_values.assert_not_called()
+
+    @patch('trading_bot.models.indicator_values.datetime')
+    @patch('trading_bot.services.indicator_updater.datetime')
+    async def test__restore_values(self, mock_datetime, mock_values_datetime):
+        mock_datetime.now.return_value = TIME_NOW
+        mock_values_datetime.now.return_value = TIME_NOW
+
+        ma4 = app.indicator_manager.create(
+            name='MovingAverage_1h_period4',
+            indicator_type='MovingAverage',
+            interval='1h',
+            optional={'period': 4},
+        )
+        mom = app.indicator_manager.create(
+            name='Momentum_1d',
+            indicator_type='Momentum',
+            interval='1d',
+        )
+        by_bit = app.exchange_manager.create(name='ByBit', deal_opening_method='open_deal')
+        btc = app.symbol_manager.create(
+            base_currency='BTC',
+            quote_currency='USDT',
+            exchanges=[by_bit],
+            deal_opening_params={'qty': 2}
+        )
+
+        updated_at = TIME_NOW - timedelta(minutes=1)
+        mock_store = MagicMock()
+        mock_store.load.return_value = [
+            {'indicator': ma4.name, 'symbol': btc.name, 'history': [1, 2], 'updated_at': updated_at},
+            {'indicator': 'RSI_1h', 'symbol': btc.name, 'history': [1, 2], 'updated_at': updated_at},
+        ]
+
+        updater = IndicatorUpdater(indicator_adapter=MagicMock(), decision_maker=MagicMock(), value_store=mock_store)
+
+        with self.subTest(case='Restored indicators should not be due, the others should be fetched'):
+            updater._restore_values()
+
+            self.assertEqual(app.indicator_value_manager.get(ma4, btc).present_value, 2)
+            self.assertEqual(updater._last_updates, {ma4: updated_at})
+            self.assertFalse(updater._its_time_to_update(ma4))
+            self.assertTrue(updater._its_time_to_update(mom))
@@ -0,0 +1,82 @@
+import os
+import tempfile
+from datetime import datetime, timedelta
+from unittest import IsolatedAsyncioTestCase
+
+from trading_bot import app
+from trading_bot.adapters.indicator_value_store import IndicatorValueStore
+from trading_bot.models.indicator_values import IndicatorValueManager
+from trading_bot.tests.helpers import reset_managers
+
+
+class TestIndicatorValueStore(IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        reset_managers()
+
+        by_bit = app.exchange_manager.create(name='ByBit', deal_opening_method='open_deal')
+        self.btc = app.symbol_manager.create(
+            base_currency='BTC',
+            quote_currency='USDT',
+            exchanges=[by_bit],
+            deal_opening_params={'qty': 2}
+        )
+        self.mom = app.indicator_manager.create(
+            name='Momentum_1h',
+            indicator_type='Momentum',
+            interval='1h',
+        )
+        self.mom.history_size = 3
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'values.sqlite')
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    async def test_save_and_load(self):
+        store = IndicatorValueStore(self.path)
+        await store.open()
+
+        iv_manager = IndicatorValueManager()
+        iv_manager.create(indicator=self.mom, symbol=self.btc, present_value=3, previous_value=2, history=[1, 2, 3])
+
+        with self.subTest(case='Saved values should be loaded with the history and the update time'):
+            store.save(iv_manager.list())
+            await store.close()
+
+            store = IndicatorValueStore(self.path)
+            await store.open()
+            rows = store.load()
+
+            self.assertEqual(len(rows), 1)
+            self.assertEqual(rows[0]['indicator'], 'Momentum_1h')
+            self.assertEqual(rows[0]['symbol'], self.btc.name)
+            self.assertEqual(rows[0]['history'], [1, 2, 3])
+            self.assertAlmostEqual(rows[0]['updated_at'].timestamp(), iv_manager.list()[0].updated_at.timestamp())
+
+        with self.subTest(case='Saving again should replace the row'):
+            iv_manager.update(indicator=self.mom, symbol=self.btc, present_value=4, previous_value=3)
+            store.save(iv_manager.list())
+
+            self.assertEqual(len(store.load()), 1)
+
+        with self.subTest(case='The database should be in WAL mode'):
+            self.assertEqual(store._connection.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+
+        await store.close()
+
+    def test_restore(self):
+        iv_manager = IndicatorValueManager()
+
+        with self.subTest(case='Actual value should be restored with its history'):
+            indicator_value = iv_manager.restore(self.mom, self.btc, [1, 2, 3], datetime.now())
+
+            self.assertEqual(indicator_value.history.last(3).tolist(), [1, 2, 3])
+            self.assertEqual(iv_manager.pop_changed(), {(self.mom, self.btc)})
+
+        with self.subTest(case='Stale value should not be restored'):
+            iv_manager = IndicatorValueManager()
+
+            self.assertIsNone(iv_manager.restore(self.mom, self.btc, [1, 2, 3], datetime.now() - timedelta(hours=2)))
+            self.assertEqual(iv_manager.list(), [])
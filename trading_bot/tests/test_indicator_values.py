@@ -2,8 +2,10 @@ from datetime import datetime, timedelta
 from unittest import TestCase
 from unittest.mock import patch
 
+import numpy as np
+
 from trading_bot import app
-from trading_bot.models.indicator_values import IndicatorValueManager
+from trading_bot.models.indicator_values import IndicatorValue, IndicatorValueManager, ValueHistory
 from trading_bot.tests.helpers import reset_managers
 
 
@@ -208,6 +210,30 @@ class TestIndicatorValueManager(TestCase):
             self.assertEqual(updated_ind_values.present_value, 800)
             self.assertEqual(updated_ind_values.previous_value, -300)
 
+    def test_get_table(self):
+        indicator = self._create_indicator()
+        btc = self._create_symbol()
+        eth = self._create_symbol(base_currency='ETH')
+        iv_manager = IndicatorValueManager()
+        iv_manager.create(indicator=indicator, symbol=btc, present_value=10, previous_value=7.25)
+        iv_manager.create(indicator=indicator, symbol=eth, present_value=3, previous_value=2)
+
+        with self.subTest(case='Table should keep a row per symbol with the present value first'):
+            table = iv_manager.get_table(indicator)
+            rows = table.get_rows([eth, btc])
+
+            np.testing.assert_array_equal(table.values[rows], [[3, 2], [10, 7.25]])
+            np.testing.assert_array_equal(table.lengths[rows], [2, 2])
+
+        with self.subTest(case='Changes of the value should get into its row'):
+            iv_manager.update(indicator=indicator, symbol=btc, present_value=11, previous_value=7.5)
+            iv_manager.get(indicator, eth).present_value = 4
+
+            np.testing.assert_array_equal(table.values[table.get_rows([btc, eth])], [[11, 7.5], [4, 2]])
+
+        with self.subTest(case='Symbol without a value should get row -1'):
+            self.assertEqual(table.get_rows([self._create_symbol(base_currency='XRP')]).tolist(), [-1])
+
     def test_list(self):
         with self.subTest(case='New and empty IndicatorValueManager should return empty list'):
             self.assertEqual(len(IndicatorValueManager().list()), 0)
@@ -258,6 +284,39 @@ class TestIndicatorValueManager(TestCase):
             self.assertEqual(len(iv_manager.list()), 4)
             self.assertEqual(iv_manager.list(), created_ind_values)
 
+    def test_pop_changed(self):
+        iv_manager = IndicatorValueManager()
+
+        mom = self._create_indicator(name='Momentum_1h')
+        ma = self._create_indicator(name='MovingAverage_1h_period4')
+        btc = self._create_symbol()
+        eth = self._create_symbol(base_currency='ETH')
+
+        with self.subTest(case='Created indicator values should be marked as changed'):
+            iv_manager.update(indicator=mom, symbol=btc, present_value=2, previous_value=1)
+            iv_manager.update(indicator=ma, symbol=eth, present_value=2, previous_value=1)
+
+            self.assertEqual(iv_manager.pop_changed(), {(mom, btc), (ma, eth)})
+
+        with self.subTest(case='After pop_changed the changed set should be empty'):
+            self.assertEqual(iv_manager.pop_changed(), set())
+
+        with self.subTest(case='Update with the same actual values should not mark the value as changed'):
+            iv_manager.update(indicator=mom, symbol=btc, present_value=2, previous_value=1)
+
+            self.assertEqual(iv_manager.pop_changed(), set())
+
+        with self.subTest(case='Update with new values should mark the value as changed'):
+            iv_manager.update(indicator=mom, symbol=btc, present_value=3, previous_value=2)
+
+            self.assertEqual(iv_manager.pop_changed(), {(mom, btc)})
+
+        with self.subTest(case='Update of a stale value should mark it as changed, even with the same values'):
+            iv_manager.get(ma, eth).updated_at = datetime.now() - timedelta(days=1)
+            iv_manager.update(indicator=ma, symbol=eth, present_value=2, previous_value=1)
+
+            self.assertEqual(iv_manager.pop_changed(), {(ma, eth)})
+
 
 class TestIndicatorValue(TestCase):
 
@@ -294,3 +353,77 @@ class TestIndicatorValue(TestCase):
         with self.subTest(case='When indicator is not actual, method should return False'):
             indicator_value.updated_at = datetime_now - timedelta(minutes=65)
             self.assertFalse(indicator_value.is_actual())
+
+
+class TestValueHistory(TestCase):
+
+    def test_append(self):
+        history = ValueHistory(size=3)
+
+        with self.subTest(case='Values should be read from the end'):
+            history.append(1, time=3600)
+            history.append(2, time=7200)
+
+            self.assertEqual(len(history), 2)
+            self.assertEqual((history[-1], history[-2]), (2, 1))
+            with self.assertRaises(IndexError):
+                _ = history[-3]
+
+        with self.subTest(case='Value of the same time should be overwritten'):
+            history.append(2.5, time=7200)
+
+            self.assertEqual(history.last(3).tolist(), [1, 2.5])
+
+        with self.subTest(case='History should keep only the last `size` values'):
+            for time in range(3, 10):
+                history.append(time, time=time * 3600)
+
+            self.assertEqual(len(history), 3)
+            self.assertEqual(history.last(3).tolist(), [7, 8, 9])
+            self.assertEqual(history.last(2).tolist(), [8, 9])
+            self.assertEqual(history.last_time(), 9 * 3600)
+
+        with self.subTest(case='The last values should be a view of the buffer, not a copy'):
+            self.assertTrue(np.shares_memory(history.last(3), history._values))
+
+
+class TestIndicatorValueHistory(TestCase):
+
+    def setUp(self) -> None:
+        reset_managers()
+
+    def test_set_values(self):
+        btc = TestIndicatorValueManager._create_symbol()
+        mom = TestIndicatorValueManager._create_indicator(name='Momentum_1h')
+        mom.history_size = 4
+        # 2022-01-01 03:00:05, 5 seconds after the close of an hourly candle
+        closed_at = datetime.fromtimestamp(1640995200 + 3 * 3600 + 5)
+
+        indicator_value = IndicatorValue(mom, btc, present_value=3, previous_value=2, updated_at=closed_at)
+
+        with self.subTest(case='Values of the next candle should be appended'):
+            indicator_value.set_values(4, 3, closed_at + timedelta(hours=1))
+
+            self.assertEqual(indicator_value.history.last(4).tolist(), [2, 3, 4])
+            self.assertFalse(indicator_value.has_history())
+
+        with self.subTest(case='Values of the same candle should be overwritten'):
+            indicator_value.set_values(4.5, 3, closed_at + timedelta(hours=1, minutes=30))
+
+            self.assertEqual(indicator_value.history.last(4).tolist(), [2, 3, 4.5])
+
+        with self.subTest(case='After a gap the history should start again'):
+            indicator_value.set_values(7, 6, closed_at + timedelta(hours=4))
+
+            self.assertEqual(indicator_value.history.last(4).tolist(), [6, 7])
+
+        with self.subTest(case='Longer history from the adapter should fill the history'):
+            indicator_value.set_values(7, 6, closed_at + timedelta(hours=4), history=[3, 4, 5, 6, 7])
+
+            self.assertEqual(indicator_value.history.last(4).tolist(), [4, 5, 6, 7])
+            self.assertTrue(indicator_value.has_history())
+
+            indicator_value.set_values(8, 7, closed_at + timedelta(hours=5))
+
+            self.assertEqual(indicator_value.history.last(4).tolist(), [5, 6, 7, 8])
+            self.assertEqual((indicator_value.present_value, indicator_value.previous_value), (8, 7))
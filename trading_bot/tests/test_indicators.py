@@ -1,3 +1,4 @@
+from datetime import datetime
 from unittest import TestCase
 
 from trading_bot.models.indicators import IndicatorManager, Indicator
@@ -100,3 +101,34 @@ class TestIndicatorManager(TestCase):
             )
 
             self.assertIsNone(ind_manager.get(name='not_exist_name'))
+
+
+class TestInterval(TestCase):
+
+    def test_last_close_time(self):
+        # 2022-01-01 03:32:00 UTC, it is Saturday
+        now = datetime.fromtimestamp(1640995200 + 3 * 3600 + 32 * 60)
+
+        with self.subTest(case='Hourly candle should close at the start of the hour'):
+            interval = Indicator.Interval('1h')
+
+            self.assertEqual(interval.last_close_time(now), datetime.fromtimestamp(1640995200 + 3 * 3600))
+            self.assertEqual(interval.next_close_time(now), datetime.fromtimestamp(1640995200 + 4 * 3600))
+
+        with self.subTest(case='Daily candle should close at midnight UTC'):
+            interval = Indicator.Interval('1d')
+
+            self.assertEqual(interval.last_close_time(now), datetime.fromtimestamp(1640995200))
+
+        with self.subTest(case='Weekly candle should close on Monday at midnight UTC'):
+            interval = Indicator.Interval('1w')
+
+            # 2021-12-27 is Monday
+            self.assertEqual(interval.last_close_time(now), datetime.fromtimestamp(1640995200 - 5 * 86400))
+            self.assertEqual(interval.next_close_time(now), datetime.fromtimestamp(1640995200 + 2 * 86400))
+
+        with self.subTest(case='Exactly at the close time, last_close_time should be the same moment'):
+            interval = Indicator.Interval('5m')
+            close_time = datetime.fromtimestamp(1640995200 + 3 * 3600 + 30 * 60)
+
+            self.assertEqual(interval.last_close_time(close_time), close_time)
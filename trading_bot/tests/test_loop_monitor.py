@@ -0,0 +1,88 @@
+import asyncio
+import time
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+from trading_bot import app
+from trading_bot.services.loop_monitor import LoopLagMonitor
+from trading_bot.services.metrics import Metrics
+
+
+def blocking_call():
+    time.sleep(0.2)
+
+
+def short_blocking_call():
+    time.sleep(0.17)
+
+
+def long_blocking_call():
+    time.sleep(0.5)
+
+
+class TestLoopLagMonitor(IsolatedAsyncioTestCase):
+
+    async def test_run(self):
+        app.metrics = Metrics()
+        monitor = LoopLagMonitor(interval=0.01, threshold=0.05)
+
+        with patch('trading_bot.services.loop_monitor.logger') as mock_logger:
+            task = asyncio.create_task(monitor.run())
+            await asyncio.sleep(0.05)
+
+            for _ in range(2):
+                blocking_call()
+                await asyncio.sleep(0.05)
+
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        with self.subTest(case='Monitor should find the line that blocked the loop'):
+            report = monitor.report()
+
+            self.assertEqual(len(report), 1)
+            self.assertIn('test_loop_monitor.py', report[0]['location'])
+            self.assertIn('blocking_call', report[0]['location'])
+            self.assertEqual(report[0]['count'], 2)
+            self.assertGreater(report[0]['seconds'], 0.3)
+
+        with self.subTest(case='The stack should be logged only for the first stall at the line'):
+            stall_messages = [call.args[0] for call in mock_logger.warning.call_args_list]
+
+            self.assertEqual(len(stall_messages), 2)
+            self.assertIn('blocking_call', stall_messages[0].split('\n', 1)[1])
+            self.assertNotIn('\n', stall_messages[1])
+
+        with self.subTest(case='Monitor should record the lag and the stalls in the metrics'):
+            self.assertGreater(app.metrics.get_histogram('loop_lag_seconds').count, 0)
+            self.assertEqual(app.metrics.get_counter('loop_stalls_total', location=report[0]['location']), 2)
+
+    async def test_run_after_short_stalls(self):
+        app.metrics = Metrics()
+        monitor = LoopLagMonitor(interval=0.05, threshold=0.2)
+
+        with patch('trading_bot.services.loop_monitor.logger'):
+            task = asyncio.create_task(monitor.run())
+            await asyncio.sleep(0.05)
+
+            # Late, but under the threshold
+            for _ in range(5):
+                short_blocking_call()
+                await asyncio.sleep(0.1)
+
+            long_blocking_call()
+            await asyncio.sleep(0.1)
+
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        with self.subTest(case='Stall should be blamed on its own call, not on a short stall before it'):
+            report = monitor.report()
+
+            self.assertEqual(len(report), 1)
+            self.assertIn('long_blocking_call', report[0]['location'])
+
+    def test_init(self):
+        with self.subTest(case='Threshold not longer than the interval should raise ValueError'):
+            with self.assertRaises(ValueError):
+                LoopLagMonitor(interval=0.1, threshold=0.1)
@@ -0,0 +1,71 @@
+import socket
+from unittest import TestCase, IsolatedAsyncioTestCase
+
+import aiohttp
+
+from trading_bot.adapters.metrics_server import MetricsServer
+from trading_bot.services.metrics import Metrics
+
+
+class TestMetrics(TestCase):
+
+    def test_render(self):
+        metrics = Metrics()
+        metrics.inc('request_errors_total', adapter='by_bit', endpoint='/v2/public/tickers')
+        metrics.inc('request_errors_total', adapter='by_bit', endpoint='/v2/public/tickers')
+        metrics.observe('cycle_seconds', 0.02, loop='pause_checker')
+        metrics.observe('cycle_seconds', 3, loop='pause_checker')
+
+        rendered = metrics.render()
+
+        with self.subTest(case='Counter should be rendered with its labels'):
+            self.assertIn('# TYPE trading_bot_request_errors_total counter', rendered)
+            self.assertIn('trading_bot_request_errors_total{adapter="by_bit",endpoint="/v2/public/tickers"} 2',
+                          rendered)
+
+        with self.subTest(case='Histogram buckets should be cumulative'):
+            self.assertIn('# TYPE trading_bot_cycle_seconds histogram', rendered)
+            self.assertIn('trading_bot_cycle_seconds_bucket{loop="pause_checker",le="0.01"} 0', rendered)
+            self.assertIn('trading_bot_cycle_seconds_bucket{loop="pause_checker",le="0.025"} 1', rendered)
+            self.assertIn('trading_bot_cycle_seconds_bucket{loop="pause_checker",le="5"} 2', rendered)
+            self.assertIn('trading_bot_cycle_seconds_bucket{loop="pause_checker",le="+Inf"} 2', rendered)
+            self.assertIn('trading_bot_cycle_seconds_sum{loop="pause_checker"} 3.02', rendered)
+            self.assertIn('trading_bot_cycle_seconds_count{loop="pause_checker"} 2', rendered)
+
+        with self.subTest(case='Label values should be escaped'):
+            metrics.inc('errors_total', reason='"quoted"')
+
+            self.assertIn('trading_bot_errors_total{reason="\\"quoted\\""} 1', metrics.render())
+
+    def test_timer(self):
+        metrics = Metrics()
+
+        with self.subTest(case='Timer should observe the duration even when the block raises'):
+            with self.assertRaises(Warning):
+                with metrics.timer('request_seconds', adapter='ta_api'):
+                    raise Warning
+
+            self.assertEqual(metrics.get_histogram('request_seconds', adapter='ta_api').count, 1)
+
+
+class TestMetricsServer(IsolatedAsyncioTestCase):
+
+    async def test_metrics(self):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+
+        metrics = Metrics()
+        metrics.inc('rate_limited_total', adapter='telegram')
+        server = MetricsServer(metrics, port=port)
+        await server.open()
+
+        try:
+            with self.subTest(case='Server should answer /metrics with the rendered metrics'):
+                async with aiohttp.ClientSession() as session:
+                    async with session.get(f'http://127.0.0.1:{port}/metrics') as response:
+                        self.assertEqual(response.status, 200)
+                        self.assertTrue(response.headers['Content-Type'].startswith('text/plain'))
+                        self.assertEqual(await response.text(), metrics.render())
+        finally:
+            await server.close()
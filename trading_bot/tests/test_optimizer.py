@@ -0,0 +1,123 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from trading_bot import app
+from trading_bot.adapters.history_files import AdapterHistoryFiles
+from trading_bot.models.exchanges import ExchangeManager
+from trading_bot.models.indicators import IndicatorManager
+from trading_bot.models.trading_systems import TradingSystemManager
+from trading_bot.services.backtester import Backtester
+from trading_bot.services.optimizer import Optimizer, generate_settings, parse_grid
+from trading_bot.tests.helpers import reset_managers
+from trading_bot.tests.test_trading_systems import TradingSystemSettingsLoader
+
+EXCHANGES = [
+    {'name': 'ByBit', 'deal_opening_method': 'open_deal'},
+    {'name': 'StormGain', 'deal_opening_method': 'send_message'},
+]
+
+
+class TestGrid(TestCase):
+
+    def test_parse_grid(self):
+        with self.subTest(case='Ranges, numbers and strings should be parsed'):
+            grid = parse_grid([
+                'MovingAverage_4h_period4.period=2..5',
+                'ParabolicSAR_1h.acceleration=0.02,0.03',
+                'MovingAverage_4h_period4.interval=1h,4h',
+            ])
+
+            self.assertEqual(grid, {
+                'MovingAverage_4h_period4.period': [2, 3, 4, 5],
+                'ParabolicSAR_1h.acceleration': [0.02, 0.03],
+                'MovingAverage_4h_period4.interval': ['1h', '4h'],
+            })
+
+        with self.subTest(case='Param without an indicator name should raise ValueError'):
+            with self.assertRaises(ValueError):
+                parse_grid(['period=2..5'])
+
+    def test_generate_settings(self):
+        settings = TradingSystemSettingsLoader.correct_settings()[0]['settings']
+
+        with self.subTest(case='Method should return every combination of the grid'):
+            combinations = generate_settings(settings, {
+                'MovingAverage_4h_period4.period': [3, 4],
+                'MovingAverage_4h_period4.interval': ['1h', '4h', '1d'],
+            })
+
+            self.assertEqual(len(combinations), 6)
+            params, combination = combinations[-1]
+            self.assertEqual(params, {'MovingAverage_4h_period4.period': 4, 'MovingAverage_4h_period4.interval': '1d'})
+            self.assertEqual(combination['indicators'][1]['optional'], {'period': 4})
+            self.assertEqual(combination['indicators'][1]['interval'], '1d')
+
+        with self.subTest(case='Original settings should not be changed'):
+            self.assertEqual(settings['indicators'][1]['interval'], '4h')
+
+        with self.subTest(case='Unknown indicator should raise ValueError'):
+            with self.assertRaises(ValueError):
+                generate_settings(settings, {'RSI_1h.period': [3]})
+
+
+class TestOptimizer(TestCase):
+
+    def setUp(self) -> None:
+        reset_managers()
+
+        by_bit = app.exchange_manager.create(name='ByBit', deal_opening_method='open_deal')
+        self.symbol = app.symbol_manager.create(
+            base_currency='BTC',
+            quote_currency='USDT',
+            exchanges=[by_bit],
+            deal_opening_params={'qty': 1}
+        )
+
+    def test_run(self):
+        settings = TradingSystemSettingsLoader.correct_settings()[0]
+        grid = {'MovingAverage_4h_period4.period': [3, 4]}
+
+        # 16 weeks of 1h candles from Monday, enough for the weekly indicators
+        count = 16 * 7 * 24
+        open_time = 1640563200000 + np.arange(count) * 3600000
+        close = 100 + np.cumsum(np.random.default_rng(1).normal(0, 1, count))
+        rows = np.stack([open_time, close, close + 1, close - 1, close, np.ones(count), open_time + 3599999], axis=1)
+
+        with tempfile.TemporaryDirectory() as directory:
+            np.savetxt(os.path.join(directory, 'BTCUSDT-1h.csv'), rows, delimiter=',', fmt='%.4f')
+            history_adapter = AdapterHistoryFiles(directory)
+
+            rows = Optimizer(
+                history_adapter=history_adapter,
+                symbols=[self.symbol],
+                exchanges_config=EXCHANGES,
+                workers=2,
+            ).run(settings['name'], settings['settings'], grid)
+
+            with self.subTest(case='Optimizer should return a row for every combination sorted by profit'):
+                self.assertEqual(len(rows), 2)
+                self.assertGreaterEqual(rows[0]['profit'], rows[1]['profit'])
+
+            with self.subTest(case='Every row should match a separate backtest of the combination'):
+                for row in rows:
+                    exchange_manager = ExchangeManager()
+                    for exchange in EXCHANGES:
+                        exchange_manager.create(exchange['name'], exchange['deal_opening_method'])
+                    _, combination = generate_settings(
+                        settings['settings'],
+                        {'MovingAverage_4h_period4.period': [row['MovingAverage_4h_period4.period']]},
+                    )[0]
+                    trading_system = TradingSystemManager(IndicatorManager(), exchange_manager).create(
+                        name=settings['name'],
+                        settings=combination,
+                    )
+
+                    trades = Backtester(history_adapter, [trading_system]).run([self.symbol])
+                    expected = Backtester.summarize(trades)[settings['name']]
+
+                    self.assertGreater(expected['trades'], 0)
+                    for key, value in expected.items():
+                        self.assertAlmostEqual(row[key], value)
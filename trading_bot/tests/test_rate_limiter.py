@@ -0,0 +1,45 @@
+import asyncio
+import time
+from unittest import IsolatedAsyncioTestCase
+
+from trading_bot.adapters.rate_limiter import TokenBucket
+
+
+class TestTokenBucket(IsolatedAsyncioTestCase):
+
+    async def test_acquire(self):
+        with self.subTest(case='When window is 0, bucket should not limit requests'):
+            bucket = TokenBucket(rate_limit=1, window=0)
+
+            started_at = time.monotonic()
+            for _ in range(100):
+                await bucket.acquire()
+
+            self.assertLess(time.monotonic() - started_at, 0.05)
+
+        with self.subTest(case='Bucket should let burst requests through at once'):
+            bucket = TokenBucket(rate_limit=10, window=1, burst=5)
+
+            started_at = time.monotonic()
+            await asyncio.gather(*(bucket.acquire() for _ in range(5)))
+
+            self.assertLess(time.monotonic() - started_at, 0.05)
+
+        with self.subTest(case='When burst is used up, bucket should pace requests by rate_limit / window'):
+            bucket = TokenBucket(rate_limit=20, window=1, burst=1)
+
+            started_at = time.monotonic()
+            await asyncio.gather(*(bucket.acquire() for _ in range(5)))
+
+            # The first one goes immediately, the next 4 wait 1/20 s each
+            elapsed = time.monotonic() - started_at
+            self.assertGreaterEqual(elapsed, 0.19)
+            self.assertLess(elapsed, 0.4)
+
+        with self.subTest(case='When burst is not set, bucket size should be rate_limit'):
+            bucket = TokenBucket(rate_limit=3, window=60)
+
+            started_at = time.monotonic()
+            await asyncio.gather(*(bucket.acquire() for _ in range(3)))
+
+            self.assertLess(time.monotonic() - started_at, 0.05)
@@ -0,0 +1,95 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+
+from trading_bot.adapters.request_coalescer import RequestCoalescer
+
+
+class CountingRequest:
+
+    def __init__(self, delay: float = 0.05, error: Exception = None) -> None:
+        self.calls = 0
+        self.delay = delay
+        self.error = error
+
+    async def __call__(self):
+        self.calls += 1
+        call = self.calls
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return call
+
+
+class TestRequestCoalescer(IsolatedAsyncioTestCase):
+
+    async def test_run(self):
+        with self.subTest(case='Concurrent callers of the same key should share one request'):
+            coalescer = RequestCoalescer(ttl=0)
+            request = CountingRequest()
+
+            results = await asyncio.gather(*(coalescer.run('BTCUSDT', request) for _ in range(5)))
+
+            self.assertEqual(results, [1] * 5)
+            self.assertEqual(request.calls, 1)
+
+        with self.subTest(case='Different keys should not be shared'):
+            await asyncio.gather(coalescer.run('BTCUSDT', request), coalescer.run('ETHUSDT', request))
+
+            self.assertEqual(request.calls, 3)
+
+        with self.subTest(case='Result should be cached for ttl seconds'):
+            coalescer = RequestCoalescer(ttl=0.1)
+            request = CountingRequest(delay=0)
+
+            self.assertEqual(await coalescer.run('BTCUSDT', request), 1)
+            self.assertEqual(await coalescer.run('BTCUSDT', request), 1)
+
+            await asyncio.sleep(0.15)
+
+            self.assertEqual(await coalescer.run('BTCUSDT', request), 2)
+
+        with self.subTest(case='Failed request should be raised to every caller and not cached'):
+            coalescer = RequestCoalescer(ttl=10)
+            request = CountingRequest(error=Warning())
+
+            results = await asyncio.gather(*(coalescer.run('BTCUSDT', request) for _ in range(3)),
+                                           return_exceptions=True)
+
+            self.assertTrue(all(isinstance(result, Warning) for result in results))
+            with self.assertRaises(Warning):
+                await coalescer.run('BTCUSDT', request)
+            self.assertEqual(request.calls, 2)
+
+    async def test_invalidate(self):
+        with self.subTest(case='Invalidated key should be requested again'):
+            coalescer = RequestCoalescer(ttl=10)
+            request = CountingRequest(delay=0)
+
+            await coalescer.run('BTCUSDT', request)
+            coalescer.invalidate('BTCUSDT')
+
+            self.assertEqual(await coalescer.run('BTCUSDT', request), 2)
+
+        with self.subTest(case='Request in flight during invalidation should not be shared or cached'):
+            coalescer = RequestCoalescer(ttl=10)
+            request = CountingRequest()
+
+            first = asyncio.create_task(coalescer.run('BTCUSDT', request))
+            await asyncio.sleep(0.01)
+            coalescer.invalidate('BTCUSDT')
+            second = await coalescer.run('BTCUSDT', request)
+
+            self.assertEqual(await first, 1)
+            self.assertEqual(second, 2)
+            self.assertEqual(await coalescer.run('BTCUSDT', request), 2)
+
+    async def test_get(self):
+        with self.subTest(case='get should return the cached result without a request'):
+            coalescer = RequestCoalescer(ttl=10)
+            request = CountingRequest(delay=0)
+
+            self.assertIsNone(coalescer.get('BTCUSDT'))
+            await coalescer.run('BTCUSDT', request)
+
+            self.assertEqual(coalescer.get('BTCUSDT'), 1)
+            self.assertEqual(request.calls, 1)
@@ -0,0 +1,135 @@
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, patch
+
+from trading_bot import app
+from trading_bot.adapters.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    PermanentError,
+    RateLimitError,
+    Resilience,
+    RetryPolicy,
+    TransientError,
+)
+from trading_bot.services.metrics import Metrics
+
+
+class TestResilience(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        app.metrics = Metrics()
+
+    async def test_call(self):
+        resilience = Resilience('by_bit', default_policy=RetryPolicy(attempts=3, base_delay=0))
+
+        with self.subTest(case='Transient error should be retried until the request succeeds'):
+            request = AsyncMock(side_effect=[TransientError, 'result'])
+
+            self.assertEqual(await resilience.call('tickers', request), 'result')
+            self.assertEqual(request.call_count, 2)
+            self.assertEqual(app.metrics.get_counter('retries_total', adapter='by_bit', endpoint='tickers'), 1)
+
+        with self.subTest(case='Permanent error should not be retried'):
+            request = AsyncMock(side_effect=PermanentError)
+
+            with self.assertRaises(PermanentError):
+                await resilience.call('tickers', request)
+            self.assertEqual(request.call_count, 1)
+
+        with self.subTest(case='Transient error should be raised after the last attempt'):
+            request = AsyncMock(side_effect=TransientError)
+
+            with self.assertRaises(TransientError):
+                await resilience.call('tickers', request)
+            self.assertEqual(request.call_count, 3)
+
+    async def test_call_not_idempotent(self):
+        resilience = Resilience(
+            'by_bit',
+            policies={'order': RetryPolicy(attempts=3, base_delay=0, idempotent=False)},
+        )
+
+        with self.subTest(case='Request that may have been processed should not be sent again'):
+            request = AsyncMock(side_effect=TransientError(maybe_processed=True))
+
+            with self.assertRaises(TransientError):
+                await resilience.call('order', request)
+            self.assertEqual(request.call_count, 1)
+
+        with self.subTest(case='Request that surely did not reach the server should be sent again'):
+            request = AsyncMock(side_effect=[TransientError(maybe_processed=False), 'order'])
+
+            self.assertEqual(await resilience.call('order', request), 'order')
+            self.assertEqual(request.call_count, 2)
+
+    async def test_call_retry_after(self):
+        resilience = Resilience('by_bit', default_policy=RetryPolicy(attempts=2, base_delay=0, deadline=10))
+
+        with self.subTest(case='Retry should wait retry_after of the rate limit'):
+            request = AsyncMock(side_effect=[RateLimitError(retry_after=3), 'result'])
+
+            with patch('trading_bot.adapters.resilience.asyncio.sleep', new_callable=AsyncMock) as mock_sleep:
+                self.assertEqual(await resilience.call('tickers', request), 'result')
+            mock_sleep.assert_awaited_once_with(3)
+
+        with self.subTest(case='Retry past the deadline should not be made'):
+            request = AsyncMock(side_effect=RateLimitError(retry_after=30))
+
+            with patch('trading_bot.adapters.resilience.asyncio.sleep', new_callable=AsyncMock) as mock_sleep:
+                with self.assertRaises(RateLimitError):
+                    await resilience.call('tickers', request)
+            mock_sleep.assert_not_awaited()
+            self.assertEqual(request.call_count, 1)
+
+    async def test_circuit_breaker(self):
+        resilience = Resilience(
+            'ta_api',
+            default_policy=RetryPolicy(attempts=1),
+            failure_threshold=2,
+            reset_timeout=30,
+        )
+        request = AsyncMock(side_effect=TransientError)
+
+        with self.subTest(case='Circuit should open after failure_threshold failures in a row'):
+            for _ in range(2):
+                with self.assertRaises(TransientError):
+                    await resilience.call('bulk', request)
+
+            with self.assertRaises(CircuitOpenError):
+                await resilience.call('bulk', request)
+            self.assertEqual(request.call_count, 2)
+            self.assertEqual(resilience.get_state(), {'bulk': {'state': CircuitBreaker.open, 'failures': 2}})
+            self.assertEqual(app.metrics.get_gauge('circuit_state', adapter='ta_api', endpoint='bulk'),
+                             CircuitBreaker.open)
+
+        with self.subTest(case='After reset_timeout one request should be let through'):
+            breaker = resilience._breakers['bulk']
+            breaker.opened_at -= 30
+            request = AsyncMock(return_value='result')
+
+            self.assertEqual(breaker.state, CircuitBreaker.half_open)
+            self.assertEqual(await resilience.call('bulk', request), 'result')
+            self.assertEqual(app.metrics.get_gauge('circuit_state', adapter='ta_api', endpoint='bulk'),
+                             CircuitBreaker.closed)
+
+        with self.subTest(case='Failed trial request should open the circuit again'):
+            breaker.opened_at = 0
+            request = AsyncMock(side_effect=TransientError)
+
+            with self.assertRaises(TransientError):
+                await resilience.call('bulk', request)
+            self.assertEqual(breaker.state, CircuitBreaker.open)
+
+    async def test_circuit_breaker_unexpected_error(self):
+        resilience = Resilience('ta_api', default_policy=RetryPolicy(attempts=1), failure_threshold=1)
+
+        with self.assertRaises(TransientError):
+            await resilience.call('bulk', AsyncMock(side_effect=TransientError))
+        resilience._breakers['bulk'].opened_at -= 30
+
+        with self.subTest(case='Trial request failed with an unexpected error should not keep the circuit open'):
+            with self.assertRaises(KeyError):
+                await resilience.call('bulk', AsyncMock(side_effect=KeyError))
+
+            self.assertEqual(await resilience.call('bulk', AsyncMock(return_value='result')), 'result')
+            self.assertEqual(resilience.get_state(), {'bulk': {'state': CircuitBreaker.closed, 'failures': 0}})
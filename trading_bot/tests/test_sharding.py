@@ -0,0 +1,116 @@
+import os
+import tempfile
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from config import Config
+from trading_bot import AdapterByBit
+from trading_bot.adapters.shared_state import SharedStateClient, SharedStateServer
+from trading_bot.services.sharding import ShardCoordinator
+
+
+def create_config(**attributes):
+    return type('TestConfig', (Config,), {
+        'INDICATORS_SOURCE': 'ta_api',
+        'TA_API_KEY': 'key',
+        'TA_API_KEYS': ['key_0', 'key_1'],
+        'METRICS_PORT': 0,
+        'INDICATORS_CACHE_PATH': None,
+        **attributes,
+    })
+
+
+class TestShardCoordinator(TestCase):
+
+    def test_split_symbols(self):
+        symbols = [{'base_currency': f'COIN{n}'} for n in range(5)]
+
+        with self.subTest(case='Shards should differ by one symbol at most'):
+            parts = ShardCoordinator.split_symbols(symbols, 2)
+
+            self.assertEqual([len(part) for part in parts], [3, 2])
+            self.assertCountEqual([symbol for part in parts for symbol in part], symbols)
+
+        with self.subTest(case='Shard without symbols should not be started'):
+            self.assertEqual(len(ShardCoordinator.split_symbols(symbols, 10)), 5)
+
+    def test_create_shard_config(self):
+        config_class = create_config(METRICS_PORT=9100, INDICATORS_CACHE_PATH='values.db')
+        symbols = [{'base_currency': 'BTC'}]
+
+        shard_config = ShardCoordinator.create_shard_config(config_class, 1, symbols, '/tmp/shared_state.sock')
+
+        with self.subTest(case='Shard should get its symbols, its taapi key and the socket of the coordinator'):
+            self.assertEqual(shard_config.SHARD, 1)
+            self.assertEqual(shard_config.SYMBOLS, symbols)
+            self.assertEqual(shard_config.TA_API_KEY, 'key_1')
+            self.assertEqual(shard_config.SHARED_STATE_SOCKET, '/tmp/shared_state.sock')
+
+        with self.subTest(case='Shard should get a metrics port and a cache file of its own'):
+            self.assertEqual(shard_config.METRICS_PORT, 9101)
+            self.assertEqual(shard_config.INDICATORS_CACHE_PATH, 'values.db.1')
+
+        with self.subTest(case='Config of the coordinator should not change'):
+            self.assertIsNone(config_class.SHARD)
+
+    def test_init(self):
+        with self.subTest(case='Less taapi keys than shards should raise ValueError'):
+            with self.assertRaises(ValueError):
+                ShardCoordinator(create_config(TA_API_KEYS=[]), shards=2)
+
+        with self.subTest(case='Local indicators should not need the keys'):
+            ShardCoordinator(create_config(INDICATORS_SOURCE='local', TA_API_KEYS=[]), shards=2)
+
+
+class TestSharedState(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        path = os.path.join(self.temp_dir.name, 'shared_state.sock')
+
+        self.deals_adapter = MagicMock()
+        self.deals_adapter.get_all_positions = AsyncMock(return_value={'BTCUSDT': [{'symbol': 'BTCUSDT', 'size': 1}]})
+        self.deals_adapter.get_all_prices = AsyncMock(return_value={'BTCUSDT': 100.0})
+        self.server = SharedStateServer(deals_adapter=self.deals_adapter, path=path)
+        await self.server.open()
+        self.client = SharedStateClient(path=path)
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.server.close()
+        self.temp_dir.cleanup()
+
+    async def test_get_snapshots(self):
+        with self.subTest(case='Shard should get the snapshots of the coordinator'):
+            self.assertEqual(await self.client.get_all_positions(), {'BTCUSDT': [{'symbol': 'BTCUSDT', 'size': 1}]})
+            self.assertEqual(await self.client.get_all_prices(), {'BTCUSDT': 100.0})
+            self.deals_adapter.invalidate_positions.assert_not_called()
+
+        with self.subTest(case='Positions invalidated by a shard should be invalidated by the coordinator'):
+            self.client.invalidate_positions('BTCUSDT')
+            await self.client.get_all_positions()
+
+            self.deals_adapter.invalidate_positions.assert_called_once_with('BTCUSDT')
+
+        with self.subTest(case='Failed ByBit request of the coordinator should raise Warning in the shard'):
+            self.deals_adapter.get_all_prices.side_effect = Warning
+
+            with patch('trading_bot.adapters.shared_state.logger'):
+                with self.assertRaises(Warning):
+                    await self.client.get_all_prices()
+
+    async def test_adapter_by_bit(self):
+        adapter = AdapterByBit(api_key='key', api_secret='secret', shared_state=self.client)
+        adapter._session = MagicMock()
+
+        with self.subTest(case='ByBit adapter of a shard should take the snapshots from the coordinator'):
+            self.assertEqual(await adapter.get_all_positions(), {'BTCUSDT': [{'symbol': 'BTCUSDT', 'size': 1}]})
+            self.assertEqual(await adapter.get_all_prices(), {'BTCUSDT': 100.0})
+            adapter._session.request.assert_not_called()
+
+        with self.subTest(case='Positions invalidated by the adapter should be requested again'):
+            adapter.invalidate_positions('BTCUSDT')
+            await adapter.get_all_positions()
+
+            self.assertEqual(self.deals_adapter.get_all_positions.call_count, 2)
+            self.deals_adapter.invalidate_positions.assert_called_once_with('BTCUSDT')
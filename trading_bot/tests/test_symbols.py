@@ -137,3 +137,36 @@ class TestSymbolManager(TestCase):
 
         with self.subTest(case='If there is no matching character, the method should return None'):
             self.assertIsNone(sym_manager.find_by_alias(alias='FILUSDT', alias_template=alias_template))
+
+        with self.subTest(case='Symbol created after the first lookup should be found too'):
+            fil = sym_manager.create(
+                base_currency='FIL',
+                quote_currency='USDT',
+                exchanges=[test_exchange],
+                deal_opening_params={'qty': 0.003}
+            )
+
+            self.assertEqual(sym_manager.find_by_alias(alias='FILUSDT', alias_template=alias_template), fil)
+
+        with self.subTest(case='Every alias template should have its own index'):
+            ta_api_template = '{base_currency}/{quote_currency}'
+
+            self.assertEqual(sym_manager.find_by_alias(alias='BTC/USDT', alias_template=ta_api_template), btc)
+            self.assertIsNone(sym_manager.find_by_alias(alias='BTCUSDT', alias_template=ta_api_template))
+
+    def test_get(self):
+        test_exchange = app.exchange_manager.create(name='TestExchange', deal_opening_method='send_message')
+
+        sym_manager = SymbolManager()
+        btc = sym_manager.create(
+            base_currency='BTC',
+            quote_currency='USDT',
+            exchanges=[test_exchange],
+            deal_opening_params={'qty': 0.003}
+        )
+
+        with self.subTest(case='Method should return the symbol by its name'):
+            self.assertEqual(sym_manager.get('BTCUSDT'), btc)
+
+        with self.subTest(case='If there is no symbol with the name, the method should return None'):
+            self.assertIsNone(sym_manager.get('FILUSDT'))
@@ -8,14 +8,14 @@ from trading_bot.models.trading_systems import TradingSystemManager, TradingSyst
 from trading_bot.tests.helpers import reset_managers
 
 base_dir = os.path.abspath(os.path.dirname(__file__))
-settings_dir = f'{base_dir}\\static'
+settings_dir = os.path.join(base_dir, 'static')
 
 
 class TradingSystemSettingsLoader:
 
     @staticmethod
     def correct_settings():
-        with open(f'{settings_dir}\\trading_system_settings_correct.json') as f:
+        with open(os.path.join(settings_dir, 'trading_system_settings_correct.json')) as f:
             return json.load(f)
 
 
@@ -223,6 +223,39 @@ class TestTradingSystemManager(TestCase):
             self.assertEqual(len(ts_manager.list()), 10)
             self.assertEqual(ts_manager.list(), created_trading_systems)
 
+    def test_list_by_indicator(self):
+        self._create_exchanges()
+        settings = TradingSystemSettingsLoader.correct_settings()
+
+        with self.subTest(case='TradingSystemManager should return trading systems that use the indicator'):
+            ts_manager = TradingSystemManager(
+                exchange_manager=app.exchange_manager,
+                indicator_manager=app.indicator_manager
+            )
+
+            first_trading_system = ts_manager.create(
+                name=f'{settings[0].get("name")} 1',
+                settings=settings[0].get('settings')
+            )
+            second_trading_system = ts_manager.create(
+                name=f'{settings[0].get("name")} 2',
+                settings=settings[0].get('settings')
+            )
+
+            self.assertEqual(
+                ts_manager.list_by_indicator(app.indicator_manager.get('Momentum_1w')),
+                [first_trading_system, second_trading_system],
+            )
+
+        with self.subTest(case='For indicator without trading systems TradingSystemManager should return empty list'):
+            indicator = app.indicator_manager.create(
+                name='ParabolicSAR_1h',
+                indicator_type='ParabolicSAR',
+                interval='1h',
+            )
+
+            self.assertEqual(ts_manager.list_by_indicator(indicator), [])
+
 
 class TestTradingSystemSettingsValidator(TestCase):
 
@@ -401,6 +434,80 @@ class TestOperand(TestCase):
 
             self.assertEqual(operand.get_operand_value(indicator_values=indicator_values), 0.76)
 
+    def test_compile(self):
+        mom = app.indicator_manager.create(
+            name='Momentum_1h',
+            indicator_type='Momentum',
+            interval='1h',
+        )
+
+        ma = app.indicator_manager.create(
+            name='MovingAverage_1h_period4',
+            indicator_type='MovingAverage',
+            interval='1h',
+            optional={'optInTimePeriod': 4},
+        )
+
+        values = [(7, -8.76), (3.5, 1.2)]
+
+        with self.subTest(case='After compile, operand should read its value by position'):
+            operand = Condition.Operand(
+                operand_type=Condition.Operand.OperandType.INDICATOR_VALUE,
+                comparison_value='MovingAverage_1h_period4.previous_value'
+            )
+            operand.compile([mom, ma])
+
+            self.assertEqual(operand.indicator_index, 1)
+            self.assertEqual(operand.value_index, 1)
+            self.assertEqual(operand.get_compiled_value(values), 1.2)
+
+        with self.subTest(case='NUMBER operand should return its number without compiling'):
+            operand = Condition.Operand(
+                operand_type=Condition.Operand.OperandType.NUMBER,
+                comparison_value='0.76'
+            )
+
+            self.assertEqual(operand.get_compiled_value(values), 0.76)
+
+        with self.subTest(case='When the trading system has no such indicator, compile should raise ValueError'):
+            operand = Condition.Operand(
+                operand_type=Condition.Operand.OperandType.INDICATOR_VALUE,
+                comparison_value='ADX_1h.present_value'
+            )
+
+            with self.assertRaises(ValueError):
+                operand.compile([mom, ma])
+
+        with self.subTest(case='When the value name is unknown, compile should raise ValueError'):
+            operand = Condition.Operand(
+                operand_type=Condition.Operand.OperandType.INDICATOR_VALUE,
+                comparison_value='Momentum_1h.last_value'
+            )
+
+            with self.assertRaises(ValueError):
+                operand.compile([mom, ma])
+
+        with self.subTest(case='Operand value[-k] should read the k-th last value and deepen the history'):
+            operand = Condition.Operand(
+                operand_type=Condition.Operand.OperandType.INDICATOR_VALUE,
+                comparison_value='Momentum_1h.value[-3]'
+            )
+            operand.compile([mom, ma])
+
+            self.assertEqual(operand.value_index, 2)
+            self.assertEqual(mom.history_size, 3)
+            self.assertEqual(ma.history_size, 2)
+            self.assertEqual(operand.get_compiled_value([(7, -8.76, 4.1), (3.5, 1.2)]), 4.1)
+
+        with self.subTest(case='Operand value[-0] should raise ValueError'):
+            operand = Condition.Operand(
+                operand_type=Condition.Operand.OperandType.INDICATOR_VALUE,
+                comparison_value='Momentum_1h.value[-0]'
+            )
+
+            with self.assertRaises(ValueError):
+                operand.compile([mom, ma])
+
 
 class TestCondition(TestCase):
     def setUp(self) -> None:
@@ -442,3 +549,32 @@ class TestCondition(TestCase):
             self.assertTrue(self.condition.is_satisfied(first_operand_value=-0.57, second_operand_value=-0.57))
             self.assertFalse(self.condition.is_satisfied(first_operand_value=2, second_operand_value=8))
             self.assertFalse(self.condition.is_satisfied(first_operand_value=2, second_operand_value=1.0003))
+
+    def test_evaluate(self):
+        mom = app.indicator_manager.create(
+            name='Momentum_1h',
+            indicator_type='Momentum',
+            interval='1h',
+        )
+        condition = Condition(
+            first_operand=Condition.Operand(
+                operand_type=Condition.Operand.OperandType.INDICATOR_VALUE,
+                comparison_value='Momentum_1h.present_value'
+            ),
+            operator='>',
+            second_operand=Condition.Operand(
+                operand_type=Condition.Operand.OperandType.INDICATOR_VALUE,
+                comparison_value='Momentum_1h.previous_value'
+            ),
+            is_close_condition=False,
+        )
+        condition.compile([mom])
+
+        with self.subTest(case='Compiled condition should compare the values from the vector'):
+            self.assertTrue(condition.evaluate([(2, -0.56)]))
+            self.assertFalse(condition.evaluate([(2, 2)]))
+
+        with self.subTest(case='Changed operator should be used by evaluate'):
+            condition.operator = '='
+
+            self.assertTrue(condition.evaluate([(2, 2)]))